@@ -0,0 +1,70 @@
+"""
+Agent construction time per turn: cold (every cache cleared, as before) vs warm.
+
+Builds the database and inquiry agents repeatedly with a 20-message history.
+Cold clears the schema file cache, the rendered prompts and the shared LLM
+clients before each build, which reproduces the old per-turn work (walk
+src/db_info, read every schema file, format the prompt, construct a new
+VLLM and HTTP client). Warm reuses them. No LLM calls are made.
+
+    uv run python -m benchmarks.agent_factory --iterations 500
+"""
+
+import argparse
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from RAW.modals import Message
+
+from src.agentic.agents import database_agent, inquiry_agent
+from src.agentic.llms.vllm import get_shared_vllm
+
+HISTORY = [Message(role="user" if i % 2 == 0 else "assistant", content=f"message {i}") for i in range(20)]
+
+
+def clear_caches():
+    database_agent._schema_cache.clear()
+    database_agent._listing_cache = (-1.0, [])
+    database_agent.build_prompt.cache_clear()
+    inquiry_agent.build_prompt.cache_clear()
+    get_shared_vllm.cache_clear()
+
+
+def build_database():
+    database_agent.get_database_agent(user_id=1, history=HISTORY, message_type="default")
+
+
+def build_inquiry():
+    inquiry_agent.get_inquiry_agent(user_id=1, history=HISTORY)
+
+
+def measure(build, iterations: int, cold: bool) -> list:
+    samples = []
+    for _ in range(iterations):
+        if cold:
+            clear_caches()
+        started = time.perf_counter()
+        build()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'agent':<10} {'mode':<5} {'p50':>9} {'p99':>9}")
+    for label, build in (("database", build_database), ("inquiry", build_inquiry)):
+        for cold in (True, False):
+            samples = measure(build, args.iterations, cold)
+            p99 = statistics.quantiles(samples, n=100)[98]
+            print(f"{label:<10} {'cold' if cold else 'warm':<5} {statistics.median(samples):>7.3f}ms {p99:>7.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Redis ops per generated token: append_chunk per token vs ChunkWriter.
+
+Replays a synthetic token stream (short word-piece tokens at a fixed rate)
+into a message stream, once calling append_chunk for every token and once
+through ChunkWriter, and reports Redis commands, round trips and list
+elements per token. Also checks that both produce the same text.
+
+Requires a reachable Redis (REDIS_HOST / REDIS_PORT / REDIS_DB).
+
+    uv run python -m benchmarks.chunk_writer --tokens 1000 --rate 60
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.utils.redis import (
+    STREAM_KEY_PREFIX,
+    ChunkWriter,
+    append_chunk,
+    get_redis,
+    get_stream_history,
+)
+
+WORDS = ["the", " order", " was", " received", " on", " time", ",", " with", " 12", "0", " units", ".", "\n"]
+
+
+def synthetic_tokens(count: int) -> list[str]:
+    rnd = random.Random(42)
+    return [rnd.choice(WORDS) for _ in range(count)]
+
+
+async def commands_processed() -> int:
+    r = await get_redis()
+    info = await r.info("stats")
+    return int(info["total_commands_processed"])
+
+
+async def per_token(message_id, tokens, interval):
+    for token in tokens:
+        await append_chunk(message_id, token)
+        await asyncio.sleep(interval)
+
+
+async def buffered(message_id, tokens, interval):
+    async with ChunkWriter(message_id) as writer:
+        for token in tokens:
+            await writer.write(token)
+            await asyncio.sleep(interval)
+
+
+async def run(label, writer_fn, tokens, interval):
+    message_id = f"bench-{uuid.uuid4().hex[:8]}"
+    before = await commands_processed()
+    started = time.perf_counter()
+    await writer_fn(message_id, tokens, interval)
+    elapsed = time.perf_counter() - started
+    # INFO itself counts as one command
+    ops = await commands_processed() - before - 1
+
+    history = await get_stream_history(message_id)
+    assert "".join(history) == "".join(tokens), "stream content mismatch"
+
+    print(
+        f"{label:<10} redis ops={ops:6d}  ops/token={ops / len(tokens):5.2f}  "
+        f"list elements={len(history):6d}  elapsed={elapsed:6.2f}s"
+    )
+
+    r = await get_redis()
+    await r.delete(STREAM_KEY_PREFIX.format("default", message_id))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=60.0, help="Tokens per second")
+    args = parser.parse_args()
+
+    tokens = synthetic_tokens(args.tokens)
+    interval = 1 / args.rate
+    await run("per-token", per_token, tokens, interval)
+    await run("buffered", buffered, tokens, interval)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
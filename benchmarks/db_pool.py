@@ -0,0 +1,82 @@
+"""
+Per-job database overhead: a fresh psycopg2 connection per call vs the pool.
+
+A "job" mirrors what llm_worker does for one default-type reply: fetch the
+message, fetch the conversation, fetch recent history and update the
+message, each through its own get_db_cursor() block. The queries are cheap
+(SELECT 1) so the numbers are dominated by connection setup.
+
+Requires a reachable app database (DB_HOST / DB_PORT / DB_USER / DB_PASS / DB_NAME).
+
+    uv run python -m benchmarks.db_pool --jobs 200
+"""
+
+import argparse
+import statistics
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2.extras import RealDictCursor
+
+load_dotenv()
+
+from src.utils.database import get_app_db_config, get_db_cursor, get_pool_stats
+
+CURSORS_PER_JOB = 4
+
+
+@contextmanager
+def unpooled_cursor():
+    """The previous behaviour: connect, run, close"""
+    config = get_app_db_config()
+    conn = psycopg2.connect(
+        host=config["host"],
+        port=int(config["port"]),
+        dbname=config["dbname"],
+        user=config["user"],
+        password=config["password"],
+    )
+    try:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        yield cursor
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def pooled_cursor():
+    return get_db_cursor(commit=True, log_queries=False)
+
+
+def run(label, cursor_factory, jobs):
+    timings = []
+    for _ in range(jobs):
+        started = time.perf_counter()
+        for _ in range(CURSORS_PER_JOB):
+            with cursor_factory() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+        timings.append(time.perf_counter() - started)
+
+    timings.sort()
+    print(
+        f"{label:<9} per-job p50={statistics.median(timings) * 1000:7.2f} ms  "
+        f"p99={timings[int(len(timings) * 0.99) - 1] * 1000:7.2f} ms  "
+        f"mean={statistics.mean(timings) * 1000:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=200)
+    args = parser.parse_args()
+
+    run("unpooled", unpooled_cursor, args.jobs)
+    run("pooled", pooled_cursor, args.jobs)
+    print(f"pool stats: {get_pool_stats()}")
+
+
+if __name__ == "__main__":
+    main()
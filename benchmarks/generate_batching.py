@@ -0,0 +1,91 @@
+"""
+One-shot generate() throughput: one call at a time vs batched dispatch.
+
+Starts a local fake OpenAI-compatible server that behaves like a batching
+backend: every request takes --latency-ms, and up to --capacity requests
+run at once. Then --items generate() calls (an SO validation with that many
+items, or a PDF with that many image chunks) are made the old way, awaiting
+each before the next, and the new way, all at once through the client's
+GenerateBatcher. Reports p50/p99 wall time per run over --repeat runs.
+
+Batched wall time should approach items / min(capacity, VLLM_MAX_IN_FLIGHT)
+times the latency rather than items times the latency.
+
+    uv run python -m benchmarks.generate_batching --items 40 --latency-ms 200 --capacity 16
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.agentic.llms.vllm import VLLM
+
+
+async def start_server(latency: float, capacity: int):
+    slots = asyncio.Semaphore(capacity)
+    body = json.dumps({"choices": [{"message": {"role": "assistant", "content": "{\"status\": \"valid\"}"}}]}).encode()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = next((int(line.split(b":")[1]) for line in head.split(b"\r\n") if line.lower().startswith(b"content-length")), 0)
+                await reader.readexactly(length)
+                async with slots:
+                    await asyncio.sleep(latency)
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def sequential(llm: VLLM, items: int):
+    for i in range(items):
+        await llm.generate(f"item {i}")
+
+
+async def batched(llm: VLLM, items: int):
+    await asyncio.gather(*(llm.generate(f"item {i}") for i in range(items)))
+
+
+async def main_async(args):
+    server = await start_server(args.latency_ms / 1000, args.capacity)
+    port = server.sockets[0].getsockname()[1]
+    llm = VLLM(model="benchmark", base_url=f"http://127.0.0.1:{port}")
+
+    print(f"{'mode':<11} {'items':>6} {'p50':>10} {'p99':>10} {'items/s':>9}")
+    async with server:
+        for label, run in (("sequential", sequential), ("batched", batched)):
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                await run(llm, args.items)
+                samples.append(time.perf_counter() - started)
+            p50 = statistics.median(samples)
+            p99 = statistics.quantiles(samples, n=100)[98] if len(samples) > 1 else p50
+            print(f"{label:<11} {args.items:>6} {p50 * 1000:>8.0f}ms {p99 * 1000:>8.0f}ms {args.items / p50:>9.1f}")
+    await llm.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--capacity", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Vision payload size and OCR latency per page, before and after image
+preprocessing.
+
+Pages come from --pdf (the images embedded in each page, as pdf_parser
+extracts them), from --images, or, with neither, --pages synthetic 300 DPI
+A4 text scans. Each page is split into the three overlapping chunks
+pdf_parser sends, once the old way (full-resolution crops re-encoded as
+JPEG quality 95) and once through split_image_into_safe_chunks
+(trimmed, downscaled to VISION_MAX_PIXELS, grayscale, size-targeted JPEG).
+Reports the base64 payload, megapixels sent and CPU time per page as
+p50/p99. With --ocr, both versions of every page are also sent to the
+vision LLM (VISION_LLM_HOST / VISION_LLM_MODEL) and the OCR latency per
+page is reported.
+
+    uv run python -m benchmarks.image_preprocess --pdf scan.pdf --ocr
+"""
+
+import argparse
+import asyncio
+import io
+import random
+import statistics
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from PIL import Image, ImageDraw
+
+from src.utils.file_handler.image_preprocess import PreparedImage, VISION_MAX_PIXELS
+from src.utils.file_handler.parsers.image_parser import image_parser
+from src.utils.file_handler.parsers.pdf_parser import split_image_into_safe_chunks
+
+
+def legacy_chunks(image_bytes: bytes, num_chunks: int = 3, overlap: int = 100) -> list:
+    """split_image_into_safe_chunks as it was before preprocessing"""
+    img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    width, height = img.size
+    if height < 500:
+        return [PreparedImage(image_bytes, width, height)]
+    chunk_height = height // num_chunks
+    chunks = []
+    for i in range(num_chunks):
+        start_y = max(0, i * chunk_height - overlap)
+        end_y = min(height, (i + 1) * chunk_height + overlap)
+        buf = io.BytesIO()
+        img.crop((0, start_y, width, end_y)).save(buf, format="JPEG", quality=95)
+        chunks.append(PreparedImage(buf.getvalue(), width, end_y - start_y))
+    return chunks
+
+
+def synthetic_page(seed: int) -> bytes:
+    """An off-white A4 page at 300 DPI with margins and lines of text"""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (2480, 3508), (246, 244, 238))
+    draw = ImageDraw.Draw(img)
+    words = ["invoice", "quantity", "total", "product", "weight", "order", "delivery", "12.50", "SKU-4411", "net"]
+    for line in range(90):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(4, 12)))
+        draw.text((300, 350 + line * 32), text, fill=(30, 30, 30), font_size=26)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def load_pages(args) -> list:
+    if args.pdf:
+        import fitz
+
+        pages = []
+        with fitz.open(args.pdf) as doc:
+            for page in doc:
+                for img in page.get_images(full=True):
+                    pages.append(doc.extract_image(img[0])["image"])
+        return pages
+    if args.images:
+        return [Path(path).read_bytes() for path in args.images]
+    return [synthetic_page(i) for i in range(args.pages)]
+
+
+def quantiles(samples: list) -> tuple:
+    p50 = statistics.median(samples)
+    p99 = statistics.quantiles(samples, n=100)[98] if len(samples) > 1 else p50
+    return p50, p99
+
+
+async def ocr_latencies(llm, pages_chunks: list) -> list:
+    latencies = []
+    for chunks in pages_chunks:
+        started = time.perf_counter()
+        # Chunks of a page go out together, as pdf_parser sends them
+        await asyncio.gather(*(image_parser(chunk, llm) for chunk in chunks))
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def main_async(args):
+    pages = load_pages(args)
+    print(f"{len(pages)} pages, VISION_MAX_PIXELS={VISION_MAX_PIXELS}")
+
+    results = {}
+    for label, split in (("original", legacy_chunks), ("prepared", split_image_into_safe_chunks)):
+        prepared, payloads, megapixels, cpu = [], [], [], []
+        for page in pages:
+            started = time.perf_counter()
+            chunks = split(page)
+            # Encoding to base64 is part of what the client pays per request
+            payloads.append(sum(len(chunk.to_base64()) for chunk in chunks))
+            cpu.append(time.perf_counter() - started)
+            megapixels.append(sum(chunk.pixels for chunk in chunks) / 1e6)
+            prepared.append(chunks)
+        results[label] = prepared
+        (bytes_p50, bytes_p99), (mp_p50, mp_p99), (cpu_p50, cpu_p99) = quantiles(payloads), quantiles(megapixels), quantiles(cpu)
+        print(
+            f"{label:<9} payload p50 {bytes_p50 / 1024:>8.0f}KB p99 {bytes_p99 / 1024:>8.0f}KB"
+            f"  pixels p50 {mp_p50:>5.1f}MP p99 {mp_p99:>5.1f}MP"
+            f"  cpu p50 {cpu_p50 * 1000:>6.0f}ms p99 {cpu_p99 * 1000:>6.0f}ms"
+        )
+
+    if not args.ocr:
+        return
+
+    from src.agentic.llms.vision import get_vision_llm
+
+    llm = get_vision_llm()
+    for label, pages_chunks in results.items():
+        p50, p99 = quantiles(await ocr_latencies(llm, pages_chunks))
+        print(f"{label:<9} OCR per page p50 {p50 * 1000:>7.0f}ms p99 {p99 * 1000:>7.0f}ms")
+    await llm.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf")
+    parser.add_argument("--images", nargs="*")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--ocr", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+BalancedVLLM against local fake OpenAI-compatible servers.
+
+Starts one fake server per --latency-ms entry; each answers
+/v1/chat/completions after that delay, either as one JSON body or as a
+short SSE stream. Servers listed in --failing answer 503 (or drop the
+connection with --drop). Then --requests requests run at --concurrency,
+half streamed, and the script prints the share each server got, p50/p99
+latency and errors, once per routing policy. A final sticky pass sends
+--conversations routing keys and checks each key stayed on one server.
+
+Healthy servers should take the work in inverse proportion to their
+latency, failing ones should be ejected after a few errors, and no request
+should fail while a healthy server is left.
+
+    uv run python -m benchmarks.llm_balancer --latency-ms 20 20 80 --failing 2 --requests 2000
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.agentic.llms import vllm
+from src.agentic.llms.vllm import BalancedVLLM, set_routing_key
+
+
+class FakeServer:
+    def __init__(self, index: int, latency: float, failing: bool, drop: bool):
+        self.index = index
+        self.latency = latency
+        self.failing = failing
+        self.drop = drop
+        self.served = 0
+        self.keys = collections.Counter()
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = next((int(line.split(b":")[1]) for line in head.split(b"\r\n") if line.lower().startswith(b"content-length")), 0)
+                request = json.loads(await reader.readexactly(length))
+                if self.failing:
+                    if self.drop:
+                        break
+                    writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n")
+                    await writer.drain()
+                    continue
+
+                self.served += 1
+                self.keys[request["messages"][0]["content"]] += 1
+                await asyncio.sleep(self.latency)
+                if request.get("stream"):
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+                    for token in ("fake", " reply"):
+                        writer.write(b"data: " + json.dumps({"choices": [{"delta": {"content": token}}]}).encode() + b"\n\n")
+                    writer.write(b"data: [DONE]\n\n")
+                    await writer.drain()
+                    break
+                body = json.dumps({"choices": [{"message": {"role": "assistant", "content": "fake reply"}}]}).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def one_request(llm: BalancedVLLM, index: int, prompt: str, latencies: list, errors: list):
+    started = time.perf_counter()
+    try:
+        if index % 2:
+            async for _ in await llm.generate(prompt, stream=True):
+                pass
+        else:
+            await llm.generate(prompt)
+        latencies.append(time.perf_counter() - started)
+    except Exception as e:
+        errors.append(str(e))
+
+
+async def run(llm: BalancedVLLM, requests: int, concurrency: int, key_count: int = 0):
+    latencies, errors = [], []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded(index: int):
+        async with semaphore:
+            key = f"conversation {index % key_count}" if key_count else f"request {index}"
+            # Each task has its own context, like a worker job
+            set_routing_key(key if key_count else None)
+            await one_request(llm, index, key, latencies, errors)
+
+    await asyncio.gather(*(guarded(i) for i in range(requests)))
+    return latencies, errors
+
+
+def report(label: str, servers: list, latencies: list, errors: list):
+    total = sum(s.served for s in servers) or 1
+    shares = " ".join(f"s{s.index}={s.served / total:.0%}" for s in servers)
+    p50 = statistics.median(latencies) * 1000 if latencies else float("nan")
+    p99 = statistics.quantiles(latencies, n=100)[98] * 1000 if len(latencies) > 1 else p50
+    print(f"{label:<8} {shares:<36} p50 {p50:7.1f}ms  p99 {p99:7.1f}ms  errors {len(errors)}")
+
+
+async def main_async(args):
+    servers = [
+        FakeServer(i, latency / 1000, i in args.failing, args.drop)
+        for i, latency in enumerate(args.latency_ms)
+    ]
+    urls = [await server.start() for server in servers]
+
+    for routing in ("least", "p2c"):
+        vllm.VLLM_ROUTING = routing
+        for server in servers:
+            server.served = 0
+            server.keys.clear()
+        llm = BalancedVLLM(model="benchmark", endpoints=urls)
+        latencies, errors = await run(llm, args.requests, args.concurrency)
+        report(routing, servers, latencies, errors)
+        print(f"{'':<8} {llm.endpoint_stats()}")
+        await llm.stop()
+
+    for server in servers:
+        server.keys.clear()
+    llm = BalancedVLLM(model="benchmark", endpoints=urls)
+    latencies, errors = await run(llm, args.requests, args.concurrency, key_count=args.conversations)
+    spread = collections.Counter(sum(1 for s in servers if key in s.keys) for key in {k for s in servers for k in s.keys})
+    report("sticky", servers, latencies, errors)
+    print(f"{'':<8} servers per conversation: {dict(sorted(spread.items()))}")
+    await llm.stop()
+
+    for server in servers:
+        server.server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, nargs="+", default=[20, 20, 80])
+    parser.add_argument("--failing", type=int, nargs="*", default=[], help="indexes of servers that always fail")
+    parser.add_argument("--drop", action="store_true", help="failing servers drop the connection instead of answering 503")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--conversations", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Tail latency of one-shot LLM calls under partial backend failure, with and
+without hedged requests.
+
+Starts one fake OpenAI-compatible server per --latency-ms entry. Each
+answers /v1/chat/completions after its latency, except that --stall-rate
+of requests stall for --stall-ms instead (a stuck batch, a slow replica).
+Servers listed in --failing answer 503 to everything, which should open
+their circuit breaker so later calls skip them. Then --requests chat()
+calls run at --concurrency, each under a --deadline-ms deadline, once with
+hedging off and once with it on. Prints p50/p99, deadline misses, other
+errors and how many hedges were sent and won.
+
+With hedging on, p99 should drop from about --stall-ms to about the p95
+latency plus the normal latency, for a few percent more requests.
+
+    uv run python -m benchmarks.llm_resilience --latency-ms 50 50 --stall-rate 0.03 --stall-ms 2000 --failing 1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from RAW.modals import Message
+from src.agentic.llms.resilience import BREAKER_REJECTIONS, HEDGED_REQUESTS, DeadlineExceeded, set_deadline
+from src.agentic.llms.vllm import VLLM, BalancedVLLM
+
+
+class FakeServer:
+    def __init__(self, latency: float, stall_rate: float, stall: float, failing: bool):
+        self.latency = latency
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.failing = failing
+        self.served = 0
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = next((int(line.split(b":")[1]) for line in head.split(b"\r\n") if line.lower().startswith(b"content-length")), 0)
+                await reader.readexactly(length)
+                if self.failing:
+                    writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n")
+                    await writer.drain()
+                    continue
+
+                self.served += 1
+                await asyncio.sleep(self.stall if random.random() < self.stall_rate else self.latency)
+                body = json.dumps({"choices": [{"message": {"role": "assistant", "content": "fake reply"}}]}).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # Cancelled: a hedge loser hung up, or the run is over
+            pass
+        finally:
+            writer.close()
+
+
+async def run(llm: VLLM, args) -> tuple:
+    latencies, deadline_misses, errors = [], 0, 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int):
+        nonlocal deadline_misses, errors
+        async with semaphore:
+            # As a worker job would; the deadline is scoped to this task
+            set_deadline(args.deadline_ms / 1000 if args.deadline_ms else None)
+            started = time.perf_counter()
+            try:
+                await llm.chat([Message(role="user", content=f"request {i}", images=[], tool_calls=[])])
+            except DeadlineExceeded:
+                deadline_misses += 1
+                return
+            except RuntimeError:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(asyncio.create_task(one(i)) for i in range(args.requests)))
+    return latencies, deadline_misses, errors
+
+
+async def main_async(args):
+    failing = set(args.failing)
+    servers = [FakeServer(latency / 1000, args.stall_rate, args.stall_ms / 1000, i in failing) for i, latency in enumerate(args.latency_ms)]
+    urls = [await server.start() for server in servers]
+
+    print(f"{'mode':<8} {'p50':>9} {'p99':>9} {'deadline':>9} {'errors':>7} {'hedges':>7} {'won':>5} {'rejected':>9}")
+    for label, hedge in (("plain", False), ("hedged", True)):
+        llm = BalancedVLLM(model="benchmark", endpoints=urls) if len(urls) > 1 else VLLM(model="benchmark", base_url=urls[0])
+        llm.hedge = hedge
+        hedges_before = HEDGED_REQUESTS.value(model="benchmark")
+        won_before = HEDGED_REQUESTS.value(model="benchmark", winner="hedge")
+        rejected_before = BREAKER_REJECTIONS.value()
+
+        latencies, deadline_misses, errors = await run(llm, args)
+        p50 = statistics.median(latencies) if latencies else 0
+        p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) > 1 else p50
+        hedges = HEDGED_REQUESTS.value(model="benchmark") - hedges_before
+        won = HEDGED_REQUESTS.value(model="benchmark", winner="hedge") - won_before
+        rejected = BREAKER_REJECTIONS.value() - rejected_before
+        print(f"{label:<8} {p50 * 1000:>7.1f}ms {p99 * 1000:>7.1f}ms {deadline_misses:>9} {errors:>7} {int(hedges):>7} {int(won):>5} {int(rejected):>9}")
+        print(f"{'':<8} {llm.endpoint_stats()}")
+        await llm.stop()
+
+    for server in servers:
+        server.server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, nargs="+", default=[50, 50])
+    parser.add_argument("--stall-rate", type=float, default=0.03)
+    parser.add_argument("--stall-ms", type=float, default=2000)
+    parser.add_argument("--failing", type=int, nargs="*", default=[])
+    parser.add_argument("--deadline-ms", type=float, default=5000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
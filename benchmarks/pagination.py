@@ -0,0 +1,111 @@
+"""
+Page latency vs conversation size: LIMIT/OFFSET vs keyset cursors.
+
+For each size, seeds a throwaway conversation with that many messages and
+times fetching the last page of the thread both ways: the old
+get_messages_by_conversation with a deep offset, and get_messages_page with
+the cursor of the preceding row. Keyset latency should stay flat as the
+thread grows while the offset path scales with the depth of the page.
+The conversation is deleted afterwards.
+
+Requires a reachable app database with migrations applied
+(DB_HOST / DB_PORT / DB_USER / DB_PASS / DB_NAME).
+
+    uv run python -m benchmarks.pagination --sizes 1000 10000 100000 --repeat 20
+"""
+
+import argparse
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.services.message_service import MessageService
+from src.utils.database import get_db_cursor
+from src.utils.pagination import encode_cursor
+
+PAGE_SIZE = 50
+
+
+def seed_conversation(size: int) -> int:
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute(
+            "INSERT INTO conversations (user_id, agent, title) VALUES (%s, %s, %s) RETURNING id;",
+            (0, "benchmark", f"pagination {size}"),
+        )
+        conversation_id = cursor.fetchone()["id"]
+        cursor.execute(
+            """
+            INSERT INTO messages (conversation_id, timestamp, role, content)
+            SELECT %s, NOW() - make_interval(secs => %s - n), 'user', 'message ' || n
+            FROM generate_series(1, %s) AS n;
+            """,
+            (conversation_id, size, size),
+        )
+        cursor.execute("ANALYZE messages;")
+    return conversation_id
+
+
+def delete_conversation(conversation_id: int):
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute("DELETE FROM conversations WHERE id = %s;", (conversation_id,))
+
+
+def last_page_cursor(conversation_id: int, offset: int) -> str:
+    """Cursor of the row just before the last page"""
+    with get_db_cursor(commit=False) as cursor:
+        cursor.execute(
+            """
+            SELECT id, timestamp FROM messages
+            WHERE conversation_id = %s
+            ORDER BY timestamp ASC, id ASC
+            OFFSET %s LIMIT 1;
+            """,
+            (conversation_id, offset - 1),
+        )
+        row = cursor.fetchone()
+    return encode_cursor(row["timestamp"], row["id"])
+
+
+def time_ms(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'messages':>10} {'offset p50':>12} {'offset p99':>12} {'keyset p50':>12} {'keyset p99':>12}")
+    for size in args.sizes:
+        conversation_id = seed_conversation(size)
+        try:
+            offset = max(size - PAGE_SIZE, 1)
+            cursor = last_page_cursor(conversation_id, offset)
+
+            # Both must return the same page
+            by_offset = MessageService.get_messages_by_conversation(conversation_id, PAGE_SIZE, offset)
+            by_cursor, _ = MessageService.get_messages_page(conversation_id, PAGE_SIZE, cursor)
+            assert [m.id for m in by_offset] == [m.id for m in by_cursor], "page mismatch"
+
+            offset_ms = time_ms(lambda: MessageService.get_messages_by_conversation(conversation_id, PAGE_SIZE, offset), args.repeat)
+            keyset_ms = time_ms(lambda: MessageService.get_messages_page(conversation_id, PAGE_SIZE, cursor), args.repeat)
+            q = lambda s: statistics.quantiles(s, n=100)
+            print(
+                f"{size:>10} {statistics.median(offset_ms):>10.2f}ms {q(offset_ms)[98]:>10.2f}ms "
+                f"{statistics.median(keyset_ms):>10.2f}ms {q(keyset_ms)[98]:>10.2f}ms"
+            )
+        finally:
+            delete_conversation(conversation_id)
+
+
+if __name__ == "__main__":
+    main()
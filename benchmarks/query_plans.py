@@ -0,0 +1,202 @@
+"""
+Query-plan regression check for the hot service queries.
+
+Seeds the app database with synthetic rows inside a transaction, runs
+ANALYZE, then EXPLAINs each hot query and fails if its plan sequentially
+scans the table it reads. Everything is rolled back at the end, so it can
+be pointed at a local development database with migrations applied
+(both the yoyo ones and whatsapp-service/migrations).
+
+Requires a reachable app database (DB_HOST / DB_PORT / DB_USER / DB_PASS / DB_NAME).
+Exits non-zero when a query regresses to a sequential scan.
+
+    uv run python -m benchmarks.query_plans --scale 1
+"""
+
+import argparse
+import json
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.utils.database import get_db_cursor
+
+# (name, table that must not be seq-scanned, query as the services run it)
+HOT_QUERIES = [
+    (
+        "invoke_agent history",
+        "messages",
+        """
+        SELECT id, conversation_id, role, content, metadata, timestamp
+        FROM messages
+        WHERE conversation_id = 42
+        ORDER BY timestamp DESC
+        LIMIT 20;
+        """,
+    ),
+    (
+        "message listing page",
+        "messages",
+        """
+        SELECT id, conversation_id, role, content, metadata, timestamp
+        FROM messages
+        WHERE conversation_id = 42 AND (timestamp, id) > (NOW() - INTERVAL '1 day', 0)
+        ORDER BY timestamp ASC, id ASC
+        LIMIT 51;
+        """,
+    ),
+    (
+        "ocr worker poll",
+        "ocr_queue",
+        """
+        UPDATE ocr_queue
+        SET status = 'worker assigned'
+        WHERE id = (
+            SELECT id
+            FROM ocr_queue
+            WHERE status = 'pending'
+            ORDER BY priority DESC, created_at ASC
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, filepath, json_schema, priority, status;
+        """,
+    ),
+    (
+        "email thread lookup",
+        "email_threads",
+        """
+        SELECT c.id, c.user_id, c.agent
+        FROM email_threads t
+        JOIN conversations c ON c.id = t.conversation_id
+        WHERE t.thread_id = 'thread-123';
+        """,
+    ),
+    (
+        "email thread by conversation",
+        "email_threads",
+        """
+        SELECT thread_id FROM email_threads WHERE conversation_id = 42;
+        """,
+    ),
+    (
+        "whatsapp history",
+        "whatsapp_messages",
+        """
+        SELECT id, conversation_id, body, timestamp
+        FROM whatsapp_messages
+        WHERE conversation_id = 42
+        ORDER BY timestamp DESC
+        LIMIT 20;
+        """,
+    ),
+]
+
+
+def seed(cursor, scale: int):
+    conversations = 20000 * scale
+    messages = 200000 * scale
+    cursor.execute(
+        """
+        INSERT INTO conversations (user_id, agent, title, metadata)
+        SELECT n %% 500, 'seed', 'seed ' || n,
+               CASE WHEN n %% 3 = 0 THEN jsonb_build_object('email_thread_id', 'seed-thread-' || n) ELSE '{}'::jsonb END
+        FROM generate_series(1, %s) AS n
+        RETURNING id;
+        """,
+        (conversations,),
+    )
+    conversation_ids = [row["id"] for row in cursor.fetchall()]
+    cursor.execute(
+        """
+        INSERT INTO messages (conversation_id, timestamp, role, content)
+        SELECT ids[1 + n %% array_length(ids, 1)], NOW() - make_interval(secs => n), 'user', 'seed ' || n
+        FROM generate_series(1, %s) AS n, (SELECT %s::bigint[] AS ids) AS seeded;
+        """,
+        (messages, conversation_ids),
+    )
+    cursor.execute(
+        """
+        INSERT INTO ocr_queue (filepath, status, priority, created_at)
+        SELECT '/tmp/seed-' || n || '.pdf',
+               CASE WHEN n %% 100 = 0 THEN 'pending' ELSE 'done' END,
+               n %% 5, NOW() - make_interval(secs => n)
+        FROM generate_series(1, %s) AS n;
+        """,
+        (50000 * scale,),
+    )
+    cursor.execute(
+        """
+        INSERT INTO email_threads (thread_id, conversation_id)
+        SELECT metadata->>'email_thread_id', id
+        FROM conversations
+        WHERE id = ANY(%s) AND metadata->>'email_thread_id' IS NOT NULL;
+        """,
+        (conversation_ids,),
+    )
+    analyze = ["conversations", "messages", "ocr_queue", "email_threads"]
+
+    if table_exists(cursor, "whatsapp_messages"):
+        cursor.execute(
+            """
+            INSERT INTO whatsapp_messages (whatsapp_id, from_number, body, is_from_me, conversation_id, timestamp)
+            SELECT 'seed-' || n, '91' || (n %% 1000), 'seed ' || n, n %% 2 = 0, n %% %s, NOW() - make_interval(secs => n)
+            FROM generate_series(1, %s) AS n;
+            """,
+            (conversations, messages),
+        )
+        analyze.append("whatsapp_messages")
+
+    for table in analyze:
+        cursor.execute(f"ANALYZE {table};")
+
+
+def table_exists(cursor, table: str) -> bool:
+    cursor.execute("SELECT to_regclass(%s) AS oid;", (table,))
+    return cursor.fetchone()["oid"] is not None
+
+
+def seq_scans(plan: dict) -> list:
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=1, help="Multiplier for the synthetic row counts")
+    parser.add_argument("--verbose", action="store_true", help="Print every plan")
+    args = parser.parse_args()
+
+    failures = 0
+    with get_db_cursor(commit=False, log_queries=False) as cursor:
+        try:
+            seed(cursor, args.scale)
+            for name, table, query in HOT_QUERIES:
+                if not table_exists(cursor, table):
+                    print(f"SKIP  {name}: table {table} does not exist")
+                    continue
+
+                cursor.execute("EXPLAIN (FORMAT JSON) " + query)
+                plan = cursor.fetchone()["QUERY PLAN"][0]["Plan"]
+                if args.verbose:
+                    print(json.dumps(plan, indent=2))
+
+                if table in seq_scans(plan):
+                    failures += 1
+                    print(f"FAIL  {name}: sequential scan on {table}")
+                else:
+                    print(f"OK    {name}")
+        finally:
+            cursor.connection.rollback()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Deterministic generate() latency with and without the response cache.
+
+Runs --requests one-shot generate() calls drawn from --distinct prompts
+(repeated OCR chunks or SO items) against the local fake batching server
+from benchmarks.generate_batching, first on an uncached temperature 0
+client, then on a cached one with an empty cache. Reports p50/p99 per call
+and how many requests reached the server. The cached run should reach the
+server once per distinct prompt.
+
+Requires a reachable Redis (REDIS_HOST / REDIS_PORT / REDIS_DB); the keys
+written expire after VLLM_RESPONSE_CACHE_TTL.
+
+    uv run python -m benchmarks.response_cache --requests 400 --distinct 40 --latency-ms 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from benchmarks.generate_batching import start_server
+from src.agentic.llms.response_cache import CACHE_REQUESTS, RESPONSE_CACHE
+from src.agentic.llms.vllm import VLLM, VLLMOptions
+
+
+async def run(llm: VLLM, prompts: list, concurrency: int) -> list:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(prompt: str):
+        async with semaphore:
+            started = time.perf_counter()
+            await llm.generate(prompt)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(prompt) for prompt in prompts))
+    return latencies
+
+
+async def main_async(args):
+    server = await start_server(args.latency_ms / 1000, args.capacity)
+    port = server.sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+    # A fresh salt per run so earlier runs' Redis entries don't count as hits
+    salt = uuid.uuid4().hex
+    prompts = [f"{salt} item {i % args.distinct}" for i in range(args.requests)]
+
+    print(f"{'mode':<9} {'p50':>9} {'p99':>9} {'server calls':>13}")
+    async with server:
+        for label, cached in (("uncached", False), ("cached", True)):
+            llm = VLLM(model="benchmark", base_url=base_url, options=VLLMOptions(temperature=0), response_cache=cached)
+            misses_before = CACHE_REQUESTS.value(model="benchmark", result="miss")
+            latencies = await run(llm, prompts, args.concurrency)
+            calls = CACHE_REQUESTS.value(model="benchmark", result="miss") - misses_before if cached else len(prompts)
+            p99 = statistics.quantiles(latencies, n=100)[98]
+            print(f"{label:<9} {statistics.median(latencies) * 1000:>7.1f}ms {p99 * 1000:>7.1f}ms {int(calls):>13}")
+            await llm.stop()
+    print(f"local cache: {RESPONSE_CACHE.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--distinct", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--capacity", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Streaming parser: chunk-boundary fuzzing and throughput vs the old parser.
+
+--fuzz N serialises random completion streams (multi-byte text, tool-call
+argument fragments, comments, \\n and \\r\\n line endings, keep-alives) and
+feeds each one to SSEParser split at random boundaries, down to one byte
+per chunk. Every split must decode to exactly the events that were sent;
+the script exits 1 on the first mismatch.
+
+The throughput run starts a local fake OpenAI-compatible server that
+streams --tokens content deltas in --write-size byte writes, and times
+reading the whole stream through VLLM._stream_response against the
+previous buffer-and-resplit loop on the same connection. No LLM needed.
+
+    uv run python -m benchmarks.sse_parser --fuzz 2000
+    uv run python -m benchmarks.sse_parser --tokens 20000 --write-size 64 --repeat 10
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.agentic.llms.sse_parser import SSEParser
+from src.agentic.llms.vllm import VLLM
+
+TEXT = ["hello", " world", " ✓", " naïve", " 数据库", " 🚀", " \"quoted\"", " back\\slash", "\n", ""]
+
+
+def random_event(rng: random.Random) -> dict:
+    if rng.random() < 0.2:
+        arguments = json.dumps({"query": rng.choice(TEXT) * rng.randint(1, 5)})
+        cut = rng.randint(0, len(arguments))
+        return {"choices": [{"index": 0, "delta": {"tool_calls": [
+            {"index": 0, "function": {"arguments": arguments[:cut]}},
+        ]}}]}
+    return {"choices": [{"index": 0, "delta": {"content": rng.choice(TEXT) * rng.randint(0, 20)}}]}
+
+
+def serialise(events: list, rng: random.Random) -> bytes:
+    body = bytearray()
+    for event in events:
+        if rng.random() < 0.05:
+            body += b": keep-alive\n\n"
+        body += b"data: " + json.dumps(event, ensure_ascii=rng.random() < 0.5).encode("utf-8")
+        body += rng.choice((b"\n\n", b"\r\n\r\n", b"\n"))
+    return bytes(body + b"data: [DONE]\n\n")
+
+
+def split(body: bytes, rng: random.Random) -> list:
+    chunks = []
+    index = 0
+    while index < len(body):
+        size = rng.choice((1, 2, 3, 5, 8, 64, 1500, 16384))
+        chunks.append(body[index:index + size])
+        index += size
+    return chunks
+
+
+def fuzz(trials: int, seed: int) -> bool:
+    rng = random.Random(seed)
+    for trial in range(trials):
+        events = [random_event(rng) for _ in range(rng.randint(0, 200))]
+        parser = SSEParser()
+        decoded = []
+        for chunk in split(serialise(events, rng), rng):
+            decoded += parser.feed(chunk)
+        decoded += parser.close()
+        if decoded != events:
+            print(f"trial {trial}: decoded {len(decoded)} events, expected {len(events)}")
+            return False
+    print(f"fuzz: {trials} random splits decoded exactly")
+    return True
+
+
+async def serve_stream(tokens: int, write_size: int):
+    body = b"".join(
+        b"data: " + json.dumps({"choices": [{"index": 0, "delta": {"content": f" token{i}"}}]}).encode() + b"\n\n"
+        for i in range(tokens)
+    ) + b"data: [DONE]\n\n"
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = next((int(line.split(b":")[1]) for line in head.split(b"\r\n") if line.lower().startswith(b"content-length")), 0)
+        await reader.readexactly(length)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+        for index in range(0, len(body), write_size):
+            writer.write(body[index:index + write_size])
+            await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def read_legacy(llm: VLLM, body: dict) -> int:
+    """The previous _stream_response loop: grow the buffer and re-split it per chunk"""
+    received = 0
+    stream_gen = await llm.client.post("/chat/completions", json=body, stream=True, is_async=True)
+    buffer = b""
+    async for chunk in stream_gen:
+        if not chunk:
+            continue
+        buffer += chunk
+        while b"data: " in buffer:
+            parts = buffer.split(b"data: ", 2)
+            if len(parts) < 3:
+                if buffer.count(b"data: ") == 1 and not buffer.startswith(b"data: "):
+                    parts = buffer.split(b"data: ", 1)
+                    buffer = b"data: " + parts[1]
+                    break
+                break
+            process_line = parts[1].strip()
+            if process_line == b"[DONE]":
+                return received
+            try:
+                data = json.loads(process_line.decode("utf-8"))
+                if data["choices"][0]["delta"].get("content", ""):
+                    received += 1
+            except Exception:
+                pass
+            buffer = b"data: " + parts[2]
+    return received
+
+
+async def read_parser(llm: VLLM, body: dict) -> int:
+    received = 0
+    async for _ in llm._stream_response(body):
+        received += 1
+    return received
+
+
+async def throughput(tokens: int, write_size: int, repeat: int):
+    server = await serve_stream(tokens, write_size)
+    port = server.sockets[0].getsockname()[1]
+    llm = VLLM(model="benchmark", base_url=f"http://127.0.0.1:{port}")
+    body = {"model": "benchmark", "messages": [{"role": "user", "content": "hi"}], "stream": True}
+
+    print(f"{'parser':<8} {'tokens':>7} {'p50':>10} {'p99':>10} {'tokens/s':>10}")
+    async with server:
+        for label, read in (("legacy", read_legacy), ("sse", read_parser)):
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                received = await read(llm, dict(body))
+                samples.append(time.perf_counter() - started)
+                if received != tokens:
+                    print(f"{label}: received {received} of {tokens} tokens")
+            p50 = statistics.median(samples)
+            p99 = statistics.quantiles(samples, n=100)[98] if len(samples) > 1 else p50
+            print(f"{label:<8} {tokens:>7} {p50 * 1000:>8.1f}ms {p99 * 1000:>8.1f}ms {tokens / p50:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fuzz", type=int, default=0, help="random split trials; skips the throughput run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--write-size", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.fuzz:
+        sys.exit(0 if fuzz(args.fuzz, args.seed) else 1)
+    asyncio.run(throughput(args.tokens, args.write_size, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
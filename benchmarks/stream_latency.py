@@ -0,0 +1,109 @@
+"""
+Token delivery latency: polling vs pub/sub push.
+
+Simulates a producer appending chunks with append_chunk while N readers
+consume the stream, once with the old LLEN/HGETALL polling loop and once with
+the pub/sub based wait_for_stream_item. Reports p50/p99 delivery latency
+(time from append to a reader seeing the chunk) and Redis commands issued.
+
+Requires a reachable Redis (REDIS_HOST / REDIS_PORT / REDIS_DB).
+
+    uv run python -m benchmarks.stream_latency --readers 20 --tokens 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.utils.redis import (
+    STREAM_KEY_PREFIX,
+    append_chunk,
+    get_message_state,
+    get_redis,
+    update_state,
+    wait_for_stream_item,
+)
+
+
+async def wait_for_stream_item_polling(message_id, start_index, timeout=20, message_type="default"):
+    """The previous implementation: LLEN + HGETALL every 0.5 s."""
+    r = await get_redis()
+    stream_key = STREAM_KEY_PREFIX.format(message_type, message_id)
+    end_time = asyncio.get_event_loop().time() + timeout
+    while asyncio.get_event_loop().time() < end_time:
+        length = await r.llen(stream_key)
+        if length > start_index:
+            return await r.lrange(stream_key, start_index, -1)
+        state = await get_message_state(message_id, message_type=message_type)
+        if state.get("status") in ["done", "error"] and length <= start_index:
+            return []
+        await asyncio.sleep(0.5)
+    return []
+
+
+async def reader(wait_fn, message_id, tokens, latencies):
+    index = 0
+    while index < tokens:
+        items = await wait_fn(message_id, index, timeout=5)
+        received = time.perf_counter()
+        for item in items:
+            latencies.append(received - float(item))
+        index += len(items)
+
+
+async def commands_processed():
+    r = await get_redis()
+    info = await r.info("stats")
+    return int(info["total_commands_processed"])
+
+
+async def run(label, wait_fn, readers, tokens, interval):
+    message_id = f"bench-{uuid.uuid4().hex[:8]}"
+    await update_state(message_id, "processing")
+    latencies = []
+
+    before = await commands_processed()
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(reader(wait_fn, message_id, tokens, latencies)) for _ in range(readers)]
+    await asyncio.sleep(0.2)  # let readers settle into their wait loop
+
+    for _ in range(tokens):
+        await append_chunk(message_id, repr(time.perf_counter()))
+        await asyncio.sleep(interval)
+    await update_state(message_id, "done")
+    await asyncio.gather(*tasks)
+
+    elapsed = time.perf_counter() - started
+    ops = await commands_processed() - before
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(
+        f"{label:<8} p50={p50:8.2f} ms  p99={p99:8.2f} ms  "
+        f"redis ops={ops:7d}  ops/s/reader={ops / elapsed / readers:6.2f}"
+    )
+
+    r = await get_redis()
+    await r.delete(STREAM_KEY_PREFIX.format("default", message_id))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.02, help="Seconds between tokens")
+    args = parser.parse_args()
+
+    await run("polling", wait_for_stream_item_polling, args.readers, args.tokens, args.interval)
+    await run("push", wait_for_stream_item, args.readers, args.tokens, args.interval)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -336,7 +336,8 @@ app.post('/send', async (req, res) => {
 
         console.log(`Stored email from ${process.env.SMTP_USER} successfully to the database ${process.env.APP_DB_NAME} on host ${process.env.APP_DB_HOST}`);
 
-        res.json({ success: true, messageId: info.messageId });
+        // The agent service caches the stored row by id
+        res.json({ success: true, messageId: info.messageId, id: emailRecord.id });
     } catch (err) {
         console.error('Error sending email:', err);
         res.status(500).json({ error: 'Failed to send email' });
@@ -10,9 +10,6 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI()
-
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await startup(app)
@@ -22,6 +19,9 @@ async def lifespan(app: FastAPI):
         await shutdown(app)
 
 
+app = FastAPI(lifespan=lifespan)
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -0,0 +1,35 @@
+"""
+keyset pagination indexes
+"""
+
+from yoyo import step
+
+__depends__ = {'20260305_01_K1TNj-ocr-queue'}
+
+steps = [
+    step(
+        """
+        -- Serves WHERE conversation_id = ? AND (timestamp, id) > (?, ?) ORDER BY timestamp, id
+        CREATE INDEX IF NOT EXISTS idx_messages_conversation_timestamp_id
+            ON messages (conversation_id, timestamp, id);
+
+        -- Covered by the composite index above
+        DROP INDEX IF EXISTS idx_messages_conversation_id;
+
+        -- Serves WHERE user_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC
+        CREATE INDEX IF NOT EXISTS idx_conversations_user_created_at_id
+            ON conversations (user_id, created_at DESC, id DESC);
+
+        DROP INDEX IF EXISTS idx_conversations_user_id;
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_conversations_user_id
+            ON conversations (user_id);
+        DROP INDEX IF EXISTS idx_conversations_user_created_at_id;
+
+        CREATE INDEX IF NOT EXISTS idx_messages_conversation_id
+            ON messages (conversation_id);
+        DROP INDEX IF EXISTS idx_messages_conversation_timestamp_id;
+        """
+    )
+]
@@ -0,0 +1,31 @@
+"""
+hot query indexes
+"""
+
+from yoyo import step
+
+__depends__ = {'20261017_01_Pg7kQ-keyset-pagination-indexes'}
+
+# messages (conversation_id, timestamp DESC) history reads are already served
+# by idx_messages_conversation_timestamp_id, scanned backwards.
+
+steps = [
+    step(
+        """
+        -- OCR worker poll: WHERE status = 'pending' ORDER BY priority DESC, created_at ASC LIMIT 1
+        CREATE INDEX IF NOT EXISTS idx_ocr_queue_pending
+            ON ocr_queue (priority DESC, created_at ASC)
+            WHERE status = 'pending';
+        """,
+        "DROP INDEX IF EXISTS idx_ocr_queue_pending;"
+    ),
+    step(
+        """
+        -- Email thread lookup: WHERE metadata->>'email_thread_id' = ?
+        CREATE INDEX IF NOT EXISTS idx_conversations_email_thread_id
+            ON conversations ((metadata->>'email_thread_id'))
+            WHERE metadata->>'email_thread_id' IS NOT NULL;
+        """,
+        "DROP INDEX IF EXISTS idx_conversations_email_thread_id;"
+    ),
+]
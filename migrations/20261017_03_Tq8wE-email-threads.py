@@ -0,0 +1,41 @@
+"""
+email threads
+"""
+
+from yoyo import step
+
+__depends__ = {'20261017_02_Rb2sN-hot-query-indexes'}
+
+steps = [
+    step(
+        """
+        CREATE TABLE email_threads (
+            thread_id TEXT PRIMARY KEY,
+            conversation_id BIGINT NOT NULL UNIQUE REFERENCES conversations(id) ON DELETE CASCADE,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+
+        -- Backfill from conversation metadata; where the old check-then-create
+        -- race left several conversations per thread, the oldest one wins
+        INSERT INTO email_threads (thread_id, conversation_id)
+        SELECT DISTINCT ON (metadata->>'email_thread_id') metadata->>'email_thread_id', id
+        FROM conversations
+        WHERE metadata->>'email_thread_id' IS NOT NULL
+        ORDER BY metadata->>'email_thread_id', id;
+        """,
+        """
+        DROP TABLE IF EXISTS email_threads;
+        """
+    ),
+    step(
+        """
+        -- Thread lookups go through email_threads now; nothing reads this index
+        DROP INDEX IF EXISTS idx_conversations_email_thread_id;
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_conversations_email_thread_id
+            ON conversations ((metadata->>'email_thread_id'))
+            WHERE metadata->>'email_thread_id' IS NOT NULL;
+        """
+    ),
+]
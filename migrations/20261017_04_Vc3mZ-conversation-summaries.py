@@ -0,0 +1,30 @@
+"""
+conversation summaries
+"""
+
+from yoyo import step
+
+__depends__ = {'20261017_03_Tq8wE-email-threads'}
+
+steps = [
+    step(
+        """
+        -- Rolling summary of the turns that no longer fit in an agent's
+        -- history budget. (covered_until, covered_id) is the (timestamp, id)
+        -- key of the newest message folded in so far.
+        CREATE TABLE conversation_summaries (
+            conversation_id BIGINT NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+            message_type TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            covered_until TIMESTAMPTZ NOT NULL,
+            covered_id BIGINT NOT NULL,
+            token_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (conversation_id, message_type)
+        );
+        """,
+        """
+        DROP TABLE IF EXISTS conversation_summaries;
+        """
+    )
+]
@@ -1,5 +1,6 @@
 import os
-from typing import List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from RAW.agent import Agent
 from RAW.modals import Message
 from src.agentic.llms.primary import get_primary_llm
@@ -7,47 +8,70 @@ from src.utils import logger, get_db_cursor
 from src.agentic.tools.database import __all__ as db_tools_list
 from src.agentic.tools import database as db_tools_module
 
+DB_INFO_DIR = os.path.join("src", "db_info")
+
+# path -> (mtime, content); a file is re-read only after it changes on disk
+_schema_cache: Dict[str, Tuple[float, str]] = {}
+# directory mtime -> schema file names, so new files are picked up too
+_listing_cache: Tuple[float, List[str]] = (-1.0, [])
+
+# Dynamically load all tools exported in src.agentic.tools.database
+DB_TOOLS = [getattr(db_tools_module, tool_name) for tool_name in db_tools_list]
+
 def load_db_schema(file_path: str) -> str:
     """
     Load the database schema file content.
     Returns string content or empty string if file not found.
     """
-    if os.path.exists(file_path):
-        with open(file_path, "r", encoding="utf-8") as f:
-            return f.read()
-    return f"Schema file {file_path} not found."
-
-def get_database_agent(user_id: int = None, history: List[Message] = [], module: str = None, message_type: str = "default") -> Agent:
-    db_info_dir = os.path.join("src", "db_info")
-    db_schemas = []
-
-    # Ensure the directory exists
-    if not os.path.exists(db_info_dir):
-        os.makedirs(db_info_dir, exist_ok=True)
-
+    try:
+        mtime = os.stat(file_path).st_mtime
+    except FileNotFoundError:
+        return f"Schema file {file_path} not found."
+
+    cached = _schema_cache.get(file_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    _schema_cache[file_path] = (mtime, content)
+    return content
+
+def list_schema_files() -> List[str]:
+    global _listing_cache
+    if not os.path.exists(DB_INFO_DIR):
+        os.makedirs(DB_INFO_DIR, exist_ok=True)
+
+    mtime = os.stat(DB_INFO_DIR).st_mtime
+    if _listing_cache[0] != mtime:
+        files = sorted(f for f in os.listdir(DB_INFO_DIR) if f.endswith(".txt"))
+        _listing_cache = (mtime, files)
+    return _listing_cache[1]
+
+def get_schema_info(module: Optional[str] = None) -> str:
     # Load only the schema for the selected module
     if module:
-        schema_file = f"{module}.txt"
-        file_path = os.path.join(db_info_dir, schema_file)
-        schema_content = load_db_schema(file_path)
-        db_schemas.append(f"--- {schema_file} ---\n{schema_content}")
+        schema_files = [f"{module}.txt"]
     else:
         # fallback - if module not provided, load all
         try:
-            for schema_file in os.listdir(db_info_dir):
-                if schema_file.endswith(".txt"):
-                    file_path = os.path.join(db_info_dir, schema_file)
-                    schema_content = load_db_schema(file_path)
-                    db_schemas.append(f"--- {schema_file} ---\n{schema_content}")
+            schema_files = list_schema_files()
         except Exception as e:
             logger.error(f"Error reading db_info directory: {e}")
+            schema_files = []
 
-    combined_db_schema_info = "\n\n".join(db_schemas)
-
+    db_schemas = []
+    for schema_file in schema_files:
+        schema_content = load_db_schema(os.path.join(DB_INFO_DIR, schema_file))
+        db_schemas.append(f"--- {schema_file} ---\n{schema_content}")
+    return "\n\n".join(db_schemas)
 
-    base_prompt = f"""
+# The prompt is laid out static-first so vLLM's automatic prefix caching can
+# reuse the KV cache across conversations: the rules are identical for every
+# turn, the schema block only varies by module, and per-turn values go last.
+STATIC_PROMPT = """
 You are a highly capable Database Assistant Agent. You have DIRECT access to databases through your provided tools.
-CURRENT_MESSAGE_TYPE: {message_type}
+The CURRENT_MESSAGE_TYPE for this conversation is given at the end of these instructions.
 
 ### 🚨 CRITICAL SCHEMA VERIFICATION RULE:
 You MUST ALWAYS call the `get_schema` tool FIRST for any table you intend to query. 
@@ -69,9 +93,6 @@ You MUST ALWAYS call the `get_schema` tool FIRST for any table you intend to que
    - **Step 3**: Execute the query using `execute_query`.
 3. **Target Context**: You are primarily working with the 'erp' database.
 
-### DATABASE SCHEMA & SPECIFIC LOGIC (READ CAREFULLY):
-{combined_db_schema_info}
-
 ### RESPONSE FORMAT (MANDATORY):
 - All final responses MUST be in valid Markdown.
 - **FOR GENERAL QUERIES**: Include sections: 1. **Result Summary**, 2. **Notes / Assumptions**.
@@ -89,17 +110,32 @@ If the user's message is an incoming email and contains "po reference" followed
 Proceed with the user's request. Remember: If the database is empty or the query fails, say so. DO NOT MAKE UP RESULTS.
 """
 
-    llm = get_primary_llm()
-    
-    # Dynamically load all tools exported in src.agentic.tools.database
-    tools = [getattr(db_tools_module, tool_name) for tool_name in db_tools_list]
+SCHEMA_TEMPLATE = """
+### DATABASE SCHEMA & SPECIFIC LOGIC (READ CAREFULLY):
+{schema}
+"""
+
+TURN_TEMPLATE = """
+### TURN CONTEXT:
+CURRENT_MESSAGE_TYPE: {message_type}
+"""
+
+@lru_cache(maxsize=32)
+def build_prompt(message_type: str, schema: str) -> str:
+    """
+    Render the prompt; cached, so a turn with unchanged schema files reuses the same string.
+    """
+    return STATIC_PROMPT + SCHEMA_TEMPLATE.format(schema=schema) + TURN_TEMPLATE.format(message_type=message_type)
+
+def get_database_agent(user_id: int = None, history: List[Message] = [], module: str = None, message_type: str = "default") -> Agent:
+    base_prompt = build_prompt(message_type, get_schema_info(module))
 
     bot = Agent(
         name="Database agent",
         base_prompt=base_prompt,
-        llm=llm,
+        llm=get_primary_llm(),
         logger=logger,
-        tools=tools,
+        tools=list(DB_TOOLS),
         history=history
     )
 
@@ -1,5 +1,6 @@
 import os
 from datetime import date
+from functools import lru_cache
 from typing import List, Optional
 from RAW.agent import Agent
 from RAW.modals import Message
@@ -9,12 +10,15 @@ from src.utils import logger
 from src.agentic.tools.inquiry import __all__ as inquiry_tools
 from src.agentic.tools import inquiry as inquiry_tools_module
 
-def get_inquiry_agent(user_id: int, history: List[Message] = []) -> Agent:
-    name = "Inquiry Agent"
-    llm = get_primary_llm()
+NAME = "Inquiry Agent"
+
+# Dynamically load tools as you defined
+INQUIRY_TOOLS = [getattr(inquiry_tools_module, tool_name) for tool_name in inquiry_tools]
 
-    base_prompt = f"""
-You are the {name}, a highly organized technical assistant. Your goal is to gather all data required to create a formal product inquiry.
+# Static instructions first and the date last, so the prefix vLLM caches
+# stays identical across conversations and days.
+STATIC_PROMPT = f"""
+You are the {NAME}, a highly organized technical assistant. Your goal is to gather all data required to create a formal product inquiry.
 
 ### ANTI-HALLUCINATION GUARDRAILS (STRICT):
 1. **NO EXTERNAL KNOWLEDGE**: Do not use your own knowledge for IDs, Products, or Units of Measure.
@@ -53,19 +57,24 @@ You are the {name}, a highly organized technical assistant. Your goal is to gath
 - **Price**: Never provide prices. Only collect the user's "Target Price".
 - **Source**: Static value "WHATSAPP".
 - **List Formatting**: Always number your lists (a, b, c...). Do NOT use these list numbers as IDs. Use the actual database IDs for tool calls.
+"""
 
+TURN_TEMPLATE = """
 ### SYSTEM CONTEXT:
-- Today's Date: {date.today()}
+- Today's Date: {today}
 """
 
-    # Dynamically load tools as you defined
-    tools = [getattr(inquiry_tools_module, tool_name) for tool_name in inquiry_tools]
+@lru_cache(maxsize=2)
+def build_prompt(today: date) -> str:
+    """Render the prompt once per day"""
+    return STATIC_PROMPT + TURN_TEMPLATE.format(today=today)
 
+def get_inquiry_agent(user_id: int, history: List[Message] = []) -> Agent:
     return Agent(
-        name=name,
-        base_prompt=base_prompt,
-        llm=llm,
+        name=NAME,
+        base_prompt=build_prompt(date.today()),
+        llm=get_primary_llm(),
         logger=logger,
-        tools=tools,
+        tools=list(INQUIRY_TOOLS),
         history=history
-    )
\ No newline at end of file
+    )
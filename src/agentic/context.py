@@ -0,0 +1,297 @@
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from RAW.modals import Message
+from src.utils import logger
+from src.utils.history_cache import CachedMessage, to_cached
+from src.utils.pagination import Cursor
+from src.utils.redis import get_redis
+from src.services.summary_service import SummaryService
+from src.models.conversations import ConversationSummary
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    Tokenizer = None
+
+# -------------------------
+# Context window
+# -------------------------
+# Each agent gets a token budget for its history. The newest turns that fit
+# are sent as-is (oversized messages cut down to MAX_MESSAGE_TOKENS); older
+# turns are folded into a per-conversation summary that a background task
+# refreshes a batch at a time, so the prompt stays bounded however long a
+# thread runs.
+
+# Tokenizer of the served model; downloaded once into the Hugging Face cache,
+# or read from TOKENIZER_PATH on hosts without hub access. Without the
+# tokenizers package, tokens are estimated from the text length.
+TOKENIZER_NAME = os.getenv("TOKENIZER_NAME", os.getenv("VLLM_MODEL", "Qwen/Qwen2.5-32B-Instruct-AWQ"))
+TOKENIZER_PATH = os.getenv("TOKENIZER_PATH")
+CHARS_PER_TOKEN = 4
+# Chat template tokens around each message
+MESSAGE_OVERHEAD = 4
+
+# History token budget by agent name prefix, as dispatched in invoke_agent
+HISTORY_TOKEN_BUDGETS: Dict[str, int] = {
+    "DatabaseAgent": int(os.getenv("DATABASE_AGENT_HISTORY_TOKENS", 6000)),
+    "inquiry": int(os.getenv("INQUIRY_AGENT_HISTORY_TOKENS", 4000)),
+}
+DEFAULT_HISTORY_TOKENS = int(os.getenv("HISTORY_TOKEN_BUDGET", 3000))
+MAX_MESSAGE_TOKENS = int(os.getenv("MAX_HISTORY_MESSAGE_TOKENS", 1500))
+TRUNCATION_MARKER = "\n[... truncated]"
+
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", 600))
+# Refresh once at least this many turns are waiting to be folded in
+SUMMARY_REFRESH_MIN_MESSAGES = int(os.getenv("SUMMARY_REFRESH_MIN_MESSAGES", 4))
+# Turns folded in per refresh
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", 40))
+SUMMARY_LOCK_KEY = "summary:lock:{}:{}"
+SUMMARY_LOCK_TTL = 300
+
+SUMMARY_PROMPT = """
+Update the running summary of a conversation between a user and an assistant with the new messages below.
+Keep everything later turns may depend on: names, IDs, quantities, decisions, results and open requests. Drop greetings and repetition.
+Reply with the updated summary only, in at most {max_words} words.
+
+### CURRENT SUMMARY:
+{summary}
+
+### NEW MESSAGES:
+{messages}
+"""
+
+# Strong references to running refreshes so they aren't garbage collected
+_refresh_tasks = set()
+
+# Token counts of recently seen texts, keyed by a digest of the text so
+# long emails aren't kept alive by the cache
+TOKEN_COUNT_CACHE_SIZE = 4096
+_token_counts: "OrderedDict[bytes, int]" = OrderedDict()
+_token_counts_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    if Tokenizer is None:
+        logger.warning("tokenizers is not installed, estimating token counts from text length")
+        return None
+    try:
+        if TOKENIZER_PATH:
+            return Tokenizer.from_file(TOKENIZER_PATH)
+        return Tokenizer.from_pretrained(TOKENIZER_NAME)
+    except Exception as e:
+        logger.warning(f"Tokenizer {TOKENIZER_NAME} unavailable, estimating token counts from text length: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+
+    key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _token_counts_lock:
+        count = _token_counts.get(key)
+        if count is not None:
+            _token_counts.move_to_end(key)
+            return count
+
+    count = len(tokenizer.encode(text, add_special_tokens=False).ids)
+    with _token_counts_lock:
+        _token_counts[key] = count
+        if len(_token_counts) > TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return count
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Keep the head of text, at most max_tokens long"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        end = max_tokens * CHARS_PER_TOKEN
+    else:
+        end = tokenizer.encode(text, add_special_tokens=False).offsets[max_tokens - 1][1]
+    return text[:end] + TRUNCATION_MARKER
+
+
+def get_history_budget(agent_name: str) -> int:
+    for prefix, budget in HISTORY_TOKEN_BUDGETS.items():
+        if agent_name.startswith(prefix):
+            return budget
+    return DEFAULT_HISTORY_TOKENS
+
+
+def fit_history(messages: List[CachedMessage], budget: int) -> Tuple[List[CachedMessage], List[CachedMessage]]:
+    """
+    Split messages (oldest first) into the ones left out and the newest run
+    that fits in budget, with oversized contents truncated.
+    """
+    kept = []
+    used = 0
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        content = truncate_to_tokens(message["content"], MAX_MESSAGE_TOKENS)
+        cost = count_tokens(content) + MESSAGE_OVERHEAD
+        if used + cost > budget:
+            return messages[:index + 1], kept[::-1]
+        used += cost
+        kept.append({**message, "content": content})
+    return [], kept[::-1]
+
+
+def _ts(value: Any) -> datetime:
+    """Timestamps come back from the cache as ISO strings; compare them as aware datetimes"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _key(message: CachedMessage) -> Cursor:
+    """(timestamp, id) sort key; messages can share a timestamp, the id breaks the tie"""
+    return _ts(message["timestamp"]), int(message["id"])
+
+
+def _covered(summary: Optional[ConversationSummary]) -> Optional[Cursor]:
+    return (_ts(summary.covered_until), summary.covered_id) if summary else None
+
+
+async def build_history(
+    conversation_id: int,
+    message_type: str,
+    agent_name: str,
+    messages: List[CachedMessage],
+    fetch_range: Callable[[Optional[Cursor], Cursor, int], Awaitable[List[Any]]],
+    window_full: bool = False,
+) -> List[Message]:
+    """
+    Agent history for a turn: the stored summary followed by the newest
+    messages that fit in the agent's budget. Schedules a summary refresh when
+    turns outside the history aren't covered by the summary yet.
+
+    messages are oldest first. fetch_range(after, before, limit) returns up
+    to limit stored messages strictly between the (timestamp, id) keys
+    `after` (None: from the start) and `before`, oldest first. window_full
+    says whether messages is a truncated window, so older turns may exist
+    beyond it.
+    """
+    try:
+        summary = await SummaryService.get_summary_async(conversation_id, message_type)
+    except Exception as e:
+        logger.error(f"Failed to load summary for conversation {conversation_id}: {e}")
+        summary = None
+
+    summary_message = None
+    budget = get_history_budget(agent_name)
+    if summary:
+        summary_message = Message(role="system", content=f"Summary of the earlier conversation:\n{summary.summary}")
+        budget -= summary.token_count + MESSAGE_OVERHEAD
+
+    # Tokenizing long emails is CPU work; keep it off the event loop
+    dropped, kept = await asyncio.to_thread(fit_history, messages, max(budget, 0))
+    logger.debug(f"Conversation {conversation_id}: {len(kept)} messages in history, {len(dropped)} left to the summary")
+
+    covered = _covered(summary)
+
+    def uncovered(message: CachedMessage) -> bool:
+        return covered is None or _key(message) > covered
+
+    if (dropped and uncovered(dropped[-1])) or (window_full and messages and uncovered(messages[0])):
+        # Everything before the first message sent as-is
+        if kept:
+            boundary = _key(kept[0])
+        else:
+            timestamp, id = _key(messages[-1])
+            boundary = (timestamp + timedelta(microseconds=1), id)
+        schedule_summary_refresh(conversation_id, message_type, boundary, summary, fetch_range)
+
+    history = [Message(role=m["role"], content=m["content"]) for m in kept]
+    return [summary_message, *history] if summary_message else history
+
+
+def schedule_summary_refresh(
+    conversation_id: int,
+    message_type: str,
+    boundary: Cursor,
+    summary: Optional[ConversationSummary],
+    fetch_range: Callable[[Optional[Cursor], Cursor, int], Awaitable[List[Any]]],
+):
+    task = asyncio.create_task(refresh_summary(conversation_id, message_type, boundary, summary, fetch_range))
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+async def refresh_summary(
+    conversation_id: int,
+    message_type: str,
+    boundary: Cursor,
+    summary: Optional[ConversationSummary],
+    fetch_range: Callable[[Optional[Cursor], Cursor, int], Awaitable[List[Any]]],
+):
+    """
+    Fold the oldest messages before boundary that the summary doesn't cover
+    yet into it, at most SUMMARY_BATCH_SIZE of them; the covered key moves
+    to the last one folded, so the next refresh carries on from there. One
+    refresh per conversation at a time across all replicas.
+    """
+    lock_key = SUMMARY_LOCK_KEY.format(message_type, conversation_id)
+    try:
+        r = await get_redis()
+        if not await r.set(lock_key, "1", nx=True, ex=SUMMARY_LOCK_TTL):
+            return
+    except Exception as e:
+        logger.error(f"Summary lock failed for conversation {conversation_id}: {e}")
+        return
+
+    try:
+        pending = sorted(
+            (to_cached(m) for m in await fetch_range(_covered(summary), boundary, SUMMARY_BATCH_SIZE)),
+            key=_key,
+        )
+        if len(pending) < SUMMARY_REFRESH_MIN_MESSAGES:
+            return
+
+        text = await summarize(summary.summary if summary else "", pending)
+        covered_until, covered_id = _key(pending[-1])
+        stored = await SummaryService.save_summary_async(
+            conversation_id, message_type, text, covered_until, covered_id, await asyncio.to_thread(count_tokens, text),
+        )
+        if stored:
+            logger.info(f"Summary of conversation {conversation_id} now covers {len(pending)} more messages")
+    except Exception as e:
+        logger.error(f"Summary refresh failed for conversation {conversation_id}: {e}")
+    finally:
+        try:
+            await r.delete(lock_key)
+        except Exception as e:
+            logger.error(f"Failed to release summary lock {lock_key}: {e}")
+
+
+async def summarize(summary: str, messages: List[CachedMessage]) -> str:
+    from src.agentic.llms.primary import get_primary_llm
+
+    # Tokenizing a batch of long emails is CPU work; keep it off the event loop
+    transcript = await asyncio.to_thread(_transcript, messages)
+    prompt = SUMMARY_PROMPT.format(
+        max_words=SUMMARY_MAX_TOKENS * 3 // 4,
+        summary=summary or "(none yet)",
+        messages=transcript,
+    )
+    text = await get_primary_llm().generate(prompt)
+    return await asyncio.to_thread(truncate_to_tokens, str(text).strip(), SUMMARY_MAX_TOKENS)
+
+
+def _transcript(messages: List[CachedMessage]) -> str:
+    return "\n\n".join(
+        f"{m['role'].upper()}: {truncate_to_tokens(m['content'], MAX_MESSAGE_TOKENS)}" for m in messages
+    )
@@ -0,0 +1,72 @@
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from src.utils.metrics import Histogram
+
+BATCH_SIZE = Histogram(
+    "llm_generate_batch_size", "One-shot generate calls dispatched together", ["model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+
+class GenerateBatcher:
+    """
+    Collects one-shot requests made within `window` seconds of each other
+    and dispatches them together, so the server's continuous batching sees a
+    full batch instead of one request after another. How many are in flight
+    at once is limited per endpoint by the client. Each caller gets back the
+    result (or exception) of its own request.
+
+    Requests run in their caller's context, so its deadline and routing
+    key apply. State is bound to the running event loop and rebuilt if the
+    client is used from a new one.
+    """
+
+    def __init__(self, dispatch: Callable[[Dict], Awaitable[Any]], model: str, window: float):
+        self._dispatch = dispatch
+        self.model = model
+        self.window = window
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._pending: List[Tuple[Dict, asyncio.Future, contextvars.Context]] = []
+        self._timer: Optional[asyncio.Task] = None
+        # Strong references to running requests
+        self._tasks = set()
+
+    async def submit(self, body: Dict) -> Any:
+        self._bind()
+        future = self._loop.create_future()
+        self._pending.append((body, future, contextvars.copy_context()))
+        if self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        batch, self._pending = self._pending, []
+        self._timer = None
+        BATCH_SIZE.observe(len(batch), model=self.model)
+
+        for body, future, context in batch:
+            if future.cancelled():
+                continue
+            task = asyncio.create_task(self._run(body, future), context=context)
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            # A caller that gives up cancels its request too
+            future.add_done_callback(lambda f, task=task: task.cancel() if f.cancelled() else None)
+
+    async def _run(self, body: Dict, future: asyncio.Future):
+        try:
+            result = await self._dispatch(body)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
@@ -1,13 +1,14 @@
 import os
-from .vllm import VLLM
+from .vllm import VLLM, get_shared_vllm
 from src.utils import logger
 
-def get_primary_llm() -> VLLM:
+def get_primary_llm(deterministic: bool = False) -> VLLM:
     """
-    Returns the primary LLM instance (VLLM).
+    Returns the primary LLM instance (VLLM), shared per model and host.
+    deterministic=True returns the temperature 0 client whose one-shot
+    responses are cached.
     """
     vllm_host = os.environ.get("VLLM_HOST", "http://127.0.0.1:11434")
     model_name = os.environ.get("VLLM_MODEL", "Qwen/Qwen2.5-32B-Instruct-AWQ")
     
-    logger.info(f"Initializing VLLM with model: {model_name} at {vllm_host}")
-    return VLLM(model=model_name, base_url=vllm_host, logger=logger)
+    return get_shared_vllm(model_name, vllm_host, logger, deterministic=deterministic)
@@ -0,0 +1,199 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional
+from src.utils.metrics import Counter
+
+# -------------------------
+# Errors
+# -------------------------
+# Subclasses of RuntimeError, which is what the client raised before, so
+# existing `except RuntimeError` handlers keep working.
+
+class VLLMError(RuntimeError):
+    """A failed LLM call. status is the HTTP status when the server answered."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class DeadlineExceeded(VLLMError):
+    """The call's deadline passed before the server answered"""
+
+
+class CircuitOpenError(VLLMError):
+    """Every endpoint that could serve the call has its circuit breaker open"""
+
+
+# -------------------------
+# Deadlines
+# -------------------------
+# A job sets its time budget once; every LLM call made by the job (and by
+# the tasks it starts) gets whatever is left of it as its timeout.
+
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+def set_deadline(seconds: Optional[float]) -> None:
+    """
+    Give LLM calls of the current task, and of tasks it starts, `seconds`
+    from now to finish. Never extends a deadline already set; None clears it.
+    """
+    if seconds is None:
+        _deadline.set(None)
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    _deadline.set(deadline if current is None else min(current, deadline))
+
+def time_left() -> Optional[float]:
+    """Seconds until the current deadline, or None without one"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+# -------------------------
+# Circuit breaker
+# -------------------------
+# Per endpoint. Opens when at least VLLM_BREAKER_ERROR_RATE of the last
+# VLLM_BREAKER_WINDOW calls failed (once VLLM_BREAKER_MIN_CALLS have been
+# seen), rejects calls for VLLM_BREAKER_OPEN_SECONDS, then lets a single
+# probe through: closed again if it succeeds, open again if it fails. While
+# open only that probe's outcome counts, not calls sent before the breaker
+# opened that finish late. A probe given up without an outcome (cancelled,
+# out of job time) is released at once; one that never reports back is
+# replaced after the same time.
+VLLM_BREAKER_WINDOW = int(os.getenv("VLLM_BREAKER_WINDOW", 20))
+VLLM_BREAKER_MIN_CALLS = int(os.getenv("VLLM_BREAKER_MIN_CALLS", 10))
+VLLM_BREAKER_ERROR_RATE = float(os.getenv("VLLM_BREAKER_ERROR_RATE", 0.5))
+VLLM_BREAKER_OPEN_SECONDS = float(os.getenv("VLLM_BREAKER_OPEN_SECONDS", 15))
+
+BREAKER_OPENS = Counter("llm_breaker_opens_total", "Times an LLM endpoint's circuit breaker opened", ["endpoint"])
+BREAKER_REJECTIONS = Counter("llm_breaker_rejections_total", "Calls refused because an endpoint's circuit breaker was open", ["endpoint"])
+
+class CircuitBreaker:
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.outcomes: Deque[bool] = deque(maxlen=VLLM_BREAKER_WINDOW)
+        self.opened_at: Optional[float] = None
+        self.probe_started: Optional[float] = None
+        # Number of the latest half-open probe
+        self.probe = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < VLLM_BREAKER_OPEN_SECONDS:
+            return "open"
+        return "half_open"
+
+    @property
+    def available(self) -> bool:
+        """Whether allow() would let a call through, without claiming the probe"""
+        state = self.state
+        if state != "half_open":
+            return state == "closed"
+        return self.probe_started is None or time.monotonic() - self.probe_started >= VLLM_BREAKER_OPEN_SECONDS
+
+    def allow(self) -> Optional[int]:
+        """
+        None if the call is refused, else the token to pass to record():
+        0 for a call through the closed breaker, the probe's number for the
+        half-open probe.
+        """
+        if self.available:
+            if self.opened_at is None:
+                return 0
+            self.probe += 1
+            self.probe_started = time.monotonic()
+            return self.probe
+        BREAKER_REJECTIONS.inc(endpoint=self.endpoint)
+        return None
+
+    def record(self, ok: bool, token: int):
+        if self.opened_at is not None:
+            # Only the current half-open probe decides
+            if token != self.probe or self.probe_started is None:
+                return
+            self.probe_started = None
+            if ok:
+                self.opened_at = None
+                self.outcomes.clear()
+            else:
+                self.opened_at = time.monotonic()
+            return
+
+        self.outcomes.append(ok)
+        if len(self.outcomes) < VLLM_BREAKER_MIN_CALLS:
+            return
+        errors = self.outcomes.count(False)
+        if errors / len(self.outcomes) >= VLLM_BREAKER_ERROR_RATE:
+            self.opened_at = time.monotonic()
+            BREAKER_OPENS.inc(endpoint=self.endpoint)
+
+    def release(self, token: int):
+        """End a call without an outcome; a probe's slot goes to the next call"""
+        if self.opened_at is not None and token == self.probe:
+            self.probe_started = None
+
+
+# -------------------------
+# Hedged requests
+# -------------------------
+# A one-shot call still unanswered after the VLLM_HEDGE_QUANTILE of recent
+# call latencies is sent again (to another replica when there is one) and
+# whichever copy answers first is used. Each call earns VLLM_HEDGE_BUDGET
+# of a hedge, so duplicates stay a small share of the load even when every
+# call is slow.
+VLLM_HEDGE = os.getenv("VLLM_HEDGE", "false").lower() in ("1", "true", "yes")
+VLLM_HEDGE_QUANTILE = float(os.getenv("VLLM_HEDGE_QUANTILE", 0.95))
+VLLM_HEDGE_BUDGET = float(os.getenv("VLLM_HEDGE_BUDGET", 0.1))
+VLLM_HEDGE_MIN_SAMPLES = int(os.getenv("VLLM_HEDGE_MIN_SAMPLES", 20))
+VLLM_HEDGE_WINDOW = int(os.getenv("VLLM_HEDGE_WINDOW", 200))
+# Unused budget kept for bursts
+HEDGE_MAX_TOKENS = 10
+
+HEDGED_REQUESTS = Counter("llm_hedged_requests_total", "Duplicate requests sent after the hedge delay, by the copy that answered first", ["model", "winner"])
+
+class HedgePolicy:
+    def __init__(self):
+        self.samples: Deque[float] = deque(maxlen=VLLM_HEDGE_WINDOW)
+        self.tokens = 0.0
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self.tokens = min(self.tokens + VLLM_HEDGE_BUDGET, HEDGE_MAX_TOKENS)
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there are too few samples"""
+        if len(self.samples) < VLLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * VLLM_HEDGE_QUANTILE), len(ordered) - 1)]
+
+    def take(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+async def wait_first(first: asyncio.Task, second: asyncio.Task) -> asyncio.Task:
+    """
+    The first of two attempts to succeed, cancelling the other. If both
+    fail, the first attempt, so awaiting it raises its error.
+    """
+    pending = {first, second}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task
+        return first
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,165 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from src.utils import logger
+from src.utils.metrics import Counter
+from src.utils.redis import get_redis
+from .resilience import DeadlineExceeded, set_deadline, time_left
+
+# -------------------------
+# LLM response cache
+# -------------------------
+# Responses to deterministic (temperature 0) one-shot requests, keyed by a
+# hash of the full request body: model, prompt, images, schema and sampling
+# options. A per-process LRU bounded in bytes sits in front of Redis, which
+# is shared by every replica and expires entries after a TTL.
+#
+# A miss is computed in a task owned by the cache, which identical
+# concurrent requests wait on together. It isn't bound by the deadline of
+# the job that asked first: each caller applies its own, and a caller that
+# gives up or is cancelled leaves the call running for the others (and for
+# the cache).
+
+RESPONSE_CACHE_KEY_PREFIX = "llm:response:{}"
+# Bump when the request body layout changes so old entries aren't reused
+RESPONSE_CACHE_VERSION = 1
+RESPONSE_CACHE_LOCAL_BYTES = int(os.getenv("VLLM_RESPONSE_CACHE_LOCAL_BYTES", 32 * 1024 * 1024))
+RESPONSE_CACHE_TTL = int(os.getenv("VLLM_RESPONSE_CACHE_TTL", 7 * 24 * 3600))
+# Larger responses are neither cached locally nor sent to Redis
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("VLLM_RESPONSE_CACHE_MAX_ENTRY_BYTES", 1024 * 1024))
+
+CACHE_REQUESTS = Counter(
+    "llm_response_cache_requests_total",
+    "Response cache lookups by result (local, redis, in_flight, miss)",
+    ["model", "result"],
+)
+
+
+def cache_key(body: Dict) -> str:
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(f"{RESPONSE_CACHE_VERSION}:{canonical}".encode("utf-8")).hexdigest()
+
+
+def is_deterministic(body: Dict) -> bool:
+    return body.get("temperature") == 0 and not body.get("stream")
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_LOCAL_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # key -> (serialised size, response)
+        self._local: "OrderedDict[str, Tuple[int, Any]]" = OrderedDict()
+        # key -> task computing the response, so identical concurrent requests share one call
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    def _get_local(self, key: str) -> Optional[Any]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        self._local.move_to_end(key)
+        return entry[1]
+
+    def _set_local(self, key: str, value: Any, size: int):
+        if key in self._local:
+            self.bytes -= self._local.pop(key)[0]
+        self._local[key] = (size, value)
+        self.bytes += size
+        while self.bytes > self.max_bytes and self._local:
+            _, (evicted, _) = self._local.popitem(last=False)
+            self.bytes -= evicted
+
+    async def get(self, key: str, model: str) -> Optional[Any]:
+        value = self._get_local(key)
+        if value is not None:
+            CACHE_REQUESTS.inc(model=model, result="local")
+            return value
+
+        try:
+            r = await get_redis()
+            raw = await r.get(RESPONSE_CACHE_KEY_PREFIX.format(key))
+        except Exception as e:
+            logger.error(f"Response cache read failed: {e}")
+            raw = None
+        if raw is None:
+            CACHE_REQUESTS.inc(model=model, result="miss")
+            return None
+
+        value = json.loads(raw)
+        self._set_local(key, value, len(raw))
+        CACHE_REQUESTS.inc(model=model, result="redis")
+        return value
+
+    async def set(self, key: str, value: Any):
+        raw = json.dumps(value, ensure_ascii=False)
+        if len(raw) > RESPONSE_CACHE_MAX_ENTRY_BYTES:
+            return
+        self._set_local(key, value, len(raw))
+        try:
+            r = await get_redis()
+            await r.set(RESPONSE_CACHE_KEY_PREFIX.format(key), raw, ex=RESPONSE_CACHE_TTL)
+        except Exception as e:
+            logger.error(f"Response cache write failed: {e}")
+
+    async def fetch(self, body: Dict, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached response for body, or compute() it once and cache it"""
+        key = cache_key(body)
+        model = body.get("model", "")
+        task = self._in_flight.get(key)
+        if task is not None:
+            CACHE_REQUESTS.inc(model=model, result="in_flight")
+            return await _wait(task)
+
+        value = await self.get(key, model)
+        if value is not None:
+            return value
+
+        # The lookup yielded to the loop; another caller may have started the same request
+        task = self._in_flight.get(key)
+        if task is None:
+            task = self._start(key, compute)
+        return await _wait(task)
+
+    def _start(self, key: str, compute: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        context = contextvars.copy_context()
+        context.run(set_deadline, None)
+        task = asyncio.create_task(self._compute(key, compute), context=context)
+        self._in_flight[key] = task
+        task.add_done_callback(_retrieve_exception)
+        return task
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute()
+        finally:
+            self._in_flight.pop(key, None)
+        await self.set(key, value)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._local), "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+
+async def _wait(task: asyncio.Task) -> Any:
+    """The task's result within the caller's deadline; giving up doesn't cancel it"""
+    timeout = asyncio.timeout(time_left())
+    try:
+        async with timeout:
+            return await asyncio.shield(task)
+    except TimeoutError as e:
+        if not timeout.expired():
+            raise
+        raise DeadlineExceeded("Deadline exceeded waiting for a shared LLM call") from e
+
+
+def _retrieve_exception(task: asyncio.Task):
+    # Read here so a failure every waiter gave up on isn't reported as unhandled
+    if not task.cancelled():
+        task.exception()
+
+
+RESPONSE_CACHE = ResponseCache()
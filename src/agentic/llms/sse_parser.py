@@ -0,0 +1,107 @@
+import json
+from typing import Any, AsyncIterable, AsyncGenerator, List, Optional
+from src.utils import logger
+
+DONE = b"[DONE]"
+# Drop consumed bytes from the front of the buffer once this many pile up
+COMPACT_AT = 64 * 1024
+
+
+class SSEParser:
+    """
+    Incremental parser for streamed completions, fed network chunks as they
+    arrive. Understands server-sent events (`data: {...}` lines, as sent by
+    vLLM and other OpenAI-compatible servers) and JSON lines (`{...}` per
+    line, as sent by Ollama's native API).
+
+    Chunks are appended to one bytearray and scanned from a read offset, so
+    each byte is looked at once however the stream is split: an event cut
+    across chunks, a `\\r\\n` split in half or a multi-byte character on a
+    chunk boundary is parsed once the rest of its line arrives.
+
+    Each `data:` line is one event. Comments, blank lines and the other SSE
+    fields (event, id, retry) are skipped. `data: [DONE]` ends the stream.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        # Start of the first unparsed line
+        self._offset = 0
+        self.done = False
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Decoded JSON payloads of every line completed by chunk"""
+        if self.done or not chunk:
+            return []
+        buffer = self._buffer
+        # Only the new bytes can hold the next newline
+        scan = len(buffer)
+        buffer += chunk
+
+        events = []
+        while not self.done:
+            end = buffer.find(b"\n", scan)
+            if end == -1:
+                break
+            self._parse_line(buffer, self._offset, end, events)
+            self._offset = scan = end + 1
+
+        if self._offset >= COMPACT_AT or self._offset == len(buffer):
+            del buffer[:self._offset]
+            self._offset = 0
+        return events
+
+    def close(self) -> List[Any]:
+        """Parse a last line the server didn't terminate with a newline"""
+        events = []
+        if not self.done and self._offset < len(self._buffer):
+            self._parse_line(self._buffer, self._offset, len(self._buffer), events)
+        self._buffer.clear()
+        self._offset = 0
+        self.done = True
+        return events
+
+    def _parse_line(self, buffer: bytearray, start: int, end: int, events: List[Any]):
+        if end > start and buffer[end - 1] == 0x0D:  # \r
+            end -= 1
+        # Skip leading whitespace without copying
+        while start < end and buffer[start] in b" \t":
+            start += 1
+        if start == end:
+            return
+
+        if buffer.startswith(b"data:", start, end):
+            start += 5
+            if start < end and buffer[start] == 0x20:
+                start += 1
+        elif buffer[start] != 0x7B:  # not a JSON line: comment or another SSE field
+            return
+
+        payload = buffer[start:end]
+        if payload == DONE:
+            self.done = True
+            return
+        if not payload:
+            return
+        try:
+            events.append(json.loads(payload))
+        except ValueError:
+            logger.warning(f"Skipping malformed stream event: {payload[:200]!r}")
+
+
+async def iter_events(stream: AsyncIterable[bytes], parser: Optional[SSEParser] = None) -> AsyncGenerator[Any, None]:
+    """Decoded events of a streamed response body, until [DONE] or the end of the body"""
+    parser = parser or SSEParser()
+    try:
+        async for chunk in stream:
+            for event in parser.feed(chunk):
+                yield event
+            if parser.done:
+                return
+        for event in parser.close():
+            yield event
+    finally:
+        # Release the connection now rather than when the stream is collected
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
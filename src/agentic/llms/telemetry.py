@@ -0,0 +1,147 @@
+import time
+from typing import Dict, Optional
+from src.utils.metrics import Counter, Histogram
+from .response_cache import CACHE_REQUESTS
+
+# -------------------------
+# LLM call telemetry
+# -------------------------
+# Per call: time spent queued in this process, time to first token,
+# inter-token latency, total duration, output tokens/s, prompt size and
+# images, labelled by model and the endpoint that served it. Token counts
+# come from the server's usage block; cached_tokens is reported by vLLM
+# when prefix caching and --enable-prompt-tokens-details are on.
+
+TOKEN_RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500, 1000, 2000)
+PROMPT_TOKEN_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+IMAGE_BUCKETS = (0, 1, 2, 4, 8, 16, 32)
+
+LLM_REQUESTS = Counter("llm_requests_total", "Requests sent to the LLM server", ["model", "endpoint", "call"])
+LLM_ERRORS = Counter("llm_errors_total", "Failed LLM calls by error type", ["model", "endpoint", "call", "error"])
+PROMPT_TOKENS = Counter("llm_prompt_tokens_total", "Prompt tokens sent to the LLM server", ["model", "endpoint"])
+CACHED_PROMPT_TOKENS = Counter("llm_cached_prompt_tokens_total", "Prompt tokens served from the server's prefix cache", ["model", "endpoint"])
+COMPLETION_TOKENS = Counter("llm_completion_tokens_total", "Completion tokens generated", ["model", "endpoint"])
+
+QUEUE_TIME = Histogram("llm_queue_seconds", "Time a one-shot call waited in this process before being sent", ["model"])
+REQUEST_DURATION = Histogram("llm_request_duration_seconds", "Time from sending a request to its last byte", ["model", "endpoint", "call"])
+TIME_TO_FIRST_TOKEN = Histogram("llm_time_to_first_token_seconds", "Time from request to first streamed token", ["model", "endpoint"])
+INTER_TOKEN_LATENCY = Histogram("llm_inter_token_latency_seconds", "Time between streamed deltas", ["model", "endpoint"])
+OUTPUT_TOKEN_RATE = Histogram("llm_output_tokens_per_second", "Completion tokens per second of generation", ["model", "endpoint"], buckets=TOKEN_RATE_BUCKETS)
+PROMPT_SIZE = Histogram("llm_prompt_tokens", "Prompt tokens per request", ["model", "endpoint"], buckets=PROMPT_TOKEN_BUCKETS)
+REQUEST_IMAGES = Histogram("llm_request_images", "Images attached per request", ["model", "endpoint"], buckets=IMAGE_BUCKETS)
+
+
+def error_type(error: BaseException) -> str:
+    """http_<status> for HTTP errors, else the exception class"""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return f"http_{status}" if status else type(error).__name__
+
+
+def count_images(body: Dict) -> int:
+    return sum(
+        1
+        for message in body.get("messages", [])
+        if isinstance(message.get("content"), list)
+        for part in message["content"]
+        if part.get("type") == "image_url"
+    )
+
+
+class CallTelemetry:
+    """
+    Measurements of one LLM call. The client marks streamed deltas with
+    token(), passes the usage block to usage(), and calls finish() once,
+    with the exception if the call failed.
+    """
+
+    def __init__(self, model: str, call: str, body: Dict):
+        self.model = model
+        self.call = call
+        # Set by the client once it knows which endpoint serves the request
+        self.endpoint = ""
+        self.images = count_images(body)
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.last_token_at: Optional[float] = None
+        self._usage: Optional[Dict] = None
+        self._finished = False
+
+    @property
+    def labels(self) -> Dict[str, str]:
+        return {"model": self.model, "endpoint": self.endpoint}
+
+    def token(self):
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+            TIME_TO_FIRST_TOKEN.observe(now - self.started, **self.labels)
+        else:
+            INTER_TOKEN_LATENCY.observe(now - self.last_token_at, **self.labels)
+        self.last_token_at = now
+
+    def usage(self, usage: Optional[Dict]):
+        if usage:
+            self._usage = usage
+
+    def finish(self, error: Optional[BaseException] = None):
+        if self._finished:
+            return
+        self._finished = True
+        now = time.perf_counter()
+        labels = self.labels
+        LLM_REQUESTS.inc(call=self.call, **labels)
+        REQUEST_DURATION.observe(now - self.started, call=self.call, **labels)
+        REQUEST_IMAGES.observe(self.images, **labels)
+        if error is not None:
+            LLM_ERRORS.inc(call=self.call, error=error_type(error), **labels)
+
+        if not self._usage:
+            return
+        prompt = self._usage.get("prompt_tokens") or 0
+        completion = self._usage.get("completion_tokens") or 0
+        details = self._usage.get("prompt_tokens_details") or {}
+        PROMPT_TOKENS.inc(prompt, **labels)
+        CACHED_PROMPT_TOKENS.inc(details.get("cached_tokens") or 0, **labels)
+        COMPLETION_TOKENS.inc(completion, **labels)
+        PROMPT_SIZE.observe(prompt, **labels)
+
+        # Streams are timed from the first token, so prefill and queueing on the
+        # server don't count against the generation rate
+        generating = now - (self.first_token_at if self.first_token_at is not None else self.started)
+        if completion > 1 and generating > 0:
+            OUTPUT_TOKEN_RATE.observe(completion / generating, **labels)
+
+
+def _quantile(histogram: Histogram, q: float, model: str, scale: float = 1) -> Optional[float]:
+    # Bucket upper bound; past the last bucket, report that bucket's bound (JSON has no Infinity)
+    value = histogram.quantile(q, model=model)
+    if value is None:
+        return None
+    return min(value, histogram.buckets[-1]) * scale
+
+
+def get_llm_usage_stats() -> Dict[str, Dict]:
+    """Per-model tokens, prefix cache hit rate, latencies and errors, over all endpoints"""
+    stats = {}
+    for model in sorted({key[0] for key in LLM_REQUESTS.snapshot()}):
+        prompt = PROMPT_TOKENS.value(model=model)
+        cached = CACHED_PROMPT_TOKENS.value(model=model)
+        stats[model] = {
+            "requests": int(LLM_REQUESTS.value(model=model)),
+            "errors": int(LLM_ERRORS.value(model=model)),
+            "prompt_tokens": int(prompt),
+            "cached_prompt_tokens": int(cached),
+            "prefix_cache_hit_rate": round(cached / prompt, 4) if prompt else None,
+            "completion_tokens": int(COMPLETION_TOKENS.value(model=model)),
+            "queue_p95_ms": _quantile(QUEUE_TIME, 0.95, model, 1000),
+            "ttft_p50_ms": _quantile(TIME_TO_FIRST_TOKEN, 0.5, model, 1000),
+            "ttft_p95_ms": _quantile(TIME_TO_FIRST_TOKEN, 0.95, model, 1000),
+            "inter_token_p95_ms": _quantile(INTER_TOKEN_LATENCY, 0.95, model, 1000),
+            "request_p95_ms": _quantile(REQUEST_DURATION, 0.95, model, 1000),
+            "output_tokens_per_second_p50": _quantile(OUTPUT_TOKEN_RATE, 0.5, model),
+            "response_cache": {
+                result: int(CACHE_REQUESTS.value(model=model, result=result))
+                for result in ("local", "redis", "in_flight", "miss")
+            },
+        }
+    return stats
@@ -1,14 +1,15 @@
 import os
-from .vllm import VLLM
+from .vllm import VLLM, get_shared_vllm
 from src.utils import logger
 
-def get_vision_llm():
+def get_vision_llm(deterministic: bool = False) -> VLLM:
     """
-    Returns the vision LLM instance (using VLLM class connected to Ollama/Host).
+    Returns the vision LLM instance (using VLLM class connected to Ollama/Host),
+    shared per model and host. deterministic=True returns the temperature 0
+    client whose one-shot responses are cached.
     """
     # Checking both names to be safe
     vision_llm_host = os.environ.get("VISION_LLM_HOST") or os.environ.get("VISION_VLLM_HOST", "http://127.0.0.1:11434")
     model_name = os.environ.get("VISION_LLM_MODEL", "Qwen/Qwen2.5-VL-7B-Instruct")
     
-    logger.info(f"Initializing Vision LLM with model: {model_name} at {vision_llm_host}")
-    return VLLM(model=model_name, base_url=vision_llm_host, logger=logger)
+    return get_shared_vllm(model_name, vision_llm_host, logger, deterministic=deterministic)
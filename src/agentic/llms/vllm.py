@@ -1,11 +1,27 @@
 from RAW.llms import BaseLLM
 from RAW.utils import RequestsClient, logger, Logger
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Union, AsyncGenerator, Literal
+from typing import List, Optional, Dict, Tuple, Union, AsyncGenerator, Literal
 from RAW.modals import LLMCapability, Message, Image, Tool, ToolCall
+import asyncio
+import hashlib
 import json
 import numpy as np
+import os
+import random
 import re
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from src.utils.metrics import Counter
+from .sse_parser import iter_events
+from .batching import GenerateBatcher
+from .response_cache import RESPONSE_CACHE, is_deterministic
+from .telemetry import CallTelemetry, QUEUE_TIME
+from .resilience import (
+    VLLMError, DeadlineExceeded, CircuitOpenError, CircuitBreaker, HedgePolicy,
+    HEDGED_REQUESTS, VLLM_HEDGE, time_left, wait_first,
+)
 
 class VLLMOptions(BaseModel):
     temperature: Optional[float] = None
@@ -27,18 +43,296 @@ OPENAI_MODEL_CAPABILITIES: Dict[str, List[LLMCapability]] = {
 
 _Role = Literal["user", "assistant", "system", "tool"]
 
+# Ask for a final usage chunk on streamed responses (vLLM, Ollama >= 0.4)
+STREAM_USAGE = os.getenv("VLLM_STREAM_USAGE", "true").lower() in ("1", "true", "yes")
+
+# One-shot generate() calls made within this many ms of each other are
+# dispatched together; the server batches whatever is in flight. At most
+# VLLM_MAX_IN_FLIGHT one-shot requests are in flight per endpoint, so a slow
+# replica can't hold every request this process makes
+VLLM_BATCH_WINDOW_MS = float(os.getenv("VLLM_BATCH_WINDOW_MS", 5))
+VLLM_MAX_IN_FLIGHT = int(os.getenv("VLLM_MAX_IN_FLIGHT", 16))
+
+# Upper bound for a single HTTP request; a job's deadline (set_deadline) can only shorten it
+VLLM_TIMEOUT = float(os.getenv("VLLM_TIMEOUT", 300))
+
+ENDPOINT_REQUESTS = Counter("llm_endpoint_requests_total", "Requests routed to each LLM endpoint", ["endpoint"])
+ENDPOINT_FAILURES = Counter("llm_endpoint_failures_total", "Connection errors and 5xx responses per LLM endpoint", ["endpoint"])
+
+def _request_timeout() -> Tuple[float, bool]:
+    """
+    Timeout for a request (or the next chunk of a stream), and whether it is
+    the job's deadline rather than VLLM_TIMEOUT. Running out of job time
+    isn't held against the endpoint.
+    """
+    left = time_left()
+    if left is not None and left < VLLM_TIMEOUT:
+        return left, True
+    return VLLM_TIMEOUT, False
+
+def _as_vllm_error(error: Exception, what: str) -> VLLMError:
+    if isinstance(error, VLLMError):
+        return error
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    wrapped = VLLMError(f"{what}: {str(error)}", status=status)
+    wrapped.__cause__ = error
+    return wrapped
+
+class _Endpoint:
+    def __init__(self, base_url: str, logger: Logger):
+        self.base_url = base_url
+        self.client = RequestsClient(base_url=f"{base_url}/v1", timeout=VLLM_TIMEOUT, logger=logger)
+        self.breaker = CircuitBreaker(base_url)
+        self.outstanding = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        # One-shot requests in flight, limited to VLLM_MAX_IN_FLIGHT
+        self.in_flight = 0
+
 class VLLM(BaseLLM):
-    def __init__(self, model: str = "Qwen/Qwen2.5-14B-Instruct-AWQ", base_url: str = "http://127.0.0.1:11434", options: Optional[VLLMOptions] = None, logger: Logger = logger):
+    """
+    OpenAI-compatible chat client for a vLLM (or Ollama) server.
+
+    Every request is bounded by VLLM_TIMEOUT and by the deadline of the job
+    making it (set_deadline), and goes through the endpoint's circuit
+    breaker. With VLLM_HEDGE on, a one-shot request still unanswered after
+    the recent p95 latency is sent a second time and the first answer wins.
+    Failures raise VLLMError (a RuntimeError).
+    """
+    def __init__(self, model: str = "Qwen/Qwen2.5-14B-Instruct-AWQ", base_url: str = "http://127.0.0.1:11434", options: Optional[VLLMOptions] = None, logger: Logger = logger, response_cache: bool = False):
         super().__init__()
-        self.client = RequestsClient(
-            base_url=f"{base_url}/v1",
-            timeout=300,
-            logger=logger
-        )
+        self.endpoints = [_Endpoint(base_url, logger)]
+        self.client = self.endpoints[0].client
+        self.base_url = base_url
         self.model = model
         self.options = options
         self.capabilities: List[LLMCapability] = OPENAI_MODEL_CAPABILITIES.get(model, [LLMCapability.COMPLETION])
         self.logger = logger
+        # Opt-in: deterministic one-shot generate() calls are answered from RESPONSE_CACHE
+        self.response_cache = RESPONSE_CACHE if response_cache else None
+        self.batcher = GenerateBatcher(self._get_direct_response, model, VLLM_BATCH_WINDOW_MS / 1000)
+        self.hedge = VLLM_HEDGE
+        # Recent latencies per call type, for the hedge delay
+        self.hedges: Dict[str, HedgePolicy] = {}
+        # Set (and replaced) whenever a one-shot slot frees up; bound to the running event loop
+        self._slot_freed: Optional[asyncio.Event] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _post(self, path: str, body: Dict, stream: bool = False, telemetry: Optional[CallTelemetry] = None):
+        if not stream and self.hedge:
+            return await self._hedged(path, body, telemetry)
+        tried = []
+        try:
+            return await self._send(path, body, stream, tried)
+        finally:
+            if telemetry and tried:
+                telemetry.endpoint = tried[-1].base_url
+
+    async def _hedged(self, path: str, body: Dict, telemetry: Optional[CallTelemetry]):
+        policy = self.hedges.setdefault(telemetry.call if telemetry else path, HedgePolicy())
+        started = time.perf_counter()
+        tried = []
+        first = asyncio.create_task(self._hedge_attempt(path, body, tried))
+        attempts = {first: tried}
+        winner = first
+        try:
+            delay = policy.delay()
+            if delay is not None:
+                done, _ = await asyncio.wait({first}, timeout=delay)
+                if not done and policy.take():
+                    # Another endpoint when there is one left to try
+                    hedge_tried = list(tried) if len(tried) < len(self.endpoints) else []
+                    second = asyncio.create_task(self._hedge_attempt(path, body, hedge_tried))
+                    attempts[second] = hedge_tried
+                    winner = await wait_first(first, second)
+            response = await winner
+        finally:
+            for task in attempts:
+                task.cancel()
+            if telemetry and attempts[winner]:
+                telemetry.endpoint = attempts[winner][-1].base_url
+        # Only answers reach here; failures would skew the hedge delay
+        if len(attempts) > 1:
+            HEDGED_REQUESTS.inc(model=self.model, winner="original" if winner is first else "hedge")
+        policy.observe(time.perf_counter() - started)
+        return response
+
+    async def _hedge_attempt(self, path: str, body: Dict, tried: List[_Endpoint]):
+        """One copy of a hedged request; a 5xx fails it, so the other copy can still win"""
+        response = await self._send(path, body, False, tried)
+        status = getattr(response, "status_code", 200)
+        if status >= 500:
+            raise VLLMError(f"HTTP {status} from {tried[-1].base_url}")
+        return response
+
+    def _pick(self, tried: List[_Endpoint]) -> _Endpoint:
+        return self.endpoints[0]
+
+    async def _send(self, path: str, body: Dict, stream: bool, tried: List[_Endpoint]):
+        """
+        Send one request, retried on the next endpoint while it fails before
+        any response data arrives. Endpoints used are appended to tried.
+        One-shot requests wait for one of the endpoint's VLLM_MAX_IN_FLIGHT slots.
+        """
+        while True:
+            endpoint = self._pick(tried) if stream else await self._pick_slot(tried)
+            tried.append(endpoint)
+            can_retry = len(tried) < len(self.endpoints)
+            token = endpoint.breaker.allow()
+            if token is None:
+                if not stream:
+                    self._release_slot(endpoint)
+                if can_retry:
+                    continue
+                raise CircuitOpenError(f"Circuit breaker open for {endpoint.base_url}")
+            timeout, job_bound = _request_timeout()
+            if timeout <= 0:
+                endpoint.breaker.release(token)
+                if not stream:
+                    self._release_slot(endpoint)
+                raise DeadlineExceeded("Deadline passed before the request was sent")
+
+            endpoint.outstanding += 1
+            ENDPOINT_REQUESTS.inc(endpoint=endpoint.base_url)
+            relaying = False
+            try:
+                async with asyncio.timeout(timeout):
+                    if stream:
+                        chunks = (await endpoint.client.post(path, json=body, stream=True, is_async=True)).__aiter__()
+                        # Wait for the first chunk here, so an endpoint that fails
+                        # before sending anything can still be retried
+                        first = await anext(chunks, b"")
+                    else:
+                        response = await endpoint.client.post(path, json=body, is_async=True)
+            except TimeoutError as e:
+                if job_bound:
+                    # The job ran out of time, which says nothing about the endpoint
+                    endpoint.breaker.release(token)
+                    raise DeadlineExceeded(f"Deadline exceeded waiting for {endpoint.base_url}") from e
+                self._record_failure(endpoint, f"no answer within {VLLM_TIMEOUT:g}s", token)
+                if not can_retry:
+                    raise VLLMError(f"Timed out after {VLLM_TIMEOUT:g}s waiting for {endpoint.base_url}") from e
+                continue
+            except asyncio.CancelledError:
+                endpoint.breaker.release(token)
+                raise
+            except Exception as e:
+                self._record_failure(endpoint, e, token)
+                if not can_retry:
+                    raise
+                continue
+            else:
+                if stream:
+                    relaying = True
+                    return self._relay(endpoint, token, first, chunks)
+            finally:
+                if not relaying:
+                    endpoint.outstanding -= 1
+                if not stream:
+                    self._release_slot(endpoint)
+
+            status = getattr(response, "status_code", 200)
+            if status >= 500:
+                self._record_failure(endpoint, f"HTTP {status}", token)
+                if can_retry:
+                    continue
+            else:
+                self._record_success(endpoint, token)
+            return response
+
+    def _slot_event(self) -> asyncio.Event:
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots_loop = loop
+            self._slot_freed = asyncio.Event()
+        return self._slot_freed
+
+    async def _pick_slot(self, tried: List[_Endpoint]) -> _Endpoint:
+        """Pick an endpoint for a one-shot request, waiting while the pick has no free slot"""
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(time_left()):
+                while True:
+                    endpoint = self._pick(tried)
+                    if endpoint.in_flight < VLLM_MAX_IN_FLIGHT:
+                        break
+                    # Pick again once any endpoint frees a slot
+                    await self._slot_event().wait()
+        except TimeoutError as e:
+            raise DeadlineExceeded("Deadline exceeded waiting for a free LLM endpoint slot") from e
+        endpoint.in_flight += 1
+        QUEUE_TIME.observe(time.perf_counter() - started, model=self.model)
+        return endpoint
+
+    def _release_slot(self, endpoint: _Endpoint):
+        endpoint.in_flight -= 1
+        freed = self._slot_event()
+        self._slot_freed = asyncio.Event()
+        freed.set()
+
+    async def _relay(self, endpoint: _Endpoint, token: int, first: bytes, chunks) -> AsyncGenerator[bytes, None]:
+        """Pass a stream through within the deadline, keeping the endpoint busy until it ends"""
+        failed = False
+        try:
+            if first:
+                yield first
+            while True:
+                timeout, job_bound = _request_timeout()
+                async with asyncio.timeout(timeout):
+                    chunk = await anext(chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        except TimeoutError as e:
+            failed = True
+            if job_bound:
+                endpoint.breaker.release(token)
+                raise DeadlineExceeded(f"Deadline exceeded streaming from {endpoint.base_url}") from e
+            self._record_failure(endpoint, f"stream stalled for {VLLM_TIMEOUT:g}s", token)
+            raise VLLMError(f"Timed out after {VLLM_TIMEOUT:g}s streaming from {endpoint.base_url}") from e
+        except asyncio.CancelledError:
+            failed = True
+            endpoint.breaker.release(token)
+            raise
+        except Exception as e:
+            failed = True
+            self._record_failure(endpoint, e, token)
+            raise
+        finally:
+            # Closed after [DONE], or by a consumer that stopped early, also counts as answered
+            if not failed:
+                self._record_success(endpoint, token)
+            endpoint.outstanding -= 1
+
+    def _record_success(self, endpoint: _Endpoint, token: int):
+        endpoint.breaker.record(True, token)
+        endpoint.failures = 0
+
+    def _record_failure(self, endpoint: _Endpoint, error, token: int):
+        endpoint.breaker.record(False, token)
+        endpoint.failures += 1
+        ENDPOINT_FAILURES.inc(endpoint=endpoint.base_url)
+        self.logger.warning(f"LLM endpoint {endpoint.base_url} failed ({endpoint.failures} in a row): {error}")
+
+    def endpoint_stats(self) -> List[Dict]:
+        now = time.monotonic()
+        return [
+            {
+                "endpoint": e.base_url,
+                "outstanding": e.outstanding,
+                "one_shot_in_flight": e.in_flight,
+                "consecutive_failures": e.failures,
+                "ejected_for_seconds": round(max(e.ejected_until - now, 0), 1),
+                "breaker": e.breaker.state,
+            }
+            for e in self.endpoints
+        ]
+
+    def _start_call(self, body: Dict, call: str) -> CallTelemetry:
+        if body.get("stream") and STREAM_USAGE:
+            body["stream_options"] = {"include_usage": True}
+        return CallTelemetry(self.model, call, body)
 
     async def generate(self, prompt: str, images: Optional[List[Image]] = None, schema: Optional[Union[str, Dict]] = None, stream: bool = False) -> Union[str, Dict, AsyncGenerator[Union[str, Dict], None]]:
         if not prompt:
@@ -83,62 +377,42 @@ class VLLM(BaseLLM):
 
         if stream:
             return self._stream_response(body)
-        else:
-            return await self._get_direct_response(body)
+        if self.response_cache and is_deterministic(body):
+            return await self.response_cache.fetch(body, lambda: self.batcher.submit(body))
+        return await self.batcher.submit(body)
 
     async def _get_direct_response(self, body: Dict) -> Union[str, Dict]:
+        telemetry = self._start_call(body, "generate")
         try:
-            response = await self.client.post("/chat/completions", json=body, is_async=True)
+            response = await self._post("/chat/completions", body, telemetry=telemetry)
             response.raise_for_status()
             data = response.json()
+            telemetry.usage(data.get("usage"))
+            telemetry.finish()
             return data["choices"][0]["message"]["content"]
         except Exception as e:
-            raise RuntimeError(f"Generation error: {str(e)}")
+            telemetry.finish(e)
+            raise _as_vllm_error(e, "Generation error")
 
     async def _stream_response(self, body: Dict) -> AsyncGenerator[Union[str, Dict], None]:
+        telemetry = self._start_call(body, "generate_stream")
         try:
-            stream_gen = await self.client.post("/chat/completions", json=body, stream=True, is_async=True)
-            buffer = b"" 
-            async for chunk in stream_gen:
-                if not chunk:
+            stream_gen = await self._post("/chat/completions", body, stream=True, telemetry=telemetry)
+            async for data in iter_events(stream_gen):
+                telemetry.usage(data.get("usage"))
+                if not data.get("choices"):
                     continue
-                buffer += chunk
-                while b"data: " in buffer:
-                    parts = buffer.split(b"data: ", 2)
-                    if len(parts) < 3:
-                        if buffer.count(b"data: ") == 1 and not buffer.startswith(b"data: "):
-                             parts = buffer.split(b"data: ", 1)
-                             buffer = b"data: " + parts[1]
-                             break
-                        break
-                    
-                    process_line = parts[1].strip()
-                    if process_line == b"[DONE]":
-                        return
-                    
-                    try:
-                        data = json.loads(process_line.decode("utf-8"))
-                        content = data["choices"][0]["delta"].get("content", "")
-                        if content:
-                            yield content
-                    except:
-                        pass
-                    
-                    buffer = b"data: " + parts[2]
-
-            if buffer.startswith(b"data: "):
-                final_str = buffer[len(b"data: "):].strip().decode("utf-8")
-                if final_str and final_str != "[DONE]":
-                    try:
-                        data = json.loads(final_str)
-                        content = data["choices"][0]["delta"].get("content", "")
-                        if content:
-                            yield content
-                    except:
-                        pass
+                content = data["choices"][0].get("delta", {}).get("content")
+                if content:
+                    telemetry.token()
+                    yield content
 
         except Exception as e:
-            raise RuntimeError(f"Stream error: {str(e)}")
+            telemetry.finish(e)
+            raise _as_vllm_error(e, "Stream error")
+        finally:
+            # Also reached when the consumer stops early
+            telemetry.finish()
 
     def _convert_message_to_openai_format(self, message: Message) -> Dict:
         role = message.role
@@ -199,10 +473,13 @@ class VLLM(BaseLLM):
             return await self._get_direct_chat_response(body)
             
     async def _get_direct_chat_response(self, body: Dict) -> Message:
+        telemetry = self._start_call(body, "chat")
         try: 
-            response = await self.client.post("/chat/completions", json=body, is_async=True)
+            response = await self._post("/chat/completions", body, telemetry=telemetry)
             response.raise_for_status()
             data = response.json()
+            telemetry.usage(data.get("usage"))
+            telemetry.finish()
             message_data = data["choices"][0]["message"]
             
             tool_calls = []
@@ -220,53 +497,44 @@ class VLLM(BaseLLM):
                 tool_calls=tool_calls
             )
         except Exception as e:
+            telemetry.finish(e)
             self.logger.error(f"Chat error: {str(e)}")
-            raise RuntimeError(f"Chat error: {str(e)}")
+            raise _as_vllm_error(e, "Chat error")
 
     async def _stream_chat_response(self, body: Dict) -> AsyncGenerator[Message, None]:
         tool_call_chunks = {}
         has_tool_calls = False
                 
+        telemetry = self._start_call(body, "chat_stream")
         try:
-            stream_gen = await self.client.post("/chat/completions", json=body, stream=True, is_async=True)
-            async for chunk in stream_gen:
-                lines = chunk.decode("utf-8").strip().split('\n')
-                for line in lines:
-                    line = line.strip()
-                    if not line.startswith("data: "):
-                        continue
-                    
-                    data_str = line[6:]
-                    if data_str == "[DONE]":
-                        break
-                    
-                    try:
-                        data = json.loads(data_str)
-                    except:
-                        continue
+            stream_gen = await self._post("/chat/completions", body, stream=True, telemetry=telemetry)
+            async for data in iter_events(stream_gen):
+                telemetry.usage(data.get("usage"))
+
+                if "choices" in data and data["choices"]:
+                    choice = data["choices"][0]
+                    delta = choice.get("delta", {})
+                    if delta.get("content") or delta.get("tool_calls"):
+                        telemetry.token()
                     
-                    if "choices" in data and data["choices"]:
-                        choice = data["choices"][0]
-                        delta = choice.get("delta", {})
-                        
-                        if "content" in delta and delta["content"]:
-                            yield Message(role="assistant", content=delta["content"], tool_calls=[], images=[])
-
-                        if "tool_calls" in delta:
-                            has_tool_calls = True
-                            for tc_chunk in delta["tool_calls"]:
-                                idx = tc_chunk.get("index", 0)
-                                if idx not in tool_call_chunks:
-                                    tool_call_chunks[idx] = {"id": "", "name": "", "arguments": ""}
-                                
-                                if "id" in tc_chunk:
-                                    tool_call_chunks[idx]["id"] += tc_chunk["id"]
-                                if "function" in tc_chunk:
-                                    fn = tc_chunk["function"]
-                                    if "name" in fn:
-                                        tool_call_chunks[idx]["name"] += fn["name"]
-                                    if "arguments" in fn:
-                                        tool_call_chunks[idx]["arguments"] += fn["arguments"]
+                    if "content" in delta and delta["content"]:
+                        yield Message(role="assistant", content=delta["content"], tool_calls=[], images=[])
+
+                    if "tool_calls" in delta:
+                        has_tool_calls = True
+                        for tc_chunk in delta["tool_calls"]:
+                            idx = tc_chunk.get("index", 0)
+                            if idx not in tool_call_chunks:
+                                tool_call_chunks[idx] = {"id": "", "name": "", "arguments": ""}
+                            
+                            if "id" in tc_chunk:
+                                tool_call_chunks[idx]["id"] += tc_chunk["id"]
+                            if "function" in tc_chunk:
+                                fn = tc_chunk["function"]
+                                if "name" in fn:
+                                    tool_call_chunks[idx]["name"] += fn["name"]
+                                if "arguments" in fn:
+                                    tool_call_chunks[idx]["arguments"] += fn["arguments"]
             
             if tool_call_chunks:
                 tool_calls = []
@@ -281,27 +549,144 @@ class VLLM(BaseLLM):
                 yield Message(role="assistant", content=None, images=[], tool_calls=tool_calls)
                                 
         except Exception as e:
+            telemetry.finish(e)
             self.logger.error(f"Streaming error: {str(e)}")
-            raise RuntimeError(f"Streaming error: {str(e)}")
+            raise _as_vllm_error(e, "Streaming error")
+        finally:
+            # Also reached when the consumer stops early
+            telemetry.finish()
     
     async def embed(self, text: str) -> np.ndarray:
         body = {"model": self.model, "input": text}
         try:
-            response = await self.client.post("/embeddings", json=body, is_async=True)
+            response = await self._post("/embeddings", body)
             response.raise_for_status()
             data = response.json()
             embedding = data.get("embedding")
             if not embedding:
-                raise RuntimeError("No embedding returned")
+                raise VLLMError("No embedding returned")
             return np.array(embedding, dtype=np.float32)
         except Exception as e:
-            raise RuntimeError(f"Embedding error: {str(e)}")
+            raise _as_vllm_error(e, "Embedding error")
 
     async def stop(self):
-        await self.client.aclose()
+        for endpoint in self.endpoints:
+            await endpoint.client.aclose()
 
     def __del__(self):
-        try:
-            self.client.close()
-        except:
-            pass
+        for endpoint in getattr(self, "endpoints", []):
+            try:
+                endpoint.client.close()
+            except:
+                pass
+
+
+
+# -------------------------
+# Multiple replicas
+# -------------------------
+# VLLM_ROUTING: "least" sends each request to the endpoint with the fewest
+# requests in flight, "p2c" to the less busy of two endpoints picked at random.
+VLLM_ROUTING = os.getenv("VLLM_ROUTING", "least")
+# Consecutive failures (connection errors, 5xx) before an endpoint is ejected
+VLLM_EJECT_AFTER = int(os.getenv("VLLM_EJECT_AFTER", 3))
+VLLM_EJECT_SECONDS = float(os.getenv("VLLM_EJECT_SECONDS", 10))
+VLLM_EJECT_MAX_SECONDS = float(os.getenv("VLLM_EJECT_MAX_SECONDS", 300))
+# A sticky request leaves its endpoint once that has this many more requests
+# in flight than the least busy one
+VLLM_STICKY_MAX_IMBALANCE = int(os.getenv("VLLM_STICKY_MAX_IMBALANCE", 4))
+
+ENDPOINT_EJECTIONS = Counter("llm_endpoint_ejections_total", "Times an LLM endpoint was taken out of rotation", ["endpoint"])
+
+# Requests made under the same key (a conversation) go to the same replica
+# while it is healthy, so the prompt prefix it has cached gets reused
+_routing_key: ContextVar[Optional[str]] = ContextVar("llm_routing_key", default=None)
+
+def set_routing_key(key) -> None:
+    """
+    Route the LLM requests of the current task, and of tasks it starts, by key.
+    None routes by load only.
+    """
+    _routing_key.set(None if key is None else str(key))
+
+def _rendezvous_weight(key: str, endpoint: str) -> int:
+    return int.from_bytes(hashlib.blake2b(f"{key}|{endpoint}".encode(), digest_size=8).digest(), "big")
+
+class BalancedVLLM(VLLM):
+    """
+    VLLM spread over several replicas serving the same model.
+
+    Each request goes to the endpoint with the fewest requests in flight (or
+    the less busy of two random ones with VLLM_ROUTING=p2c). Endpoints that
+    fail VLLM_EJECT_AFTER times in a row are ejected for a backoff that
+    doubles while they keep failing; a request that fails before any
+    response data arrives is retried on the next endpoint, and endpoints
+    whose circuit breaker is open are skipped. With a routing key set
+    (set_routing_key), requests prefer the key's rendezvous-hashed endpoint
+    for prefix cache locality, unless it is much busier.
+    """
+    def __init__(self, model: str, endpoints: List[str], options: Optional[VLLMOptions] = None, logger: Logger = logger, response_cache: bool = False):
+        super().__init__(model=model, base_url=endpoints[0], options=options, logger=logger, response_cache=response_cache)
+        self.endpoints += [_Endpoint(url, logger) for url in endpoints[1:]]
+
+    def _pick(self, tried: List[_Endpoint]) -> _Endpoint:
+        now = time.monotonic()
+        # A hedge may have every endpoint busy with the same request already
+        remaining = [e for e in self.endpoints if e not in tried] or self.endpoints
+        closed = [e for e in remaining if e.breaker.available]
+        if not closed:
+            # Refused by the breaker in _send
+            return remaining[0]
+        candidates = [e for e in closed if e.ejected_until <= now]
+        if not candidates:
+            # Everything left is ejected: try the one due back soonest rather than fail outright
+            return min(closed, key=lambda e: e.ejected_until)
+        # Endpoints with every one-shot slot taken only when all of them are
+        candidates = [e for e in candidates if e.in_flight < VLLM_MAX_IN_FLIGHT] or candidates
+
+        least = min(e.outstanding for e in candidates)
+        key = _routing_key.get()
+        if key is not None:
+            preferred = max(candidates, key=lambda e: _rendezvous_weight(key, e.base_url))
+            if preferred.outstanding - least <= VLLM_STICKY_MAX_IMBALANCE:
+                return preferred
+
+        if VLLM_ROUTING == "p2c" and len(candidates) > 2:
+            first, second = random.sample(candidates, 2)
+            return first if first.outstanding <= second.outstanding else second
+        return random.choice([e for e in candidates if e.outstanding == least])
+
+    def _record_success(self, endpoint: _Endpoint, token: int):
+        super()._record_success(endpoint, token)
+        endpoint.ejections = 0
+
+    def _record_failure(self, endpoint: _Endpoint, error, token: int):
+        super()._record_failure(endpoint, error, token)
+        if endpoint.failures < VLLM_EJECT_AFTER:
+            return
+
+        duration = min(VLLM_EJECT_SECONDS * 2 ** endpoint.ejections, VLLM_EJECT_MAX_SECONDS)
+        endpoint.ejected_until = time.monotonic() + duration
+        endpoint.ejections += 1
+        # Back in rotation, one more failure ejects it again
+        endpoint.failures = VLLM_EJECT_AFTER - 1
+        ENDPOINT_EJECTIONS.inc(endpoint=endpoint.base_url)
+        self.logger.error(f"Ejecting LLM endpoint {endpoint.base_url} for {duration:.0f}s")
+
+
+@lru_cache(maxsize=None)
+def get_shared_vllm(model: str, base_url: str, logger: Logger = logger, deterministic: bool = False) -> VLLM:
+    """
+    One VLLM per (model, endpoint), so agents built per turn reuse the same
+    client and its HTTP connection pool instead of opening a new one.
+    A comma-separated base_url balances over several replicas (BalancedVLLM).
+    deterministic clients sample at temperature 0 and cache their one-shot
+    responses, for callers that want the same answer to the same input.
+    """
+    options = VLLMOptions(temperature=0) if deterministic else None
+    endpoints = [url.strip().rstrip("/") for url in base_url.split(",") if url.strip()]
+    if len(endpoints) > 1:
+        logger.info(f"Initializing VLLM with model: {model} balanced over {', '.join(endpoints)}")
+        return BalancedVLLM(model=model, endpoints=endpoints, options=options, logger=logger, response_cache=deterministic)
+    logger.info(f"Initializing VLLM with model: {model} at {base_url}")
+    return VLLM(model=model, base_url=base_url, options=options, logger=logger, response_cache=deterministic)
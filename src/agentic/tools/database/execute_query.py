@@ -24,8 +24,9 @@ async def execute_query_executor(dbname: str, query: str, download_excel: bool =
     
     conn = None
     try:
-        # Use existing connection logic from src.utils.database
-        with get_db_connection() as conn:
+        # Use existing connection logic from src.utils.database; the query is
+        # LLM-written, so whatever session state it sets is discarded on return
+        with get_db_connection(reset_session=True) as conn:
             cursor = conn.cursor()
             cursor.execute(query)
             
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Query, HTTPException
 from src.models import APIOutput
 from src.models.conversations import Conversation, ConversationCreate, ConversationUpdate
 from src.services.conversation_service import ConversationService
+from src.utils.pagination import InvalidCursorError
 
 router = APIRouter()
 
@@ -25,11 +26,17 @@ def get_conversation(id: int):
 def get_conversations(
     user_id: int = Query(..., description="User ID to filter conversations"),
     limit: int = Query(10, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    offset: int = Query(0, ge=0, deprecated=True),
 ):
     try:
-        conversations = ConversationService.get_conversations(user_id, limit, offset)
-        return APIOutput.success(data=conversations)
+        if offset and not cursor:
+            conversations = ConversationService.get_conversations(user_id, limit, offset)
+            return APIOutput.success(data=conversations)
+        conversations, next_cursor = ConversationService.get_conversations_page(user_id, limit, cursor)
+        return APIOutput.success(data=conversations, next_cursor=next_cursor)
+    except InvalidCursorError as e:
+        return APIOutput.failure(message=str(e), status_code=400)
     except Exception as e:
         return APIOutput.failure(message=str(e))
 
@@ -44,9 +51,9 @@ def update_conversation(id: int, data: ConversationUpdate):
         return APIOutput.failure(message=str(e))
 
 @router.delete("/conversations/{id}", response_model=APIOutput[None])
-def delete_conversation(id: int):
+async def delete_conversation(id: int):
     try:
-        success = ConversationService.delete_conversation(id)
+        success = await ConversationService.delete_conversation_async(id)
         if not success:
             return APIOutput.failure(message="Conversation not found", status_code=404)
         return APIOutput.success(message="Conversation deleted successfully")
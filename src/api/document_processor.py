@@ -45,7 +45,7 @@ async def process_document_async(
             return Output.failure(message=f"Invalid JSON schema: {str(e)}")
     
     # Add to DB queue
-    task_id = OCRService.add_to_queue(
+    task_id = await OCRService.add_to_queue_async(
         filepath=file_path,
         json_schema=schema,
         priority=priority
@@ -64,7 +64,7 @@ async def get_task_status(request: Request, task_id: int):
             if await request.is_disconnected():
                 break
 
-            task = OCRService.get_task_status(task_id)
+            task = await OCRService.get_task_status_async(task_id)
             if not task:
                 yield {"event": "error", "data": json.dumps({"message": "Task not found"})}
                 break
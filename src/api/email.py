@@ -4,9 +4,18 @@ from src.utils.redis import enqueue_job
 from src.utils import logger
 from src.services.conversation_service import ConversationService
 from src.models.conversations import ConversationCreate
+from src.models.jobs import JobPayload
 
 router = APIRouter()
 
+# Job payload field -> email-service webhook field
+WEBHOOK_FIELDS = {
+    "sender": "sender_email",
+    "subject": "subject",
+    "content": "content",
+    "timestamp": "timestamp",
+}
+
 @router.post("/email/incoming")
 async def handle_incoming_email(request: Request):
     try:
@@ -24,29 +33,28 @@ async def handle_incoming_email(request: Request):
         if not email_id:
             return APIOutput.failure(message="Missing email ID")
             
-        # Ensure conversation exists for this thread
+        # Get or atomically create the conversation for this thread
+        conv = None
         if thread_id:
-            conv = ConversationService.find_by_metadata("email_thread_id", thread_id)
-            if not conv:
-                logger.info(f"Creating new conversation for email thread: {thread_id}")
-                agent_name = "DatabaseAgent"
-                # Use incoming subject or fallback to a spaced version of the agent name
-                import re
-                fallback_title = re.sub(r'([a-z])([A-Z])', r'\1 \2', agent_name).strip()
-                conv_title = subject if subject and subject not in ["No Subject", "None", "null"] else fallback_title
-                
-                conv_create = ConversationCreate(
-                    user_id=1, # Default user ID
-                    agent=agent_name,
-                    title=conv_title,
-                    metadata={"email_thread_id": thread_id}
-                )
-                ConversationService.create_conversation(conv_create)
+            agent_name = "DatabaseAgent"
+            # Use incoming subject or fallback to a spaced version of the agent name
+            import re
+            fallback_title = re.sub(r'([a-z])([A-Z])', r'\1 \2', agent_name).strip()
+            conv_title = subject if subject and subject not in ["No Subject", "None", "null"] else fallback_title
+            
+            conv_create = ConversationCreate(
+                user_id=1, # Default user ID
+                agent=agent_name,
+                title=conv_title,
+                metadata={"email_thread_id": thread_id}
+            )
+            conv = await ConversationService.get_or_create_for_email_thread_async(thread_id, conv_create)
         
-        job_payload = {
-            "message_id": email_id,
-            "message_type": "email"
-        }
+        context = {}
+        if conv:
+            context = {"conversation_id": conv.id, "agent": conv.agent, "user_id": conv.user_id, "thread_id": thread_id}
+            context.update({field: email_data[key] for field, key in WEBHOOK_FIELDS.items() if key in email_data})
+        job_payload = JobPayload.build(email_id, "email", **context).to_payload()
         
         logger.info(f"Enqueuing email job: {job_payload}")
         await enqueue_job(job_payload) 
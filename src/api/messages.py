@@ -1,8 +1,10 @@
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter, Query, HTTPException
 from src.models import APIOutput
 from src.models.messages import Message, MessageCreate, MessageUpdate
+from src.models.jobs import JobPayload
 from src.services.message_service import MessageService
+from src.utils.pagination import InvalidCursorError
 
 router = APIRouter()
 
@@ -13,7 +15,7 @@ async def create_message(conversation_id: int, data: MessageCreate):
              return APIOutput.failure(message="Conversation ID mismatch", status_code=400)
              
         # 1. Create User Message
-        user_msg = MessageService.create_message(data)
+        user_msg = await MessageService.create_message_async(data)
         
         # 2. Create Placeholder Assistant Message
         assistant_data = MessageCreate(
@@ -22,14 +24,12 @@ async def create_message(conversation_id: int, data: MessageCreate):
             content="", # Empty content initially
             metadata={"status": "pending"}
         )
-        assistant_msg = MessageService.create_message(assistant_data)
+        assistant_msg = await MessageService.create_message_async(assistant_data)
         
         # 3. Enqueue Job for Worker
         from src.utils.redis import enqueue_job
-        await enqueue_job({
-            "message_id": assistant_msg.id,
-            "message_type": "default"
-        })
+        job = JobPayload.build(assistant_msg.id, "default", conversation_id=conversation_id)
+        await enqueue_job(job.to_payload())
         
         # 4. Return Assistant Message (so client can subscribe to its ID)
         return APIOutput.success(data=assistant_msg, status_code=201)
@@ -40,11 +40,17 @@ async def create_message(conversation_id: int, data: MessageCreate):
 def get_messages(
     conversation_id: int,
     limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    offset: int = Query(0, ge=0, deprecated=True),
 ):
     try:
-        messages = MessageService.get_messages_by_conversation(conversation_id, limit, offset)
-        return APIOutput.success(data=messages)
+        if offset and not cursor:
+            messages = MessageService.get_messages_by_conversation(conversation_id, limit, offset)
+            return APIOutput.success(data=messages)
+        messages, next_cursor = MessageService.get_messages_page(conversation_id, limit, cursor)
+        return APIOutput.success(data=messages, next_cursor=next_cursor)
+    except InvalidCursorError as e:
+        return APIOutput.failure(message=str(e), status_code=400)
     except Exception as e:
         return APIOutput.failure(message=str(e))
 
@@ -59,9 +65,9 @@ def get_message(id: int):
         return APIOutput.failure(message=str(e))
 
 @router.put("/messages/{id}", response_model=APIOutput[Message])
-def update_message(id: int, data: MessageUpdate):
+async def update_message(id: int, data: MessageUpdate):
     try:
-        message = MessageService.update_message(id, data)
+        message = await MessageService.update_message_async(id, data)
         if not message:
             return APIOutput.failure(message="Message not found", status_code=404)
         return APIOutput.success(data=message)
@@ -69,9 +75,9 @@ def update_message(id: int, data: MessageUpdate):
         return APIOutput.failure(message=str(e))
 
 @router.delete("/messages/{id}", response_model=APIOutput[None])
-def delete_message(id: int):
+async def delete_message(id: int):
     try:
-        success = MessageService.delete_message(id)
+        success = await MessageService.delete_message_async(id)
         if not success:
             return APIOutput.failure(message="Message not found", status_code=404)
         return APIOutput.success(message="Message deleted successfully")
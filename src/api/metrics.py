@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import PlainTextResponse
+from src.models import APIOutput
+from src.utils.database import get_pool_stats, get_query_stats
+from src.utils.metrics import render_prometheus
+from src.agentic.llms.telemetry import get_llm_usage_stats
+
+router = APIRouter(prefix="/metrics")
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    All histograms and counters of this process in Prometheus text format
+    """
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@router.get("/db/pool", response_model=APIOutput)
+def get_db_pool_metrics():
+    """
+    Connection pool saturation for this API process
+    """
+    return APIOutput.success(data=get_pool_stats())
+
+@router.get("/db/queries", response_model=APIOutput)
+def get_db_query_metrics(limit: int = Query(50, ge=1, le=500)):
+    """
+    Per-query latency in this API process, heaviest total time first
+    """
+    return APIOutput.success(data=get_query_stats(limit))
+
+
+@router.get("/llm", response_model=APIOutput)
+def get_llm_metrics():
+    """
+    Per-model token usage, prefix cache hit rate, latencies and errors in this process
+    """
+    return APIOutput.success(data=get_llm_usage_stats())
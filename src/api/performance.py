@@ -1,12 +1,12 @@
 from fastapi import APIRouter, BackgroundTasks, Request, Header
 from src.models import APIOutput
 from src.services.performance_service import PerformanceService
-from src.utils.redis import wait_for_stream_item, get_message_state, get_stream_history
-from src.utils.database import get_next_request_id
+from src.utils.redis import get_message_state, get_stream_history
+from src.utils.stream_hub import stream_hub, STREAM_RESET
+from src.utils.database import get_next_request_id, run_db
 from sse_starlette.sse import EventSourceResponse
 from pydantic import BaseModel
 import json
-import asyncio
 from typing import Optional
 
 router = APIRouter()
@@ -17,7 +17,7 @@ async def create_performance_report(
     grn_number: str = Header(..., alias="grn_number")
 ):
     try:
-        report_id = get_next_request_id("PA")
+        report_id = await run_db(get_next_request_id, "PA")
         
         # Start report generation in background
         background_tasks.add_task(PerformanceService.generate_performance_report, report_id, grn_number)
@@ -35,42 +35,27 @@ async def get_performance_report(report_id: str, request: Request):
     Stream the performance report results using SSE
     """
     async def event_generator():
-        last_index = 0
-        while True:
-            # If client disconnects, stop streaming
-            if await request.is_disconnected():
-                break
+        async for chunk in stream_hub.stream(report_id):
+            if chunk is None:
+                # Idle tick from the hub; stop streaming if the client went away
+                if await request.is_disconnected():
+                    return
+                continue
+            if chunk is STREAM_RESET:
+                # The job is running again; the client drops the partial report
+                yield {"event": "reset", "data": "{}"}
+                continue
+            yield {
+                "event": "message",
+                "data": json.dumps({"chunk": chunk})
+            }
 
-            # Wait for new chunks in Redis
-            chunks = await wait_for_stream_item(report_id, last_index, timeout=5)
-            
-            if chunks:
-                for chunk in chunks:
-                    yield {
-                        "event": "message",
-                        "data": json.dumps({"chunk": chunk})
-                    }
-                last_index += len(chunks)
-
-            # Check if processing is finished
-            state = await get_message_state(report_id)
-            if state.get("status") in ["done", "error"]:
-                # One last check for any remaining chunks
-                final_chunks = await wait_for_stream_item(report_id, last_index, timeout=1)
-                for chunk in final_chunks:
-                     yield {
-                        "event": "message",
-                        "data": json.dumps({"chunk": chunk})
-                    }
-                
-                # Send completion event
-                yield {
-                    "event": "end",
-                    "data": json.dumps({"status": state.get("status"), "error": state.get("error", None)})
-                }
-                break
-            
-            await asyncio.sleep(0.1)
+        # Send completion event
+        state = await get_message_state(report_id)
+        yield {
+            "event": "end",
+            "data": json.dumps({"status": state.get("status"), "error": state.get("error", None)})
+        }
 
     return EventSourceResponse(event_generator())
 
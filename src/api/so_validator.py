@@ -4,7 +4,7 @@ from typing import List
 import json
 from src.models import APIOutput
 from src.utils.redis import get_redis
-from src.utils.database import get_next_request_id
+from src.utils.database import get_next_request_id, run_db
 
 router = APIRouter()
 
@@ -21,7 +21,7 @@ class SOValidatorRequest(BaseModel):
 async def validate_so(data: SOValidatorRequest):
     try:
         # 1. Generate unique request ID
-        request_id = get_next_request_id("SO")
+        request_id = await run_db(get_next_request_id, "SO")
         
         # 2. Store input data for the worker to pick up
         r = await get_redis()
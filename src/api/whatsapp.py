@@ -1,22 +1,32 @@
 from typing import List
 from fastapi import APIRouter, HTTPException, Request
 from src.models import APIOutput
+from src.models.jobs import JobPayload
 # from src.models.whatsapp import WhatsAppMessageCreate, WhatsAppWebhookRegister
 from src.services.whatsapp_service import WhatsAppService
 from src.utils.redis import enqueue_job
 
 router = APIRouter()
 
+# Job payload field -> whatsapp-service webhook field
+WEBHOOK_FIELDS = {
+    "conversation_id": "conversation_id",
+    "agent": "agent",
+    "user_id": "user_id",
+    "sender": "from_number",
+    "group_id": "group_id",
+    "content": "body",
+    "timestamp": "timestamp",
+}
+
 @router.post("/whatsapp/incoming")
 async def handle_incoming_whatsapp(request: Request):
     try:
         raw_data = await request.json()
         print(raw_data)
-        # Pass a payload with type and id
-        job_payload = {
-            "message_id": raw_data['id'],
-            "message_type": "whatsapp"
-        }
+        # Pass a payload with type and id, plus whatever context the Node service sent
+        context = {field: raw_data[key] for field, key in WEBHOOK_FIELDS.items() if key in raw_data}
+        job_payload = JobPayload.build(raw_data['id'], "whatsapp", **context).to_payload()
         print(f"Sending to redis: {job_payload}")
         await enqueue_job(job_payload) 
         
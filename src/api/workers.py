@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from src.models import APIOutput
+from src.utils.redis import get_queue_stats
+
+router = APIRouter()
+
+@router.get("/workers/stats", response_model=APIOutput)
+async def get_worker_stats():
+    """
+    LLM queue depth and per-worker in-flight job counts
+    """
+    try:
+        stats = await get_queue_stats()
+        return APIOutput.success(data=stats)
+    except Exception as e:
+        return APIOutput.failure(message=str(e))
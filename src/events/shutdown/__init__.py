@@ -1,4 +1,8 @@
 from fastapi import FastAPI
+from src.utils.stream_hub import stream_hub
+from src.utils.database import close_pools
 
 
-async def shutdown(app: FastAPI): ...
\ No newline at end of file
+async def shutdown(app: FastAPI):
+    await stream_hub.stop()
+    close_pools()
@@ -1,4 +1,6 @@
 from fastapi import FastAPI
+from src.utils.stream_hub import stream_hub
 
 
-async def startup(app: FastAPI): ...
\ No newline at end of file
+async def startup(app: FastAPI):
+    await stream_hub.start()
@@ -13,12 +13,15 @@ class APIOutput(BaseModel, Generic[T]):
     status_code: int
     message: str
     data: Optional[T] = None
+    # Opaque cursor for the next page of list endpoints, None on the last page
+    next_cursor: Optional[str] = None
 
     @staticmethod
     def success(
         data: Optional[T] = None,
         message: str = "Success",
         status_code: int = 200,
+        next_cursor: Optional[str] = None,
     ) -> JSONResponse:
         """
         Return a success JSON response
@@ -29,6 +32,7 @@ class APIOutput(BaseModel, Generic[T]):
                 status_code=status_code,
                 message=message,
                 data=data,
+                next_cursor=next_cursor,
             ).model_dump(mode='json'),
         )
 
@@ -23,3 +23,15 @@ class Conversation(ConversationBase):
 
     class Config:
         from_attributes = True
+
+class ConversationSummary(BaseModel):
+    conversation_id: int
+    message_type: str
+    summary: str
+    covered_until: datetime
+    covered_id: int
+    token_count: int = 0
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,61 @@
+from typing import Optional, Dict, Any, Union, Tuple
+from datetime import datetime
+from pydantic import BaseModel
+
+JOB_PAYLOAD_VERSION = 2
+
+# Fields a worker needs per message type to reply without loading the message
+MESSAGE_CONTEXT: Dict[str, Tuple[str, ...]] = {
+    "default": ("conversation_id",),
+    "whatsapp": ("conversation_id", "sender", "group_id", "content"),
+    "email": ("conversation_id", "sender", "thread_id", "subject", "content"),
+}
+# ... and to pick the agent without loading the conversation
+CONVERSATION_CONTEXT: Tuple[str, ...] = ("agent", "user_id")
+
+class JobPayload(BaseModel):
+    """
+    LLM work queue payload.
+
+    v1 payloads carry only message_id and message_type. v2 adds whatever the
+    enqueuing handler already knows about the message and its conversation
+    so the worker can skip loading them. Every v2 field is optional; the
+    worker falls back to the DB for anything missing.
+    """
+    v: int = 1
+    message_id: Union[int, str]
+    message_type: str = "default"
+    attempts: int = 0
+
+    # Conversation
+    conversation_id: Optional[int] = None
+    agent: Optional[str] = None
+    user_id: Optional[int] = None
+
+    # Incoming message (WhatsApp / email)
+    sender: Optional[str] = None
+    group_id: Optional[str] = None
+    thread_id: Optional[str] = None
+    subject: Optional[str] = None
+    content: Optional[str] = None
+    timestamp: Optional[datetime] = None
+
+    @classmethod
+    def build(cls, message_id: Union[int, str], message_type: str = "default", **context) -> "JobPayload":
+        return cls(v=JOB_PAYLOAD_VERSION, message_id=message_id, message_type=message_type, **context)
+
+    def to_payload(self) -> Dict[str, Any]:
+        """JSON-ready dict for enqueue_job; fields never set are left out"""
+        data = self.model_dump(mode="json", exclude_unset=True)
+        data.update(v=self.v, message_id=self.message_id, message_type=self.message_type)
+        return data
+
+    def _provided(self, names: Tuple[str, ...]) -> bool:
+        # None can be a real value (e.g. no group_id), so check what was set
+        return self.v >= 2 and all(name in self.model_fields_set for name in names)
+
+    def has_message_context(self) -> bool:
+        return self._provided(MESSAGE_CONTEXT.get(self.message_type, MESSAGE_CONTEXT["default"]))
+
+    def has_conversation_context(self) -> bool:
+        return self._provided(CONVERSATION_CONTEXT)
@@ -1,5 +1,8 @@
-from typing import List, Optional
-from src.utils.database import get_db_cursor
+import json
+from typing import List, Optional, Tuple
+from src.utils.database import get_db_cursor, run_db
+from src.utils.pagination import decode_cursor, next_page_cursor
+from src.utils import history_cache
 from src.models.conversations import ConversationCreate, ConversationUpdate, Conversation
 
 class ConversationService:
@@ -36,7 +39,7 @@ class ConversationService:
             SELECT id, user_id, agent, title, metadata, created_at, last_message_at
             FROM conversations
             WHERE user_id = %s
-            ORDER BY created_at DESC
+            ORDER BY created_at DESC, id DESC
             LIMIT %s OFFSET %s;
         """
         with get_db_cursor(commit=False) as cursor:
@@ -44,6 +47,31 @@ class ConversationService:
             rows = cursor.fetchall()
             return [Conversation(**row) for row in rows]
 
+    @staticmethod
+    def get_conversations_page(user_id: int, limit: int = 10, cursor: Optional[str] = None) -> Tuple[List[Conversation], Optional[str]]:
+        """
+        Newest-first page of a user's conversations, keyset-paginated on (created_at, id).
+        Returns the conversations and the cursor of the next page (None on the last page).
+        """
+        before = ""
+        params = [user_id]
+        if cursor:
+            before = "AND (created_at, id) < (%s, %s)"
+            params.extend(decode_cursor(cursor))
+        query = f"""
+            SELECT id, user_id, agent, title, metadata, created_at, last_message_at
+            FROM conversations
+            WHERE user_id = %s {before}
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s;
+        """
+        params.append(limit + 1)
+        with get_db_cursor(commit=False) as cur:
+            cur.execute(query, tuple(params))
+            rows = cur.fetchall()
+            next_cursor = next_page_cursor(rows, limit, "created_at")
+            return [Conversation(**row) for row in rows], next_cursor
+
     @staticmethod
     def update_conversation(id: int, data: ConversationUpdate) -> Optional[Conversation]:
         # Build dynamic query based on provided fields
@@ -74,8 +102,64 @@ class ConversationService:
                 return Conversation(**row)
             return None
 
+    @staticmethod
+    def find_by_email_thread(thread_id: str) -> Optional[Conversation]:
+        query = """
+            SELECT c.id, c.user_id, c.agent, c.title, c.metadata, c.created_at, c.last_message_at
+            FROM email_threads t
+            JOIN conversations c ON c.id = t.conversation_id
+            WHERE t.thread_id = %s;
+        """
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute(query, (thread_id,))
+            row = cursor.fetchone()
+            if row:
+                return Conversation(**row)
+            return None
+
+    @staticmethod
+    def get_or_create_for_email_thread(thread_id: str, data: ConversationCreate) -> Conversation:
+        """
+        Conversation mapped to an email thread, created from data if there is none.
+        A transaction-scoped advisory lock on the thread id serialises concurrent
+        webhooks for the same thread, so each thread gets exactly one conversation.
+        """
+        with get_db_cursor(commit=True) as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (thread_id,))
+            cursor.execute(
+                """
+                SELECT c.id, c.user_id, c.agent, c.title, c.metadata, c.created_at, c.last_message_at
+                FROM email_threads t
+                JOIN conversations c ON c.id = t.conversation_id
+                WHERE t.thread_id = %s;
+                """,
+                (thread_id,),
+            )
+            row = cursor.fetchone()
+            if row:
+                return Conversation(**row)
+
+            metadata = {**(data.metadata or {}), "email_thread_id": thread_id}
+            cursor.execute(
+                """
+                INSERT INTO conversations (user_id, agent, title, metadata)
+                VALUES (%s, %s, %s, %s)
+                RETURNING id, user_id, agent, title, metadata, created_at, last_message_at;
+                """,
+                (data.user_id, data.agent, data.title, json.dumps(metadata)),
+            )
+            row = cursor.fetchone()
+            cursor.execute(
+                "INSERT INTO email_threads (thread_id, conversation_id) VALUES (%s, %s);",
+                (thread_id, row["id"]),
+            )
+            return Conversation(**row)
+
     @staticmethod
     def find_by_metadata(key: str, value: str) -> Optional[Conversation]:
+        if key == "email_thread_id":
+            # Served by the email_threads mapping instead of a JSONB scan
+            return ConversationService.find_by_email_thread(value)
         query = f"""
             SELECT id, user_id, agent, title, metadata, created_at, last_message_at
             FROM conversations
@@ -95,3 +179,44 @@ class ConversationService:
         with get_db_cursor(commit=True) as cursor:
             cursor.execute(query, (id,))
             return cursor.rowcount > 0
+
+    # Async variants
+
+    @staticmethod
+    async def create_conversation_async(data: ConversationCreate) -> Conversation:
+        return await run_db(ConversationService.create_conversation, data)
+
+    @staticmethod
+    async def get_conversation_async(id: int) -> Optional[Conversation]:
+        return await run_db(ConversationService.get_conversation, id)
+
+    @staticmethod
+    async def get_conversations_async(user_id: int, limit: int = 10, offset: int = 0) -> List[Conversation]:
+        return await run_db(ConversationService.get_conversations, user_id, limit, offset)
+
+    @staticmethod
+    async def get_conversations_page_async(user_id: int, limit: int = 10, cursor: Optional[str] = None) -> Tuple[List[Conversation], Optional[str]]:
+        return await run_db(ConversationService.get_conversations_page, user_id, limit, cursor)
+
+    @staticmethod
+    async def update_conversation_async(id: int, data: ConversationUpdate) -> Optional[Conversation]:
+        return await run_db(ConversationService.update_conversation, id, data)
+
+    @staticmethod
+    async def find_by_email_thread_async(thread_id: str) -> Optional[Conversation]:
+        return await run_db(ConversationService.find_by_email_thread, thread_id)
+
+    @staticmethod
+    async def get_or_create_for_email_thread_async(thread_id: str, data: ConversationCreate) -> Conversation:
+        return await run_db(ConversationService.get_or_create_for_email_thread, thread_id, data)
+
+    @staticmethod
+    async def find_by_metadata_async(key: str, value: str) -> Optional[Conversation]:
+        return await run_db(ConversationService.find_by_metadata, key, value)
+
+    @staticmethod
+    async def delete_conversation_async(id: int) -> bool:
+        deleted = await run_db(ConversationService.delete_conversation, id)
+        if deleted:
+            await history_cache.invalidate(id, "default")
+        return deleted
@@ -1,46 +1,38 @@
 from typing import List, Optional
-from src.utils.database import get_db_cursor
+from src.utils.database import get_db_cursor, run_db
+from src.utils.pagination import Cursor, keyset_between
 from src.models.messages import Message, EmailMessage
 
 class EmailService:
     @staticmethod
     def get_message(id: str) -> Optional[EmailMessage]:
+        # The thread -> conversation mapping lives in email_threads
         query = """
             SELECT 
-                id, 
-                thread_id,
-                subject,
-                sender_email,
-                receiver_email,
-                CASE WHEN sender_role = 'assistant' THEN 'assistant' ELSE 'user' END as role, 
-                content,
-                content_type,
-                attachments,
-                message_id,
-                in_reply_to,
-                timestamp
-            FROM emails
-            WHERE id = %s;
+                e.id, 
+                e.thread_id,
+                e.subject,
+                e.sender_email,
+                e.receiver_email,
+                CASE WHEN e.sender_role = 'assistant' THEN 'assistant' ELSE 'user' END as role, 
+                e.content,
+                e.content_type,
+                e.attachments,
+                e.message_id,
+                e.in_reply_to,
+                e.timestamp,
+                t.conversation_id
+            FROM emails e
+            LEFT JOIN email_threads t ON t.thread_id = e.thread_id
+            WHERE e.id = %s;
         """
         with get_db_cursor(commit=False) as cursor:
             cursor.execute(query, (id,))
             row = cursor.fetchone()
             if row:
-                # Find or create a conversation_id based on thread_id
-                # For now, we assume thread_id could be mapped to conversation_id
-                # Or we might need a mapping table.
-                # In this project, conversations have an integer id.
-                
-                # Check for conversation mapping
-                conv_query = "SELECT id FROM conversations WHERE metadata->>'email_thread_id' = %s LIMIT 1;"
-                cursor.execute(conv_query, (row['thread_id'],))
-                conv_row = cursor.fetchone()
-                
-                conversation_id = conv_row['id'] if conv_row else None
-                
                 return EmailMessage(
                     id=str(row['id']),
-                    conversation_id=conversation_id,
+                    conversation_id=row['conversation_id'],
                     role=row['role'],
                     content=row['content'],
                     sender_email=row['sender_email'],
@@ -53,27 +45,20 @@ class EmailService:
 
     @staticmethod
     def get_messages_by_conversation_desc(conversation_id: int, limit: int = 20) -> List[Message]:
-        # We need to find the thread_id for this conversation
+        query = """
+            SELECT 
+                e.id, 
+                CASE WHEN e.sender_role = 'assistant' THEN 'assistant' ELSE 'user' END as role, 
+                e.content,
+                e.timestamp
+            FROM email_threads t
+            JOIN emails e ON e.thread_id = t.thread_id
+            WHERE t.conversation_id = %s
+            ORDER BY e.timestamp DESC
+            LIMIT %s;
+        """
         with get_db_cursor(commit=False) as cursor:
-            cursor.execute("SELECT metadata->>'email_thread_id' as thread_id FROM conversations WHERE id = %s;", (conversation_id,))
-            conv_row = cursor.fetchone()
-            if not conv_row or not conv_row['thread_id']:
-                return []
-            
-            thread_id = conv_row['thread_id']
-            
-            query = """
-                SELECT 
-                    id, 
-                    CASE WHEN sender_role = 'assistant' THEN 'assistant' ELSE 'user' END as role, 
-                    content,
-                    timestamp
-                FROM emails
-                WHERE thread_id = %s
-                ORDER BY timestamp DESC
-                LIMIT %s;
-            """
-            cursor.execute(query, (thread_id, limit))
+            cursor.execute(query, (conversation_id, limit))
             rows = cursor.fetchall()
             return [Message(
                 id=str(row['id']),
@@ -82,3 +67,44 @@ class EmailService:
                 content=row['content'],
                 timestamp=row['timestamp']
             ) for row in rows]
+
+    @staticmethod
+    def get_messages_by_conversation_between(conversation_id: int, after: Optional[Cursor], before: Cursor, limit: int = 40) -> List[Message]:
+        # Oldest first, for folding turns into the conversation summary
+        between, params = keyset_between(after, before, "e.")
+        query = f"""
+            SELECT 
+                e.id, 
+                CASE WHEN e.sender_role = 'assistant' THEN 'assistant' ELSE 'user' END as role, 
+                e.content,
+                e.timestamp
+            FROM email_threads t
+            JOIN emails e ON e.thread_id = t.thread_id
+            WHERE t.conversation_id = %s AND {between}
+            ORDER BY e.timestamp ASC, e.id ASC
+            LIMIT %s;
+        """
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute(query, (conversation_id, *params, limit))
+            rows = cursor.fetchall()
+            return [Message(
+                id=str(row['id']),
+                conversation_id=conversation_id,
+                role=row['role'],
+                content=row['content'],
+                timestamp=row['timestamp']
+            ) for row in rows]
+
+    # Async variants
+
+    @staticmethod
+    async def get_message_async(id: str) -> Optional[EmailMessage]:
+        return await run_db(EmailService.get_message, id)
+
+    @staticmethod
+    async def get_messages_by_conversation_desc_async(conversation_id: int, limit: int = 20) -> List[Message]:
+        return await run_db(EmailService.get_messages_by_conversation_desc, conversation_id, limit)
+
+    @staticmethod
+    async def get_messages_by_conversation_between_async(conversation_id: int, after: Optional[Cursor], before: Cursor, limit: int = 40) -> List[Message]:
+        return await run_db(EmailService.get_messages_by_conversation_between, conversation_id, after, before, limit)
@@ -1,6 +1,8 @@
-from typing import List, Optional, Union
+from typing import List, Optional, Tuple, Union
 import json
-from src.utils.database import get_db_cursor
+from src.utils.database import get_db_cursor, run_db
+from src.utils.pagination import Cursor, decode_cursor, keyset_between, next_page_cursor
+from src.utils import history_cache
 from src.models.messages import MessageCreate, MessageUpdate, Message, WhatsappMessage
 
 class MessageService:
@@ -43,7 +45,7 @@ class MessageService:
             SELECT id, conversation_id, role, content, metadata, timestamp
             FROM messages
             WHERE conversation_id = %s
-            ORDER BY timestamp ASC
+            ORDER BY timestamp ASC, id ASC
             LIMIT %s OFFSET %s;
         """
         with get_db_cursor(commit=False) as cursor:
@@ -51,6 +53,31 @@ class MessageService:
             rows = cursor.fetchall()
             return [Message(**row) for row in rows]
 
+    @staticmethod
+    def get_messages_page(conversation_id: int, limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[Message], Optional[str]]:
+        """
+        Oldest-first page of a conversation, keyset-paginated on (timestamp, id).
+        Returns the messages and the cursor of the next page (None on the last page).
+        """
+        after = ""
+        params = [conversation_id]
+        if cursor:
+            after = "AND (timestamp, id) > (%s, %s)"
+            params.extend(decode_cursor(cursor))
+        query = f"""
+            SELECT id, conversation_id, role, content, metadata, timestamp
+            FROM messages
+            WHERE conversation_id = %s {after}
+            ORDER BY timestamp ASC, id ASC
+            LIMIT %s;
+        """
+        params.append(limit + 1)
+        with get_db_cursor(commit=False) as cur:
+            cur.execute(query, tuple(params))
+            rows = cur.fetchall()
+            next_cursor = next_page_cursor(rows, limit, "timestamp")
+            return [Message(**row) for row in rows], next_cursor
+
     @staticmethod
     def get_messages_by_conversation_desc(conversation_id: int, limit: int = 20) -> List[Message]:
         query = """
@@ -65,6 +92,22 @@ class MessageService:
             rows = cursor.fetchall()
             return [Message(**row) for row in rows]
 
+    @staticmethod
+    def get_messages_by_conversation_between(conversation_id: int, after: Optional[Cursor], before: Cursor, limit: int = 40) -> List[Message]:
+        # Oldest first, for folding turns into the conversation summary
+        between, params = keyset_between(after, before)
+        query = f"""
+            SELECT id, conversation_id, role, content, metadata, timestamp
+            FROM messages
+            WHERE conversation_id = %s AND {between}
+            ORDER BY timestamp ASC, id ASC
+            LIMIT %s;
+        """
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute(query, (conversation_id, *params, limit))
+            rows = cursor.fetchall()
+            return [Message(**row) for row in rows]
+
     @staticmethod
     def update_message(id: Union[int, str], data: MessageUpdate) -> Optional[Message]:
         fields = []
@@ -100,3 +143,46 @@ class MessageService:
         with get_db_cursor(commit=True) as cursor:
             cursor.execute(query, (id,))
             return cursor.rowcount > 0
+
+    # Async variants
+
+    @staticmethod
+    async def create_message_async(data: MessageCreate) -> Message:
+        message = await run_db(MessageService.create_message, data)
+        await history_cache.append_message(message.conversation_id, "default", message)
+        return message
+
+    @staticmethod
+    async def get_message_async(id: Union[int, str]) -> Optional[Message]:
+        return await run_db(MessageService.get_message, id)
+
+    @staticmethod
+    async def get_messages_by_conversation_async(conversation_id: int, limit: int = 50, offset: int = 0) -> List[Message]:
+        return await run_db(MessageService.get_messages_by_conversation, conversation_id, limit, offset)
+
+    @staticmethod
+    async def get_messages_page_async(conversation_id: int, limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[Message], Optional[str]]:
+        return await run_db(MessageService.get_messages_page, conversation_id, limit, cursor)
+
+    @staticmethod
+    async def get_messages_by_conversation_desc_async(conversation_id: int, limit: int = 20) -> List[Message]:
+        return await run_db(MessageService.get_messages_by_conversation_desc, conversation_id, limit)
+
+    @staticmethod
+    async def get_messages_by_conversation_between_async(conversation_id: int, after: Optional[Cursor], before: Cursor, limit: int = 40) -> List[Message]:
+        return await run_db(MessageService.get_messages_by_conversation_between, conversation_id, after, before, limit)
+
+    @staticmethod
+    async def update_message_async(id: Union[int, str], data: MessageUpdate) -> Optional[Message]:
+        message = await run_db(MessageService.update_message, id, data)
+        if message:
+            await history_cache.replace_message(message.conversation_id, "default", message)
+        return message
+
+    @staticmethod
+    async def delete_message_async(id: Union[int, str]) -> bool:
+        message = await run_db(MessageService.get_message, id)
+        deleted = await run_db(MessageService.delete_message, id)
+        if message and deleted:
+            await history_cache.invalidate(message.conversation_id, "default")
+        return deleted
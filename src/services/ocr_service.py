@@ -1,5 +1,5 @@
 from typing import List, Optional, Dict, Any
-from src.utils.database import get_db_cursor, get_db_config
+from src.utils.database import get_db_cursor, get_db_config, run_db
 from src.utils import logger
 import json
 
@@ -84,3 +84,25 @@ class OCRService:
         """
         with get_db_cursor(commit=True, db_config=get_db_config()) as cursor:
             cursor.execute(query, (status, task_id))
+
+    # Async variants
+
+    @staticmethod
+    async def add_to_queue_async(filepath: str, json_schema: Dict[str, Any], priority: str) -> int:
+        return await run_db(OCRService.add_to_queue, filepath, json_schema, priority)
+
+    @staticmethod
+    async def get_task_status_async(task_id: int) -> Optional[Dict[str, Any]]:
+        return await run_db(OCRService.get_task_status, task_id)
+
+    @staticmethod
+    async def get_next_task_async() -> Optional[Dict[str, Any]]:
+        return await run_db(OCRService.get_next_task)
+
+    @staticmethod
+    async def update_task_result_async(task_id: int, result: Dict[str, Any], status: str = 'done'):
+        return await run_db(OCRService.update_task_result, task_id, result, status)
+
+    @staticmethod
+    async def update_task_status_async(task_id: int, status: str):
+        return await run_db(OCRService.update_task_status, task_id, status)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from src.utils.database import get_db_cursor, get_db_config
+from src.utils.database import get_db_cursor, get_db_config, run_db
 from src.utils import logger
 import asyncio
 from src.utils.redis import update_state, append_chunk
@@ -28,6 +28,15 @@ class PerformanceService:
                 "items": items
             }
 
+    @staticmethod
+    def save_report(report_id: str, grn_number: str, report: str):
+        with get_db_cursor(commit=True, db_config=get_db_config()) as cursor:
+            query = """
+                INSERT INTO vendor_performance_analysis (request_id, grn_number, report)
+                VALUES (%s, %s, %s)
+            """
+            cursor.execute(query, (report_id, grn_number, report))
+
     @staticmethod
     async def generate_performance_report(report_id: str, grn_number: str):
         try:
@@ -42,7 +51,7 @@ class PerformanceService:
             
             await asyncio.sleep(0.3)
             
-            data = PerformanceService.get_grn_data(grn_number)
+            data = await PerformanceService.get_grn_data_async(grn_number)
             
             if not data:
                 await append_chunk(report_id, f"❌ **Error:** GRN `{grn_number}` was not found in the system.\n")
@@ -144,12 +153,7 @@ class PerformanceService:
                 chunks = await get_stream_history(report_id)
                 full_report = "".join(chunks)
                 
-                with get_db_cursor(commit=True, db_config=get_db_config()) as cursor:
-                    query = """
-                        INSERT INTO vendor_performance_analysis (request_id, grn_number, report)
-                        VALUES (%s, %s, %s)
-                    """
-                    cursor.execute(query, (report_id, grn_number, full_report))
+                await PerformanceService.save_report_async(report_id, grn_number, full_report)
                 logger.info(f"Report {report_id} saved to Postgres")
             except Exception as db_err:
                 logger.error(f"Failed to save report to Postgres: {db_err}")
@@ -158,3 +162,13 @@ class PerformanceService:
             logger.error(f"Error generating report {report_id}: {e}")
             await update_state(report_id, "error", error=str(e))
             await append_chunk(report_id, f"\n\n**Error during generation**: {str(e)}")
+
+    # Async variants
+
+    @staticmethod
+    async def get_grn_data_async(grn_number: str):
+        return await run_db(PerformanceService.get_grn_data, grn_number)
+
+    @staticmethod
+    async def save_report_async(report_id: str, grn_number: str, report: str):
+        return await run_db(PerformanceService.save_report, report_id, grn_number, report)
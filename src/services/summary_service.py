@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import Optional
+from src.utils.database import get_db_cursor, run_db
+from src.models.conversations import ConversationSummary
+
+class SummaryService:
+    @staticmethod
+    def get_summary(conversation_id: int, message_type: str) -> Optional[ConversationSummary]:
+        query = """
+            SELECT conversation_id, message_type, summary, covered_until, covered_id, token_count, updated_at
+            FROM conversation_summaries
+            WHERE conversation_id = %s AND message_type = %s;
+        """
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute(query, (conversation_id, message_type))
+            row = cursor.fetchone()
+            if row:
+                return ConversationSummary(**row)
+            return None
+
+    @staticmethod
+    def save_summary(conversation_id: int, message_type: str, summary: str, covered_until: datetime, covered_id: int, token_count: int) -> bool:
+        """
+        Store a refreshed summary. A refresh that covers less than the stored
+        one (two replicas racing) is dropped; returns whether it was stored.
+        """
+        query = """
+            INSERT INTO conversation_summaries (conversation_id, message_type, summary, covered_until, covered_id, token_count)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (conversation_id, message_type) DO UPDATE
+            SET summary = EXCLUDED.summary,
+                covered_until = EXCLUDED.covered_until,
+                covered_id = EXCLUDED.covered_id,
+                token_count = EXCLUDED.token_count,
+                updated_at = NOW()
+            WHERE (conversation_summaries.covered_until, conversation_summaries.covered_id)
+                < (EXCLUDED.covered_until, EXCLUDED.covered_id);
+        """
+        with get_db_cursor(commit=True) as cursor:
+            cursor.execute(query, (conversation_id, message_type, summary, covered_until, covered_id, token_count))
+            return cursor.rowcount > 0
+
+    # Async variants
+
+    @staticmethod
+    async def get_summary_async(conversation_id: int, message_type: str) -> Optional[ConversationSummary]:
+        return await run_db(SummaryService.get_summary, conversation_id, message_type)
+
+    @staticmethod
+    async def save_summary_async(conversation_id: int, message_type: str, summary: str, covered_until: datetime, covered_id: int, token_count: int) -> bool:
+        return await run_db(SummaryService.save_summary, conversation_id, message_type, summary, covered_until, covered_id, token_count)
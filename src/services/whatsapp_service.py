@@ -1,6 +1,7 @@
 from typing import List, Optional
 import json
-from src.utils.database import get_db_cursor
+from src.utils.database import get_db_cursor, run_db
+from src.utils.pagination import Cursor, keyset_between
 from src.models.messages import MessageCreate, MessageUpdate, Message, WhatsappMessage
 
 class WhatsAppService:
@@ -52,6 +53,30 @@ class WhatsAppService:
             rows = cursor.fetchall()
             return [Message(**row) for row in rows]
 
+    @staticmethod
+    def get_messages_by_conversation_between(conversation_id: int, after: Optional[Cursor], before: Cursor, limit: int = 40) -> List[Message]:
+        # Oldest first, for folding turns into the conversation summary
+        between, params = keyset_between(after, before)
+        query = f"""
+            SELECT 
+                id, 
+                conversation_id, 
+                CASE WHEN is_from_me THEN 'assistant' ELSE 'user' END as role, 
+                body as content, 
+                NULL as metadata,
+                from_number,
+                group_id,
+                timestamp
+            FROM whatsapp_messages
+            WHERE conversation_id = %s AND {between}
+            ORDER BY timestamp ASC, id ASC
+            LIMIT %s;
+        """
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute(query, (conversation_id, *params, limit))
+            rows = cursor.fetchall()
+            return [Message(**row) for row in rows]
+
     @staticmethod
     def update_message(id: int, data: MessageUpdate) -> Optional[dict]:
         fields = []
@@ -96,4 +121,26 @@ class WhatsAppService:
         query = "DELETE FROM whatsapp_messages WHERE id = %s;"
         with get_db_cursor(commit=True) as cursor:
             cursor.execute(query, (id,))
-            return cursor.rowcount > 0
\ No newline at end of file
+            return cursor.rowcount > 0
+
+    # Async variants
+
+    @staticmethod
+    async def get_message_async(id: int) -> Optional[WhatsappMessage]:
+        return await run_db(WhatsAppService.get_message, id)
+
+    @staticmethod
+    async def get_messages_by_conversation_desc_async(conversation_id: int, limit: int = 20) -> List[Message]:
+        return await run_db(WhatsAppService.get_messages_by_conversation_desc, conversation_id, limit)
+
+    @staticmethod
+    async def get_messages_by_conversation_between_async(conversation_id: int, after: Optional[Cursor], before: Cursor, limit: int = 40) -> List[Message]:
+        return await run_db(WhatsAppService.get_messages_by_conversation_between, conversation_id, after, before, limit)
+
+    @staticmethod
+    async def update_message_async(id: int, data: MessageUpdate) -> Optional[dict]:
+        return await run_db(WhatsAppService.update_message, id, data)
+
+    @staticmethod
+    async def delete_message_async(id: int) -> bool:
+        return await run_db(WhatsAppService.delete_message, id)
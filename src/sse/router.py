@@ -1,55 +1,42 @@
-import asyncio
 import logging
 from fastapi import APIRouter, Request
 from sse_starlette.sse import EventSourceResponse
-from src.utils.redis import get_stream_history, wait_for_stream_item, get_message_state
+from src.utils.redis import get_message_state
+from src.utils.stream_hub import stream_hub, STREAM_RESET
 
 router = APIRouter(prefix="/sse")
 logger = logging.getLogger(__name__)
 
-@router.get("/message-reply/{message_id}")
-async def stream_message_reply(request: Request, message_id: int):
-    """
-    Stream the reply for a given message ID using Server-Sent Events (SSE).
-    """
-    async def event_generator():
-        # 1. Send existing history
-        history = await get_stream_history(message_id)
-        current_index = 0
-        
-        for chunk in history:
-            current_index += 1
-            yield {"data": chunk}
-
-        # 2. Poll for new chunks
-        while True:
+async def message_reply_events(request: Request, message_id: int):
+    """SSE events for a message's reply: chunks, a reset when the job restarts, then its final state"""
+    # History and live chunks both come from the shared stream hub,
+    # which holds a single Redis subscription per message
+    async for chunk in stream_hub.stream(message_id):
+        if chunk is None:
             if await request.is_disconnected():
                 logger.info(f"Client disconnected from stream {message_id}")
-                break
+                return
+            continue
+        if chunk is STREAM_RESET:
+            # The job was re-queued; the client drops the partial reply
+            yield {"event": "reset", "data": "{}"}
+            continue
+        yield {"data": chunk}
 
-            # Poll for new items
-            new_chunks = await wait_for_stream_item(message_id, current_index, timeout=2) # Short timeout for responsiveness
-            
-            if new_chunks:
-                for chunk in new_chunks:
-                    current_index += 1
-                    yield {"data": chunk}
-            
-            # Check completion status
-            state = await get_message_state(message_id)
-            status = state.get("status")
-            
-            if status == "done":
-                yield {"event": "done", "data": "Stream finished"}
-                break
-            
-            if status == "error":
-                error_msg = state.get("error", "Unknown error")
-                yield {"event": "error", "data": error_msg}
-                break
+    # Check completion status
+    state = await get_message_state(message_id)
+    status = state.get("status")
 
-            # Small sleep if no new chunks (wait_for_stream_item already sleeps, but just in case)
-            if not new_chunks:
-                 await asyncio.sleep(0.1)
+    if status == "done":
+        yield {"event": "done", "data": "Stream finished"}
+    elif status == "error":
+        error_msg = state.get("error", "Unknown error")
+        yield {"event": "error", "data": error_msg}
 
-    return EventSourceResponse(event_generator())
+
+@router.get("/message-reply/{message_id}")
+async def stream_message_reply(request: Request, message_id: int):
+    """
+    Stream the reply for a given message ID using Server-Sent Events (SSE).
+    """
+    return EventSourceResponse(message_reply_events(request, message_id))
@@ -1,8 +1,18 @@
 import os
+import re
+import time
+import random
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
 from contextlib import contextmanager
 from src.utils import logger
+from src.utils.metrics import Histogram, Counter
 import sqlite3
 from dotenv import load_dotenv
 
@@ -29,27 +39,237 @@ def get_db_config():
     }
 
 
+# -------------------------
+# Connection pooling
+# -------------------------
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# Connections idle for longer than this are pinged before being handed out
+DB_POOL_CHECK_IDLE = float(os.getenv("DB_POOL_CHECK_IDLE", 30))
+
+
+class ConnectionPool:
+    """
+    Thread-safe Postgres connection pool with a bounded size.
+    Callers block (up to DB_POOL_TIMEOUT) instead of failing when the pool is
+    exhausted, and connections are health-checked on checkout.
+    """
+
+    def __init__(self, config: dict, minconn: int = DB_POOL_MIN_SIZE, maxconn: int = DB_POOL_MAX_SIZE):
+        self.name = f"{config.get('dbname')}@{config.get('host')}:{config.get('port')}"
+        self.maxconn = maxconn
+        self.pid = os.getpid()
+        self._pool = ThreadedConnectionPool(
+            minconn,
+            maxconn,
+            host=config.get("host"),
+            port=int(config.get("port", 5432)),
+            dbname=config.get("dbname"),
+            user=config.get("user"),
+            password=config.get("password"),
+        )
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._returned_at: dict = {}
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "timeouts": 0,
+            "discarded": 0,
+            "in_use": 0,
+            "max_in_use": 0,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["size"] = self.maxconn
+        stats["saturation"] = stats["in_use"] / self.maxconn
+        return stats
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        idle_for = time.monotonic() - self._returned_at.get(id(conn), 0)
+        if idle_for < DB_POOL_CHECK_IDLE:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _checkout(self):
+        if not self._slots.acquire(blocking=False):
+            started = time.monotonic()
+            acquired = self._slots.acquire(timeout=DB_POOL_TIMEOUT)
+            with self._lock:
+                self._stats["waits"] += 1
+                self._stats["wait_time_total"] += time.monotonic() - started
+                if not acquired:
+                    self._stats["timeouts"] += 1
+            if not acquired:
+                raise PoolError(f"Timed out after {DB_POOL_TIMEOUT}s waiting for a connection from pool {self.name}")
+
+        try:
+            conn = self._pool.getconn()
+            while not self._healthy(conn):
+                logger.warning(f"Discarding broken connection from pool {self.name}")
+                self._returned_at.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+                with self._lock:
+                    self._stats["discarded"] += 1
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["max_in_use"] = max(self._stats["max_in_use"], self._stats["in_use"])
+        return conn
+
+    def _checkin(self, conn, reset_session: bool = False):
+        try:
+            close = bool(conn.closed)
+            if not close and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                # Never hand out a connection with a half-finished transaction
+                try:
+                    conn.rollback()
+                except Exception:
+                    close = True
+            if not close and reset_session:
+                try:
+                    self._reset_session(conn)
+                except Exception as e:
+                    logger.warning(f"Closing connection of pool {self.name} that could not be reset: {e}")
+                    close = True
+            if close:
+                self._returned_at.pop(id(conn), None)
+            else:
+                self._returned_at[id(conn)] = time.monotonic()
+            self._pool.putconn(conn, close=close)
+        finally:
+            with self._lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    @staticmethod
+    def _reset_session(conn):
+        """Drop session state a caller left behind: settings, temp tables, prepared statements, locks"""
+        # DISCARD ALL can't run inside a transaction block
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("DISCARD ALL")
+        finally:
+            conn.autocommit = False
+
+    @contextmanager
+    def connection(self, reset_session: bool = False):
+        """
+        Borrow a connection. reset_session runs DISCARD ALL when it comes
+        back, for callers that run statements we don't control (LLM-written
+        SQL) and may change session state.
+        """
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn, reset_session)
+
+    def close(self):
+        self._pool.closeall()
+
+
+_pools: dict = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(config: dict) -> ConnectionPool:
+    """Return the process-wide pool for a Postgres config, creating it on first use"""
+    key = (config.get("host"), str(config.get("port")), config.get("dbname"), config.get("user"))
+    pool = _pools.get(key)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+
+    with _pools_lock:
+        pool = _pools.get(key)
+        # Connections must not be shared across forked processes
+        if pool is None or pool.pid != os.getpid():
+            logger.info(f"Creating Postgres connection pool: {config.get('host')}:{config.get('port')}/{config.get('dbname')}")
+            pool = ConnectionPool(config)
+            _pools[key] = pool
+        return pool
+
+
+def get_pool_stats() -> dict:
+    """Saturation metrics for every pool in this process"""
+    return {pool.name: pool.stats() for pool in list(_pools.values())}
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+# -------------------------
+# Async access
+# -------------------------
+# psycopg2 is blocking, so async callers run queries on a dedicated thread
+# pool sized to the connection pool. The event loop stays free while queries
+# are in flight and concurrent jobs overlap their DB round trips.
+
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", DB_POOL_MAX_SIZE))
+
+_db_executor: ThreadPoolExecutor | None = None
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    global _db_executor
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+    return _db_executor
+
+
+async def run_db(fn, *args, **kwargs):
+    """Run a blocking DB function without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), functools.partial(fn, *args, **kwargs))
+
+
 @contextmanager
-def get_db_connection(db_config: dict = None, **kwargs):
-    """Context manager for database connections (Postgres or SQLite)"""
-    conn = None
+def get_db_connection(db_config: dict = None, reset_session: bool = False, **kwargs):
+    """Context manager for database connections (Postgres or SQLite).
+    Postgres connections are borrowed from a per-database pool; with
+    reset_session their session state is discarded when returned."""
     config = (db_config or get_db_config()).copy()
     if kwargs:
         config.update(kwargs)
     db_type = config.get("db_type", "postgres")
     
+    if db_type == "postgres":
+        try:
+            pool = get_pool(config)
+            with pool.connection(reset_session) as conn:
+                logger.debug(f"Borrowed Postgres connection from pool {pool.name}")
+                yield conn
+        except Exception as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+        return
+
+    conn = None
     try:
-        if db_type == "postgres":
-            logger.debug(f"Connecting to Postgres database: {config.get('host')}:{config.get('port')}/{config.get('dbname')}")
-            conn = psycopg2.connect(
-                host=config.get("host"),
-                port=int(config.get("port", 5432)),
-                dbname=config.get("dbname"),
-                user=config.get("user"),
-                password=config.get("password")
-            )
-            logger.info(f"Postgres database connection established")
-        elif db_type == "sqlite":
+        if db_type == "sqlite":
             db_path = config.get("db_path", "database.sqlite")
             logger.debug(f"Connecting to SQLite database: {db_path}")
             conn = sqlite3.connect(db_path)
@@ -68,8 +288,66 @@ def get_db_connection(db_config: dict = None, **kwargs):
 
 
 
+# -------------------------
+# Query instrumentation
+# -------------------------
+
+# Per-statement logging is off by default; when on, only a sample of
+# statements is logged. Timing histograms are always recorded.
+DB_QUERY_LOG = os.getenv("DB_QUERY_LOG", "false").lower() in ("1", "true", "yes")
+DB_QUERY_LOG_SAMPLE_RATE = float(os.getenv("DB_QUERY_LOG_SAMPLE_RATE", 1.0))
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", 500))
+
+QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Statement execution time by normalized query",
+    labelnames=("query",),
+)
+QUERY_ERRORS = Counter(
+    "db_query_errors_total",
+    "Failed statements by normalized query",
+    labelnames=("query",),
+)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint_query(query: str) -> str:
+    """
+    Normalize a statement so that all executions of the same query share a key:
+    collapses whitespace and replaces inline literals and IN-lists with placeholders.
+    Cached, since the services reuse a small set of query strings.
+    """
+    normalized = " ".join(query.split())
+    normalized = _STRING_LITERAL.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("(...)", normalized)
+    return normalized.rstrip(";").strip()
+
+
+def get_query_stats(limit: int = 50) -> list:
+    """Per-query timing, sorted by total time spent (the queries that dominate DB time first)"""
+    errors = QUERY_ERRORS.snapshot()
+    stats = []
+    for (query,), data in QUERY_DURATION.snapshot().items():
+        stats.append({
+            "query": query,
+            "count": data["count"],
+            "total_ms": round(data["sum"] * 1000, 2),
+            "mean_ms": round(data["sum"] / data["count"] * 1000, 2) if data["count"] else 0,
+            "p50_ms_le": QUERY_DURATION.quantile(0.5, query=query) * 1000,
+            "p95_ms_le": QUERY_DURATION.quantile(0.95, query=query) * 1000,
+            "errors": int(errors.get((query,), 0)),
+        })
+    stats.sort(key=lambda item: item["total_ms"], reverse=True)
+    return stats[:limit]
+
+
 class LoggingCursor:
-    """Wrapper around RealDictCursor that logs queries and results"""
+    """Wrapper around RealDictCursor that times statements and (optionally) logs them"""
 
     def __init__(self, cursor):
         self._cursor = cursor
@@ -79,37 +357,41 @@ class LoggingCursor:
     def execute(self, query, params=None):
         self._last_query = query
         self._last_params = params
-        
-        # Clean up query for logging (remove extra whitespace)
-        clean_query = " ".join(query.split())
-        logger.info(f"Executing query: {clean_query}")
-        if params:
-            logger.debug(f"Query params: {params}")
-        
-        result = self._cursor.execute(query, params)
-        
-        rowcount = self._cursor.rowcount
-        if rowcount >= 0:
-            logger.info(f"Rows affected: {rowcount}")
-        
+
+        started = time.perf_counter()
+        try:
+            result = self._cursor.execute(query, params)
+        except Exception:
+            QUERY_ERRORS.inc(query=fingerprint_query(query))
+            raise
+        elapsed = time.perf_counter() - started
+
+        fingerprint = fingerprint_query(query)
+        QUERY_DURATION.observe(elapsed, query=fingerprint)
+
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms >= DB_SLOW_QUERY_MS:
+            logger.warning(f"Slow query ({elapsed_ms:.1f} ms, rows {self._cursor.rowcount}): {fingerprint}")
+        elif DB_QUERY_LOG and random.random() < DB_QUERY_LOG_SAMPLE_RATE:
+            logger.info(f"Executed query ({elapsed_ms:.1f} ms, rows {self._cursor.rowcount}): {fingerprint}")
+            if params:
+                logger.debug(f"Query params: {params}")
+
         return result
 
     def fetchone(self):
-        result = self._cursor.fetchone()
-        if result:
-            logger.debug(f"Fetched 1 row")
-        else:
-            logger.debug(f"No rows returned")
-        return result
+        return self._cursor.fetchone()
 
     def fetchall(self):
         results = self._cursor.fetchall()
-        logger.info(f"Fetched {len(results)} rows")
+        if DB_QUERY_LOG:
+            logger.debug(f"Fetched {len(results)} rows")
         return results
 
     def fetchmany(self, size=None):
         results = self._cursor.fetchmany(size)
-        logger.info(f"Fetched {len(results)} rows")
+        if DB_QUERY_LOG:
+            logger.debug(f"Fetched {len(results)} rows")
         return results
 
     @property
@@ -0,0 +1,213 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Union
+from PIL import Image, ImageChops, ImageOps
+from src.utils import logger
+from src.utils.metrics import Histogram
+
+# -------------------------
+# Image preprocessing for vision LLM calls
+# -------------------------
+# The vision encoder resizes anything larger than its max pixels anyway, so
+# full-resolution scans only cost upload bytes and base64 work. Before an
+# image is sent it is trimmed to its content, downscaled to the model's
+# budget, turned grayscale when it has no meaningful colour, and encoded
+# once as JPEG under a size target.
+
+# Qwen2-VL / Qwen2.5-VL serve max_pixels = 1280 * 28 * 28 by default
+VISION_MAX_PIXELS = int(os.getenv("VISION_MAX_PIXELS", 1280 * 28 * 28))
+VISION_TARGET_BYTES = int(os.getenv("VISION_TARGET_BYTES", 300 * 1024))
+# Encoding starts at the first quality and steps down until under the target
+VISION_JPEG_QUALITIES = (85, 75, 65, 55)
+# Threshold grayscale documents to black and white (off: it can drop faint text)
+VISION_BINARIZE = os.getenv("VISION_BINARIZE", "false").lower() in ("1", "true", "yes")
+# Mean saturation (0-255) under which an image is treated as grayscale
+GRAYSCALE_MAX_SATURATION = 24
+# Pixels differing from the background by less than this count as blank
+TRIM_TOLERANCE = 24
+TRIM_PADDING = 16
+# Prepared images (or a page's prepared chunks) kept per process, so a
+# retried job doesn't re-encode its pages
+PREPARED_CACHE_SIZE = int(os.getenv("VISION_PREPARED_CACHE_SIZE", 64))
+
+PREPARED_IMAGE_BYTES = Histogram(
+    "vision_prepared_image_bytes", "Encoded size of images prepared for the vision LLM",
+    buckets=(16384, 32768, 65536, 131072, 262144, 524288, 1048576, 2097152, 4194304),
+)
+
+
+class PreparedImage:
+    """
+    An encoded JPEG ready to send. Duck-types RAW's Image for the LLM
+    clients; to_base64() is computed once, so retries and hedged
+    duplicates of a request reuse it.
+    """
+
+    def __init__(self, data: bytes, width: int = 0, height: int = 0):
+        self.data = data
+        self.width = width
+        self.height = height
+        self._base64: Optional[str] = None
+
+    def to_base64(self) -> str:
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode("ascii")
+        return self._base64
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+
+def load_image(data: bytes) -> Image.Image:
+    img = Image.open(io.BytesIO(data))
+    # Apply camera rotation before anything measures the image
+    return ImageOps.exif_transpose(img)
+
+
+def trim_margins(img: Image.Image) -> Image.Image:
+    """Crop uniform borders (the colour of the top-left pixel), keeping a little padding"""
+    # The content box is found on a reduced copy; box-averaging keeps thin strokes visible
+    factor = max(1, min(img.size) // 800)
+    gray = img.convert("L").reduce(factor)
+    background = Image.new("L", gray.size, gray.getpixel((0, 0)))
+    diff = ImageChops.difference(gray, background).point(lambda p: 255 if p > TRIM_TOLERANCE else 0)
+    box = diff.getbbox()
+    if box is None:
+        return img
+    left, top, right, bottom = (edge * factor for edge in box)
+    box = (
+        max(left - TRIM_PADDING, 0), max(top - TRIM_PADDING, 0),
+        min(right + TRIM_PADDING, img.width), min(bottom + TRIM_PADDING, img.height),
+    )
+    return img.crop(box) if box != (0, 0, img.width, img.height) else img
+
+
+def fit_pixels(img: Image.Image, max_pixels: int = VISION_MAX_PIXELS) -> Image.Image:
+    pixels = img.width * img.height
+    if pixels <= max_pixels:
+        return img
+    scale = (max_pixels / pixels) ** 0.5
+    size = (max(int(img.width * scale), 1), max(int(img.height * scale), 1))
+    # reducing_gap shrinks by whole factors first, much faster on large scans
+    return img.resize(size, Image.LANCZOS, reducing_gap=3.0)
+
+
+def is_grayscale(img: Image.Image) -> bool:
+    if img.mode in ("1", "L", "LA", "I", "I;16", "F"):
+        return True
+    # A thumbnail is plenty to tell a scan from a photo
+    thumb = img.convert("RGB")
+    thumb.thumbnail((256, 256))
+    saturation = thumb.convert("HSV").getchannel("S")
+    histogram = saturation.histogram()
+    mean = sum(value * count for value, count in enumerate(histogram)) / max(sum(histogram), 1)
+    return mean < GRAYSCALE_MAX_SATURATION
+
+
+def otsu_threshold(gray: Image.Image) -> int:
+    histogram = gray.histogram()
+    total = sum(histogram)
+    weighted_total = sum(value * count for value, count in enumerate(histogram))
+    background = background_weighted = 0
+    best, threshold = -1.0, 128
+    for value, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        background_weighted += value * count
+        mean_background = background_weighted / background
+        mean_foreground = (weighted_total - background_weighted) / foreground
+        between = background * foreground * (mean_background - mean_foreground) ** 2
+        if between > best:
+            best, threshold = between, value
+    return threshold
+
+
+def encode_jpeg(img: Image.Image, target_bytes: int = VISION_TARGET_BYTES) -> bytes:
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    for quality in VISION_JPEG_QUALITIES:
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=quality, optimize=True)
+        if buf.tell() <= target_bytes:
+            break
+    return buf.getvalue()
+
+
+def preprocess(img: Image.Image, max_pixels: int = VISION_MAX_PIXELS, target_bytes: int = VISION_TARGET_BYTES, trim: bool = True) -> PreparedImage:
+    if img.mode in ("RGBA", "LA", "P"):
+        # Transparent areas become white, not black
+        rgba = img.convert("RGBA")
+        img = Image.new("RGB", rgba.size, (255, 255, 255))
+        img.paste(rgba, mask=rgba.getchannel("A"))
+    if trim:
+        img = trim_margins(img)
+    # Decided before resizing, so a scan is resampled as one channel rather than three
+    grayscale = is_grayscale(img)
+    if grayscale:
+        img = img.convert("L")
+    img = fit_pixels(img, max_pixels)
+    if grayscale and VISION_BINARIZE:
+        img = ImageOps.autocontrast(img)
+        threshold = otsu_threshold(img)
+        img = img.point(lambda p: 255 if p > threshold else 0)
+
+    data = encode_jpeg(img, target_bytes)
+    PREPARED_IMAGE_BYTES.observe(len(data))
+    return PreparedImage(data, img.width, img.height)
+
+
+_prepared: "OrderedDict[str, Any]" = OrderedDict()
+# Parsers prepare images on worker threads (asyncio.to_thread)
+_prepared_lock = threading.Lock()
+
+def source_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def cached(key: str, build: Callable[[], Any]) -> Any:
+    """
+    build() once per key, kept in the prepared-image LRU. Keys start with
+    the source bytes' digest (source_digest), plus whatever else shapes the
+    result.
+    """
+    with _prepared_lock:
+        value = _prepared.get(key)
+        if value is not None:
+            _prepared.move_to_end(key)
+            return value
+
+    value = build()
+    with _prepared_lock:
+        _prepared[key] = value
+        if len(_prepared) > PREPARED_CACHE_SIZE:
+            _prepared.popitem(last=False)
+    return value
+
+
+def prepare_image(source: Union[bytes, Image.Image], max_pixels: int = VISION_MAX_PIXELS, trim: bool = True) -> PreparedImage:
+    """
+    Image bytes or a PIL image, ready for a vision LLM call. Bytes that
+    can't be decoded are passed through unchanged. Only bytes are cached;
+    callers that cut PIL images from bytes cache the result themselves
+    (see split_image_into_safe_chunks). CPU-bound: async callers run it in
+    a thread.
+    """
+    if isinstance(source, Image.Image):
+        return preprocess(source, max_pixels, trim=trim)
+
+    def build() -> PreparedImage:
+        try:
+            return preprocess(load_image(source), max_pixels, trim=trim)
+        except Exception as e:
+            logger.warning(f"Image preprocessing failed, sending the original: {e}")
+            return PreparedImage(source)
+
+    return cached(f"{source_digest(source)}:{max_pixels}:{int(trim)}", build)
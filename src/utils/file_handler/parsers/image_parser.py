@@ -1,15 +1,22 @@
-from RAW.modals import Image
+import asyncio
+from typing import Union
 from RAW.llms import BaseLLM
+from ..image_preprocess import PreparedImage, prepare_image
 
-async def image_parser(image_data: bytes, llm: BaseLLM, markdown: bool = False) -> str:
+async def image_parser(image_data: Union[bytes, PreparedImage], llm: BaseLLM, markdown: bool = False) -> str:
     """Extract text from an image using an LLM.
+    Raw bytes are downscaled, trimmed and re-encoded first (prepare_image).
     Optionally return results as a markdown-formatted string.
     """
     print("Processing Image for OCR...")
     try:
         # if llm is None or not hasattr(llm, "generate"):
         #     return "[OCR Skipped: No text generation capability]"
-        image = Image.from_bytes(image_data)
+        if isinstance(image_data, PreparedImage):
+            image = image_data
+        else:
+            # Resizing and encoding are CPU work; keep them off the event loop
+            image = await asyncio.to_thread(prepare_image, image_data)
         
         prompt = "Extract all visible text from the image accurately. Return only the extracted text."
     
@@ -1,10 +1,10 @@
+import asyncio
 import fitz  # PyMuPDF
-import io
 from io import BytesIO
 from .image_parser import image_parser
+from ..image_preprocess import PreparedImage, cached, load_image, prepare_image, source_digest, trim_margins
 from RAW.llms import BaseLLM
 from typing import Optional, List, Dict, Any
-from PIL import Image
 
 async def pdf_parser(
     pdf_data: bytes,
@@ -21,7 +21,8 @@ async def pdf_parser(
         if not isinstance(pdf_data, bytes):
             raise TypeError(f"Expected bytes for pdf_data, got {type(pdf_data)}")
 
-        pages: List[Dict[str, Any]] = []
+        # Page text and the image chunks to OCR, in page order
+        page_parts: List[List[Any]] = []
         pdf_stream = BytesIO(pdf_data)
 
         with fitz.open(stream=pdf_stream, filetype="pdf") as doc:
@@ -33,9 +34,9 @@ async def pdf_parser(
                 if not page_text and not image_list:
                     continue
 
-                page_content = ""
+                parts: List[Any] = []
                 if page_text:
-                    page_content += page_text.strip() + "\n"
+                    parts.append(page_text.strip())
 
                 for img_index, img in enumerate(image_list):
                     try:
@@ -46,40 +47,66 @@ async def pdf_parser(
                         if not image_bytes:
                             continue
 
-                        # Split into 3 chunks with overlap to ensure no text is cut off
-                        image_chunks = split_image_into_safe_chunks(image_bytes, num_chunks=3, overlap=100)
-                        
-                        for i, chunk in enumerate(image_chunks):
-                            print(f"Sending Chunk {i+1}/{len(image_chunks)} of Image {img_index+1} (Page {page_num+1}) to OCR...")
-                            ocr_text = await image_parser(chunk, llm, markdown=markdown)
-                            if ocr_text:
-                                page_content += ocr_text.strip() + "\n"
+                        # Split into 3 chunks with overlap to ensure no text is cut off;
+                        # resizing and encoding are CPU work, kept off the event loop
+                        image_chunks = await asyncio.to_thread(split_image_into_safe_chunks, image_bytes, num_chunks=3, overlap=100)
+                        parts.extend((img_index, chunk) for chunk in image_chunks)
 
                     except Exception as img_err:
                         print(f"OCR failed for image {img_index} on page {page_num + 1}: {img_err}")
 
-                if page_content.strip():
-                    pages.append({
-                        "page": page_num + 1,
-                        "text": page_content.strip()
-                    })
+                page_parts.append([page_num, parts])
+
+        # OCR every chunk of every page at once; the LLM client batches the calls
+        chunks = [part for _, parts in page_parts for part in parts if isinstance(part, tuple)]
+        print(f"Sending {len(chunks)} image chunks to OCR...")
+        ocr_results = iter(await asyncio.gather(
+            *(image_parser(chunk, llm, markdown=markdown) for _, chunk in chunks),
+            return_exceptions=True,
+        ))
+
+        pages: List[Dict[str, Any]] = []
+        for page_num, parts in page_parts:
+            page_content = ""
+            for part in parts:
+                if isinstance(part, str):
+                    page_content += part + "\n"
+                    continue
+                ocr_text = next(ocr_results)
+                if isinstance(ocr_text, Exception):
+                    print(f"OCR failed for image {part[0]} on page {page_num + 1}: {ocr_text}")
+                elif ocr_text:
+                    page_content += ocr_text.strip() + "\n"
+
+            if page_content.strip():
+                pages.append({
+                    "page": page_num + 1,
+                    "text": page_content.strip()
+                })
 
         return pages
 
     except Exception as e:
         raise Exception(f"Error processing PDF: {e}")
 
-def split_image_into_safe_chunks(image_bytes: bytes, num_chunks: int = 3, overlap: int = 100) -> List[bytes]:
+def split_image_into_safe_chunks(image_bytes: bytes, num_chunks: int = 3, overlap: int = 100) -> List[PreparedImage]:
     """
-    Splits an image into overlapping vertical chunks.
+    Splits an image into overlapping vertical chunks, each prepared for the
+    vision LLM (downscaled and encoded once, see prepare_image). The chunks
+    are cached by the image's digest, so a retried OCR job reuses them.
     Overlap ensures that text lines cut at the boundary are captured completely in one of the segments.
     """
+    key = f"{source_digest(image_bytes)}:chunks:{num_chunks}:{overlap}"
+    return cached(key, lambda: _split_image(image_bytes, num_chunks, overlap))
+
+def _split_image(image_bytes: bytes, num_chunks: int, overlap: int) -> List[PreparedImage]:
     try:
-        img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        # Trim the page margins once, so the chunks split the content
+        img = trim_margins(load_image(image_bytes))
         width, height = img.size
         
         if height < 500:
-            return [image_bytes]
+            return [prepare_image(img, trim=False)]
 
         chunk_height = height // num_chunks
         chunks = []
@@ -90,12 +117,10 @@ def split_image_into_safe_chunks(image_bytes: bytes, num_chunks: int = 3, overla
             end_y = min(height, (i + 1) * chunk_height + overlap)
             
             chunk_img = img.crop((0, start_y, width, end_y))
-            
-            buf = io.BytesIO()
-            chunk_img.save(buf, format="JPEG", quality=95)
-            chunks.append(buf.getvalue())
+            # The page is already trimmed
+            chunks.append(prepare_image(chunk_img, trim=False))
         
         return chunks
     except Exception as e:
         print(f"Safe split error: {e}")
-        return [image_bytes]
\ No newline at end of file
+        return [prepare_image(image_bytes)]
\ No newline at end of file
@@ -1,24 +1,33 @@
 # zip_utils.py
+import asyncio
+import os
 import zipfile
 from io import BytesIO
 from pathlib import Path
 
+# Members processed at once; each may hold its decompressed bytes and run LLM calls
+ZIP_MAX_CONCURRENT_FILES = int(os.getenv("ZIP_MAX_CONCURRENT_FILES", 4))
+
 async def process_zip_data(zip_data: bytes, llm, process_file_fn) -> str:
     """Extract and process files within a ZIP archive using the supplied process_file function."""
     try:
-        results = []
         with zipfile.ZipFile(BytesIO(zip_data)) as z:
-            for name in z.namelist():
-                if z.getinfo(name).is_dir():
-                    continue
-                with z.open(name) as file:
-                    content = file.read()
-                    path = Path(name)
+            names = [info.filename for info in z.infolist() if not info.is_dir()]
+            semaphore = asyncio.Semaphore(ZIP_MAX_CONCURRENT_FILES)
+
+            async def process_member(name: str) -> str:
+                async with semaphore:
                     try:
-                        result = await process_file_fn(file_data=content, llm=llm, file_path=path)
-                        results.append(f"### File: {name}\n{result}")
+                        # Read only once a slot is free, so at most a few members are in memory
+                        with z.open(name) as file:
+                            content = file.read()
+                        result = await process_file_fn(file_data=content, llm=llm, file_path=Path(name))
+                        return f"### File: {name}\n{result}"
                     except Exception as inner_e:
-                        results.append(f"### File: {name}\nError: {inner_e}")
+                        return f"### File: {name}\nError: {inner_e}"
+
+            # Members are independent; a few at a time still share LLM batches
+            results = await asyncio.gather(*(process_member(name) for name in names))
         return "\n\n".join(results)
     except Exception as e:
         raise Exception(f"Error processing ZIP file: {e}")
@@ -0,0 +1,158 @@
+import os
+import json
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Union
+from src.utils import logger
+from src.utils.redis import get_redis
+
+# -------------------------
+# Conversation history cache
+# -------------------------
+# The last HISTORY_CACHE_SIZE messages of each conversation, oldest first, in
+# a capped Redis list shared by every API and worker replica. Writers update
+# it after their DB write commits; readers fill it from the DB on a miss.
+#
+# Every write also bumps a per-conversation version key, and a fill only
+# lands if the version is unchanged since the reader queried the DB. A
+# message written while a fill is in flight therefore can't be lost by an
+# older snapshot overwriting it.
+
+HISTORY_KEY_PREFIX = "history:{}:{}"
+HISTORY_VERSION_KEY_PREFIX = "history:{}:{}:version"
+HISTORY_CACHE_SIZE = int(os.getenv("HISTORY_CACHE_SIZE", 20))
+HISTORY_CACHE_TTL = int(os.getenv("HISTORY_CACHE_TTL", 3600))
+
+CachedMessage = Dict[str, Any]
+
+# KEYS: list, version. ARGV: expected version, ttl, items...
+_FILL_SCRIPT = """
+local current = redis.call('GET', KEYS[2]) or '0'
+if current ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+if #ARGV > 2 then
+    redis.call('RPUSH', KEYS[1], unpack(ARGV, 3))
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+# KEYS: list, version. ARGV: id, item, mode ('append' | 'replace'), size, ttl
+# append adds the message unless it is already cached (ingest can see a
+# message the fill already loaded); replace only rewrites a cached message.
+_UPSERT_SCRIPT = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local items = redis.call('LRANGE', KEYS[1], 0, -1)
+for i, item in ipairs(items) do
+    if tostring(cjson.decode(item)['id']) == ARGV[1] then
+        if ARGV[3] == 'replace' then
+            redis.call('LSET', KEYS[1], i - 1, ARGV[2])
+        end
+        return 1
+    end
+end
+if ARGV[3] == 'append' then
+    redis.call('RPUSH', KEYS[1], ARGV[2])
+    redis.call('LTRIM', KEYS[1], -tonumber(ARGV[4]), -1)
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+end
+return 1
+"""
+
+
+def _keys(conversation_id: int, message_type: str):
+    return (
+        HISTORY_KEY_PREFIX.format(message_type, conversation_id),
+        HISTORY_VERSION_KEY_PREFIX.format(message_type, conversation_id),
+    )
+
+
+def to_cached(message: Any) -> CachedMessage:
+    """Reduce a Message model (or dict) to the fields the agent needs"""
+    get = message.get if isinstance(message, dict) else lambda k: getattr(message, k)
+    timestamp = get("timestamp")
+    return {
+        "id": get("id"),
+        "role": get("role"),
+        "content": get("content") or "",
+        "timestamp": timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp,
+    }
+
+
+async def get_history(
+    conversation_id: int,
+    message_type: str,
+    loader: Callable[[], Awaitable[List[Any]]],
+    limit: int = HISTORY_CACHE_SIZE,
+) -> List[CachedMessage]:
+    """
+    Last `limit` (at most HISTORY_CACHE_SIZE) messages of a conversation, oldest first.
+    loader is called on a miss and must return messages oldest first.
+    """
+    list_key, version_key = _keys(conversation_id, message_type)
+    try:
+        r = await get_redis()
+        items = await r.lrange(list_key, -limit, -1)
+        if items:
+            return [json.loads(item) for item in items]
+        version = await r.get(version_key) or "0"
+    except Exception as e:
+        logger.error(f"History cache read failed for {list_key}: {e}")
+        return [to_cached(m) for m in (await loader())[-limit:]]
+
+    messages = [to_cached(m) for m in await loader()]
+    try:
+        await r.eval(
+            _FILL_SCRIPT, 2, list_key, version_key,
+            version, HISTORY_CACHE_TTL,
+            *[json.dumps(m) for m in messages[-HISTORY_CACHE_SIZE:]],
+        )
+    except Exception as e:
+        logger.error(f"History cache fill failed for {list_key}: {e}")
+    return messages[-limit:]
+
+
+async def _upsert(conversation_id: int, message_type: str, message: Any, mode: str):
+    if conversation_id is None:
+        return
+    list_key, version_key = _keys(conversation_id, message_type)
+    cached = to_cached(message)
+    try:
+        r = await get_redis()
+        await r.eval(
+            _UPSERT_SCRIPT, 2, list_key, version_key,
+            str(cached["id"]), json.dumps(cached), mode, HISTORY_CACHE_SIZE, HISTORY_CACHE_TTL,
+        )
+    except Exception as e:
+        logger.error(f"History cache write failed for {list_key}: {e}")
+
+
+async def append_message(conversation_id: int, message_type: str, message: Any):
+    """Write-through for a newly stored message"""
+    await _upsert(conversation_id, message_type, message, "append")
+
+
+async def replace_message(conversation_id: int, message_type: str, message: Any):
+    """Write-through for an edited message; no-op if it has left the window"""
+    await _upsert(conversation_id, message_type, message, "replace")
+
+
+async def invalidate(conversation_id: Union[int, None], message_type: str):
+    """Drop a conversation's cached history, e.g. after a delete"""
+    if conversation_id is None:
+        return
+    list_key, version_key = _keys(conversation_id, message_type)
+    try:
+        r = await get_redis()
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.incr(version_key)
+            pipe.expire(version_key, HISTORY_CACHE_TTL)
+            pipe.delete(list_key)
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"History cache invalidation failed for {list_key}: {e}")
@@ -1,12 +1,14 @@
 import os
 from dotenv import load_dotenv
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
-from src.utils import logger
+from src.utils import logger, history_cache
 from src.services.message_service import MessageService
 from src.services.conversation_service import ConversationService
 from src.agentic.agents.database_agent import get_database_agent
 from src.agentic.agents.inquiry_agent import get_inquiry_agent
+from src.agentic.context import build_history
+from src.agentic.llms.vllm import set_routing_key
 
 # Load environment variables
 load_dotenv()
@@ -15,19 +17,36 @@ load_dotenv()
 from src.agentic.agents.test_agent import get_test_agent
 from RAW.modals import Message
 
-async def invoke_agent(conversation_id: int, message_id: int, message_type: str = "default") -> AsyncGenerator[str, None]:
+# Messages read from the history cache per turn, before token budgeting
+HISTORY_WINDOW = 20
+
+async def invoke_agent(
+    conversation_id: int,
+    message_id: int,
+    message_type: str = "default",
+    agent: Optional[str] = None,
+    user_id: Optional[int] = None,
+    load_conversation: bool = True,
+) -> AsyncGenerator[str, None]:
     """
     Invokes the agent for a given conversation using the refactored agentic structure.
+    With load_conversation False the caller already has the conversation's
+    agent and user_id (either may really be None) and the lookup is skipped.
     """
     # 1. Fetch Conversation Details
 
     print(f"Conversation id : {conversation_id} \nmessage_id : {message_id} \nMessage_type : {message_type}")
-    conversation = ConversationService.get_conversation(conversation_id)
-    if not conversation:
-        logger.error(f"Conversation {conversation_id} not found")
-        return
+    if load_conversation:
+        conversation = await ConversationService.get_conversation_async(conversation_id)
+        if not conversation:
+            logger.error(f"Conversation {conversation_id} not found")
+            return
+        agent, user_id = conversation.agent, conversation.user_id
 
-    agent_name = conversation.agent or "Agent"
+    agent_name = agent or "Agent"
+
+    # Keep the conversation on one vLLM replica so its cached prompt prefix is reused
+    set_routing_key(conversation_id)
 
     # 2. Fetch History (DESC order) and User Input
     if message_type == "whatsapp":
@@ -40,31 +59,33 @@ async def invoke_agent(conversation_id: int, message_id: int, message_type: str
         from src.services.message_service import MessageService
         data_service = MessageService
 
-    # Fetch History using the selected service
-    desc_history = data_service.get_messages_by_conversation_desc(conversation_id, limit=20)
-    full_history = sorted(desc_history, key=lambda m: m.timestamp)
+    # Fetch History: served from the shared history cache, DB on a miss
+    async def load_history():
+        desc_history = await data_service.get_messages_by_conversation_desc_async(conversation_id, limit=history_cache.HISTORY_CACHE_SIZE)
+        return sorted(desc_history, key=lambda m: m.timestamp)
+
+    full_history = await history_cache.get_history(conversation_id, message_type, load_history, limit=HISTORY_WINDOW)
     # print(f"full_history : {full_history}")
     # Filter out the placeholder if it's an assistant message. 
     # For WhatsApp, the message_id often points to the incoming user message itself.
     valid_msgs = []
     for m in full_history:
-        if m.id == message_id:
-            if m.role == 'assistant':
+        if str(m["id"]) == str(message_id):
+            if m["role"] == 'assistant':
                 continue # Skip placeholder
         valid_msgs.append(m)
 
-    raw_history = []
     user_input = None
     
     if valid_msgs:
         last_msg = valid_msgs[-1]
         print(f"Last message: {last_msg}")
-        if last_msg.role == 'user':
-            user_input = last_msg.content
+        if last_msg["role"] == 'user':
+            user_input = last_msg["content"]
             history_msgs = valid_msgs[:-1]
         else:
             # If the last message isn't user, we might have an issue or this is a system trigger
-            logger.warning(f"Last message {last_msg.id} is not user role: {last_msg.role}")
+            logger.warning(f"Last message {last_msg['id']} is not user role: {last_msg['role']}")
             # For now, we abort if no user input found to drive the agent
             yield "Error: No user input found."
             return
@@ -72,9 +93,14 @@ async def invoke_agent(conversation_id: int, message_id: int, message_type: str
         yield "Error: No message history found (user input missing)."
         return
         
-    # Convert to RAW Messages
-    for msg in history_msgs:
-        raw_history.append(Message(role=msg.role, content=msg.content))
+    # Fit the history into the agent's token budget; older turns come from the rolling summary
+    async def fetch_range(after, before, limit):
+        return await data_service.get_messages_by_conversation_between_async(conversation_id, after, before, limit)
+
+    raw_history = await build_history(
+        conversation_id, message_type, agent_name, history_msgs, fetch_range,
+        window_full=len(full_history) >= HISTORY_WINDOW,
+    )
 
     logger.debug(f"--- Invoking Agent: {agent_name} ---")
     logger.debug(f"History Length: {len(raw_history)}")
@@ -88,13 +114,13 @@ async def invoke_agent(conversation_id: int, message_id: int, message_type: str
             module = None
             if ":" in agent_name:
                 module = agent_name.split(":")[1]
-            agent = get_database_agent(user_id=conversation.user_id, history=raw_history, module=module, message_type=message_type)
+            agent = get_database_agent(user_id=user_id, history=raw_history, module=module, message_type=message_type)
         elif agent_name.startswith("inquiry"):
-            agent = get_inquiry_agent(user_id=conversation.user_id, history=raw_history)
+            agent = get_inquiry_agent(user_id=user_id, history=raw_history)
             print("I am inquiry")
         else:
             # Fallback to test agent for other names like "TestAgent" or "Agent"
-            agent = get_test_agent(user_id=conversation.user_id, history=raw_history)
+            agent = get_test_agent(user_id=user_id, history=raw_history)
     except Exception as e:
         logger.error(f"Failed to initialize agent {agent_name}: {e}")
         yield f"Error initializing agent: {str(e)}"
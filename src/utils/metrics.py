@@ -0,0 +1,147 @@
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# -------------------------
+# Minimal in-process metrics
+# -------------------------
+# Histograms and counters keyed by label values, rendered in the Prometheus
+# text exposition format. Thread-safe, since DB queries are recorded from
+# the DB executor threads.
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _matching(names: Sequence[str], labels: Dict[str, object]):
+    """Filter for series keys with the given label values; labels left out match anything"""
+    wanted = [(i, str(labels[n])) for i, n in enumerate(names) if n in labels]
+    return lambda key: all(key[i] == value for i, value in wanted)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, _HistogramSeries] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, /, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets) + 1)
+            series.counts[index] += 1
+            series.sum += value
+            series.count += 1
+
+    def quantile(self, q: float, /, **labels) -> Optional[float]:
+        """
+        Upper bucket bound containing the q-quantile (None without data).
+        Series are merged over any labels not given.
+        """
+        matches = _matching(self.labelnames, labels)
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0
+        with self._lock:
+            for key, series in self._series.items():
+                if matches(key):
+                    counts = [a + b for a, b in zip(counts, series.counts)]
+                    total += series.count
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[LabelValues, dict]:
+        with self._lock:
+            return {
+                key: {"count": s.count, "sum": s.sum, "buckets": list(s.counts)}
+                for key, s in self._series.items()
+            }
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, data in self.snapshot().items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), data["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {data['sum']}")
+            lines.append(f"{self.name}_count{labels} {data['count']}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, /, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """Sum over any labels not given"""
+        matches = _matching(self.labelnames, labels)
+        with self._lock:
+            return sum(value for key, value in self._values.items() if matches(key))
+
+    def snapshot(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in self.snapshot().items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+REGISTRY: list = []
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
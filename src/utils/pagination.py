@@ -0,0 +1,60 @@
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional, Tuple, Union
+
+# -------------------------
+# Keyset pagination cursors
+# -------------------------
+# A cursor is the (sort timestamp, id) of the last row of a page, base64
+# encoded so clients treat it as opaque. The next page starts strictly after
+# that row, which keeps deep pages on the index and stops rows from shifting
+# between pages while new ones are inserted.
+
+Cursor = Tuple[datetime, Union[int, str]]
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(timestamp: datetime, id: Union[int, str]) -> str:
+    raw = json.dumps([timestamp.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), id
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+
+def next_page_cursor(rows: list, limit: int, timestamp_field: str) -> Optional[str]:
+    """
+    Cursor for the page after rows, or None if this was the last page.
+    Expects rows fetched with LIMIT limit + 1 and trims the extra row in place.
+    """
+    if len(rows) <= limit:
+        return None
+    del rows[limit:]
+    last = rows[-1]
+    return encode_cursor(last[timestamp_field], last["id"])
+
+
+def keyset_between(after: Optional[Cursor], before: Cursor, prefix: str = "") -> Tuple[str, list]:
+    """
+    SQL condition and params for rows strictly between two (timestamp, id)
+    keys, for ORDER BY timestamp, id. after=None leaves the range open at
+    the start. prefix qualifies the columns (e.g. "e.").
+    """
+    key = f"({prefix}timestamp, {prefix}id)"
+    condition = f"{key} < (%s, %s)"
+    params = list(before)
+    if after is not None:
+        condition = f"{key} > (%s, %s) AND {condition}"
+        params = [*after, *params]
+    return condition, params
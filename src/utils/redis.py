@@ -1,7 +1,8 @@
 import os
 import json
+import time
 import asyncio
-from typing import Dict, Optional, Any, Union
+from typing import Dict, Optional, Any, Tuple, Union
 from redis.asyncio import Redis
 from src.utils import logger
 
@@ -48,7 +49,9 @@ async def get_redis() -> Redis:
 QUEUE_KEY = "llm_work_queue"
 STATE_KEY_PREFIX = "message:{}:{}:state"
 STREAM_KEY_PREFIX = "message:{}:{}:stream"
+NOTIFY_CHANNEL_PREFIX = "message:{}:{}:notify"
 TTL_SECONDS = 3600  # 1 hour
+TERMINAL_STATUSES = ("done", "error")
 
 
 async def enqueue_job(payload: Dict[str, Any]):
@@ -97,18 +100,108 @@ async def update_state(message_id: Union[int, str], status: str, message_type: s
     state_key = STATE_KEY_PREFIX.format(message_type, message_id)
     mapping = {"status": status}
     mapping.update(kwargs)
-    await r.hset(state_key, mapping=mapping)
-    await r.expire(state_key, TTL_SECONDS)
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.hset(state_key, mapping=mapping)
+        pipe.expire(state_key, TTL_SECONDS)
+        # Wake up stream readers so they can notice completion immediately
+        pipe.publish(NOTIFY_CHANNEL_PREFIX.format(message_type, message_id), f"state:{status}")
+        await pipe.execute()
 
 
 async def append_chunk(message_id: Union[int, str], chunk: str, message_type: str = "default"):
     """
-    Append text chunk to type-aware stream list
+    Append text chunk to type-aware stream list and notify subscribers
     """
     r = await get_redis()
     stream_key = STREAM_KEY_PREFIX.format(message_type, message_id)
-    await r.rpush(stream_key, chunk)
-    await r.expire(stream_key, TTL_SECONDS)
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.rpush(stream_key, chunk)
+        pipe.expire(stream_key, TTL_SECONDS)
+        # Published after the push so a woken reader always finds the new item
+        pipe.publish(NOTIFY_CHANNEL_PREFIX.format(message_type, message_id), "chunk")
+        await pipe.execute()
+
+
+async def reset_stream(message_id: Union[int, str], message_type: str = "default"):
+    """
+    Drop a message's streamed chunks before the job runs again and tell
+    readers to discard what they have shown ("reset" on the notify channel)
+    """
+    r = await get_redis()
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.delete(STREAM_KEY_PREFIX.format(message_type, message_id))
+        pipe.publish(NOTIFY_CHANNEL_PREFIX.format(message_type, message_id), "reset")
+        await pipe.execute()
+
+
+CHUNK_FLUSH_INTERVAL = float(os.getenv("CHUNK_FLUSH_INTERVAL_MS", 20)) / 1000
+CHUNK_FLUSH_BYTES = int(os.getenv("CHUNK_FLUSH_BYTES", 64))
+
+
+class ChunkWriter:
+    """
+    Buffered writer for a message stream.
+    Coalesces tokens for up to CHUNK_FLUSH_INTERVAL or CHUNK_FLUSH_BYTES and
+    writes each batch as a single list element with one pipelined
+    RPUSH + EXPIRE + PUBLISH. Flushes are serialized, so the list keeps the
+    exact order tokens were written in.
+
+    Usage:
+        async with ChunkWriter(message_id, message_type) as writer:
+            await writer.write(token)
+    """
+
+    def __init__(self, message_id: Union[int, str], message_type: str = "default",
+                 flush_interval: float = CHUNK_FLUSH_INTERVAL, flush_bytes: int = CHUNK_FLUSH_BYTES):
+        self.message_id = message_id
+        self.message_type = message_type
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self._buffer: list[str] = []
+        self._buffered_bytes = 0
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+    async def write(self, chunk: str):
+        if not chunk:
+            return
+        self._buffer.append(chunk)
+        self._buffered_bytes += len(chunk.encode("utf-8"))
+
+        if self._buffered_bytes >= self.flush_bytes:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        # Cleared before flushing so close() never cancels a write in progress
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Chunk flush failed for {self.message_type} message {self.message_id}: {e}")
+
+    async def flush(self):
+        async with self._lock:
+            if not self._buffer:
+                return
+            data = "".join(self._buffer)
+            self._buffer.clear()
+            self._buffered_bytes = 0
+            await append_chunk(self.message_id, data, message_type=self.message_type)
+
+    async def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
 
 
 async def get_message_state(message_id: Union[int, str], message_type: str = "default") -> dict:
@@ -126,32 +219,194 @@ async def get_stream_history(message_id: Union[int, str], message_type: str = "d
 async def wait_for_stream_item(message_id: Union[int, str], start_index: int, timeout: int = 20, message_type: str = "default") -> list[str]:
     """
     Wait for new items in the stream.
-    Since Redis Lists don't support blocking read from specific index,
-    we have to poll or use Pub/Sub.
-    For simplicity and reliability, we will POLL here with short sleep.
+    Subscribes to the message's notify channel (published by append_chunk and
+    update_state) so readers wake up as soon as a chunk lands instead of polling.
+    Returns the items from start_index onwards, or [] on timeout / completion.
     """
     r = await get_redis()
     stream_key = STREAM_KEY_PREFIX.format(message_type, message_id)
-    
-    end_time = asyncio.get_event_loop().time() + timeout
-    
-    while asyncio.get_event_loop().time() < end_time:
-        # Check if we have data beyond start_index
-        # LLEN gives total count. Index is 0-based.
-        # If start_index == 0, we want element 0.
-        # If length is 5, valid indices are 0-4. Next write is 5.
-        
-        length = await r.llen(stream_key)
-        if length > start_index:
-            # We have new data
-            # LRANGE from start_index to end
-            return await r.lrange(stream_key, start_index, -1)
-        
-        # Check if processing is done/error to stop waiting
-        state = await get_message_state(message_id, message_type=message_type)
-        if state.get("status") in ["done", "error"] and length <= start_index:
-            return []
-            
-        await asyncio.sleep(0.5)
-        
-    return []
+    channel = NOTIFY_CHANNEL_PREFIX.format(message_type, message_id)
+
+    loop = asyncio.get_event_loop()
+    end_time = loop.time() + timeout
+
+    pubsub = r.pubsub()
+    # Subscribe before the first read so a chunk pushed in between is not missed
+    await pubsub.subscribe(channel)
+    try:
+        while True:
+            length = await r.llen(stream_key)
+            if length > start_index:
+                return await r.lrange(stream_key, start_index, -1)
+
+            state = await get_message_state(message_id, message_type=message_type)
+            if state.get("status") in TERMINAL_STATUSES:
+                return []
+
+            remaining = end_time - loop.time()
+            if remaining <= 0:
+                return []
+
+            await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+    finally:
+        await pubsub.unsubscribe(channel)
+        await pubsub.aclose()
+
+
+# -------------------------
+# Reliable Queue
+# -------------------------
+# Jobs are moved atomically from QUEUE_KEY into a per-worker processing list
+# and only removed once acknowledged. Each worker refreshes a heartbeat key
+# whose TTL is the visibility timeout; when it expires the worker is treated
+# as dead and the reaper moves its unacknowledged jobs back to the queue
+# (or to the dead-letter list once MAX_JOB_ATTEMPTS is reached).
+
+PROCESSING_KEY_PREFIX = "llm_work_queue:processing:{}"
+DEAD_LETTER_KEY = "llm_work_queue:dead"
+WORKERS_KEY = "llm_workers"
+HEARTBEAT_KEY_PREFIX = "llm_worker:{}:heartbeat"
+WORKER_STATS_KEY_PREFIX = "llm_worker:{}:stats"
+REAPER_LOCK_KEY = "llm_work_queue:reaper_lock"
+VISIBILITY_TIMEOUT = int(os.getenv("LLM_VISIBILITY_TIMEOUT", 60))
+MAX_JOB_ATTEMPTS = int(os.getenv("LLM_MAX_JOB_ATTEMPTS", 3))
+
+# Remove the job from the processing list and push the updated payload in one step
+_MOVE_JOB_SCRIPT = """
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 1 then
+    redis.call(ARGV[3], KEYS[2], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+async def claim_reliable_job(worker_id: str, timeout: int = 5) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Atomically move the next job into this worker's processing list.
+    Returns (raw_payload, payload); raw_payload is needed to ack the job.
+    """
+    r = await get_redis()
+    raw = await r.blmove(QUEUE_KEY, PROCESSING_KEY_PREFIX.format(worker_id), timeout, src="LEFT", dest="RIGHT")
+    if raw is None:
+        return None
+    return raw, json.loads(raw)
+
+
+async def ack_job(worker_id: str, raw_payload: str):
+    """
+    Remove a finished job from the worker's processing list
+    """
+    r = await get_redis()
+    await r.lrem(PROCESSING_KEY_PREFIX.format(worker_id), 1, raw_payload)
+
+
+async def heartbeat(worker_id: str, stats: Optional[Dict[str, Any]] = None):
+    """
+    Mark the worker alive for another VISIBILITY_TIMEOUT seconds,
+    optionally publishing its current stats (in-flight jobs, capacity, ...)
+    """
+    r = await get_redis()
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.sadd(WORKERS_KEY, worker_id)
+        pipe.set(HEARTBEAT_KEY_PREFIX.format(worker_id), str(time.time()), ex=VISIBILITY_TIMEOUT)
+        if stats:
+            stats_key = WORKER_STATS_KEY_PREFIX.format(worker_id)
+            pipe.hset(stats_key, mapping={k: str(v) for k, v in stats.items()})
+            pipe.expire(stats_key, VISIBILITY_TIMEOUT)
+        await pipe.execute()
+
+
+async def requeue_job(worker_id: str, raw_payload: str, count_attempt: bool = True) -> str:
+    """
+    Move a job from a worker's processing list back to the front of the queue.
+    Jobs that have used up MAX_JOB_ATTEMPTS go to the dead-letter list instead.
+    Either way the partial output of the interrupted attempt is dropped, so a
+    re-run doesn't append to it. Returns the list the job was moved to.
+    """
+    r = await get_redis()
+    payload = json.loads(raw_payload)
+    if count_attempt:
+        payload["attempts"] = int(payload.get("attempts", 0)) + 1
+
+    dead = payload.get("attempts", 0) >= MAX_JOB_ATTEMPTS
+    target = DEAD_LETTER_KEY if dead else QUEUE_KEY
+
+    moved = await r.eval(
+        _MOVE_JOB_SCRIPT, 2,
+        PROCESSING_KEY_PREFIX.format(worker_id), target,
+        raw_payload, json.dumps(payload), "RPUSH" if dead else "LPUSH",
+    )
+    if not moved:
+        # Acked (or already recovered) between our read and the move
+        return PROCESSING_KEY_PREFIX.format(worker_id)
+
+    msg_id = payload.get("message_id")
+    msg_type = payload.get("message_type", "default")
+    await reset_stream(msg_id, message_type=msg_type)
+    if dead:
+        logger.error(f"Job {msg_type}:{msg_id} moved to dead-letter list after {payload['attempts']} attempts")
+        await update_state(msg_id, "error", message_type=msg_type, error="Job failed after repeated worker crashes")
+    else:
+        logger.warning(f"Re-queued {msg_type} job {msg_id} (attempt {payload.get('attempts', 0)})")
+        await update_state(msg_id, "pending", message_type=msg_type)
+    return target
+
+
+async def requeue_expired_jobs() -> int:
+    """
+    Reaper: recover jobs held by workers whose heartbeat has expired.
+    Guarded by a short lock so only one worker reaps at a time.
+    """
+    r = await get_redis()
+    if not await r.set(REAPER_LOCK_KEY, "1", nx=True, ex=VISIBILITY_TIMEOUT):
+        return 0
+
+    recovered = 0
+    try:
+        for worker_id in await r.smembers(WORKERS_KEY):
+            if await r.exists(HEARTBEAT_KEY_PREFIX.format(worker_id)):
+                continue
+
+            processing_key = PROCESSING_KEY_PREFIX.format(worker_id)
+            for raw in await r.lrange(processing_key, 0, -1):
+                await requeue_job(worker_id, raw)
+                recovered += 1
+
+            if not await r.llen(processing_key):
+                await r.srem(WORKERS_KEY, worker_id)
+                logger.info(f"Removed dead LLM worker {worker_id}")
+    finally:
+        await r.delete(REAPER_LOCK_KEY)
+
+    return recovered
+
+
+async def get_queue_stats() -> Dict[str, Any]:
+    """
+    Queue depth plus per-worker in-flight counts as reported by heartbeats
+    """
+    r = await get_redis()
+    worker_ids = sorted(await r.smembers(WORKERS_KEY))
+
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.llen(QUEUE_KEY)
+        pipe.llen(DEAD_LETTER_KEY)
+        for worker_id in worker_ids:
+            pipe.llen(PROCESSING_KEY_PREFIX.format(worker_id))
+            pipe.hgetall(WORKER_STATS_KEY_PREFIX.format(worker_id))
+            pipe.exists(HEARTBEAT_KEY_PREFIX.format(worker_id))
+        results = await pipe.execute()
+
+    queued, dead = results[0], results[1]
+    workers = []
+    for i, worker_id in enumerate(worker_ids):
+        processing, stats, alive = results[2 + i * 3: 5 + i * 3]
+        workers.append({"worker_id": worker_id, "alive": bool(alive), "processing": processing, **stats})
+
+    return {
+        "queued": queued,
+        "processing": sum(w["processing"] for w in workers),
+        "dead_letter": dead,
+        "workers": workers,
+    }
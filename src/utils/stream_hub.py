@@ -0,0 +1,267 @@
+import os
+import asyncio
+from typing import AsyncGenerator, Dict, Optional, Set, Tuple, Union
+from redis.asyncio.client import PubSub
+from src.utils import logger
+from src.utils.redis import (
+    get_redis,
+    get_message_state,
+    STREAM_KEY_PREFIX,
+    NOTIFY_CHANNEL_PREFIX,
+    TERMINAL_STATUSES,
+)
+
+# -------------------------
+# Config
+# -------------------------
+
+CLIENT_BUFFER_SIZE = int(os.getenv("SSE_CLIENT_BUFFER_SIZE", 256))
+CLIENT_IDLE_TIMEOUT = float(os.getenv("SSE_CLIENT_IDLE_TIMEOUT", 2))
+
+_END = object()
+# Yielded by StreamHub.stream when the job restarted: drop what was shown so far
+STREAM_RESET = object()
+
+
+class _Subscriber:
+    """One connected client: a bounded queue fed by the hub"""
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_BUFFER_SIZE)
+        self.evicted = False
+
+    def push(self, item) -> bool:
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            self.evicted = True
+            return False
+
+
+class _Topic:
+    """Fan-out state for a single message stream"""
+
+    def __init__(self, message_id: Union[int, str], message_type: str):
+        self.message_id = message_id
+        self.message_type = message_type
+        self.stream_key = STREAM_KEY_PREFIX.format(message_type, message_id)
+        self.channel = NOTIFY_CHANNEL_PREFIX.format(message_type, message_id)
+        self.offset = 0  # items already fanned out to subscribers
+        self.finished = False
+        self.subscribers: Set[_Subscriber] = set()
+        self.lock = asyncio.Lock()
+
+
+class StreamHub:
+    """
+    Process-wide fan-out of message streams to SSE clients.
+    Holds one Redis subscription per active message and copies every new chunk
+    into per-client bounded queues, so Redis load scales with active messages
+    rather than connected clients. Clients whose buffer fills up are evicted
+    from the fan-out and catch up from the Redis list on their own.
+    """
+
+    def __init__(self):
+        self._pubsub: Optional[PubSub] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._topics: Dict[str, _Topic] = {}
+        self._start_lock = asyncio.Lock()
+        self._sub_lock = asyncio.Lock()
+        self.evictions = 0
+
+    async def start(self):
+        async with self._start_lock:
+            if self._reader:
+                return
+            r = await get_redis()
+            self._pubsub = r.pubsub()
+            self._reader = asyncio.create_task(self._read_loop())
+            logger.info("Stream hub started")
+
+    async def stop(self):
+        if self._reader:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        for topic in list(self._topics.values()):
+            self._finish(topic)
+        if self._pubsub:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        logger.info("Stream hub stopped")
+
+    def stats(self) -> dict:
+        return {
+            "topics": len(self._topics),
+            "clients": sum(len(t.subscribers) for t in self._topics.values()),
+            "evictions": self.evictions,
+        }
+
+    # -------------------------
+    # Client API
+    # -------------------------
+
+    async def stream(self, message_id: Union[int, str], start_index: int = 0, message_type: str = "default") -> AsyncGenerator[Optional[str], None]:
+        """
+        Yield chunks from start_index until the message reaches a terminal state.
+        Yields None when idle for CLIENT_IDLE_TIMEOUT so callers can check for
+        client disconnects, and STREAM_RESET when a re-queued job starts its
+        output over.
+        """
+        await self.start()
+        r = await get_redis()
+        index = start_index
+
+        while True:
+            topic, subscriber, upto = await self._attach(message_id, message_type)
+            try:
+                if upto < index:
+                    # The stream was reset while this client was catching up
+                    index = 0
+                    yield STREAM_RESET
+                # Catch up from Redis on anything fanned out before we attached
+                if upto > index:
+                    for chunk in await r.lrange(topic.stream_key, index, upto - 1):
+                        index += 1
+                        yield chunk
+                index = max(index, upto)
+
+                while True:
+                    try:
+                        item = await asyncio.wait_for(subscriber.queue.get(), timeout=CLIENT_IDLE_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        yield None
+                        continue
+
+                    if item is _END:
+                        return
+                    if item is STREAM_RESET:
+                        index = 0
+                        yield STREAM_RESET
+                        continue
+                    for chunk in item:
+                        index += 1
+                        yield chunk
+
+                    if subscriber.evicted and subscriber.queue.empty():
+                        break
+            finally:
+                self._detach(topic, subscriber)
+
+            logger.warning(f"Slow SSE client evicted from {topic.stream_key}, resyncing from index {index}")
+
+    # -------------------------
+    # Internals
+    # -------------------------
+
+    async def _attach(self, message_id, message_type) -> Tuple[_Topic, _Subscriber, int]:
+        key = NOTIFY_CHANNEL_PREFIX.format(message_type, message_id)
+        topic = self._topics.get(key)
+        if topic is None:
+            topic = _Topic(message_id, message_type)
+            self._topics[key] = topic
+            async with topic.lock:
+                try:
+                    # Subscribe before reading the length so nothing slips in between
+                    async with self._sub_lock:
+                        await self._pubsub.subscribe(topic.channel)
+                    r = await get_redis()
+                    topic.offset = await r.llen(topic.stream_key)
+                    state = await get_message_state(message_id, message_type=message_type)
+                    if state.get("status") in TERMINAL_STATUSES:
+                        topic.finished = True
+                except Exception:
+                    self._drop(topic)
+                    raise
+
+        async with topic.lock:
+            subscriber = _Subscriber()
+            if topic.finished:
+                subscriber.push(_END)
+            else:
+                topic.subscribers.add(subscriber)
+            return topic, subscriber, topic.offset
+
+    def _detach(self, topic: _Topic, subscriber: _Subscriber):
+        topic.subscribers.discard(subscriber)
+        if not topic.subscribers:
+            self._drop(topic)
+
+    def _drop(self, topic: _Topic):
+        if self._topics.get(topic.channel) is topic:
+            del self._topics[topic.channel]
+            if self._pubsub:
+                asyncio.create_task(self._unsubscribe(topic.channel))
+
+    async def _unsubscribe(self, channel: str):
+        async with self._sub_lock:
+            # The topic may have been re-created while this task was pending
+            if channel not in self._topics and self._pubsub:
+                await self._pubsub.unsubscribe(channel)
+
+    def _finish(self, topic: _Topic):
+        topic.finished = True
+        for subscriber in list(topic.subscribers):
+            if not subscriber.push(_END):
+                # Queue is full; the client will resync and see the final state
+                self.evictions += 1
+        topic.subscribers.clear()
+        self._drop(topic)
+
+    async def _fan_out(self, topic: _Topic, event: str):
+        async with topic.lock:
+            if topic.finished:
+                return
+
+            if event == "reset":
+                # reset_stream cleared the list for a re-run of the job
+                topic.offset = 0
+                for subscriber in list(topic.subscribers):
+                    if not subscriber.push(STREAM_RESET):
+                        topic.subscribers.discard(subscriber)
+                        self.evictions += 1
+                return
+
+            # update_state publishes "state:<status>", append_chunk publishes "chunk"
+            terminal = event.startswith("state:") and event.split(":", 1)[1] in TERMINAL_STATUSES
+            if event != "chunk" and not terminal:
+                return
+
+            r = await get_redis()
+            items = await r.lrange(topic.stream_key, topic.offset, -1)
+            if items:
+                topic.offset += len(items)
+                for subscriber in list(topic.subscribers):
+                    if not subscriber.push(items):
+                        topic.subscribers.discard(subscriber)
+                        self.evictions += 1
+
+            if terminal:
+                self._finish(topic)
+
+    async def _read_loop(self):
+        while True:
+            try:
+                if not self._pubsub.subscribed:
+                    await asyncio.sleep(0.05)
+                    continue
+
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if not message:
+                    continue
+
+                topic = self._topics.get(message["channel"])
+                if topic:
+                    await self._fan_out(topic, message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Stream hub read loop error: {e}")
+                await asyncio.sleep(1)
+
+
+stream_hub = StreamHub()
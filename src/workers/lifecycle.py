@@ -0,0 +1,148 @@
+import os
+import signal
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+from src.utils import logger
+
+# Seconds in-flight jobs get to finish after SIGTERM before they are re-queued
+WORKER_DRAIN_TIMEOUT = float(os.getenv("WORKER_DRAIN_TIMEOUT", 30))
+
+AbortCallback = Callable[[], Awaitable[None]]
+
+
+class WorkerLifecycle:
+    """
+    Shared run/drain lifecycle for the queue workers.
+
+    - A fixed number of job slots; callers only claim work once a slot is free.
+    - SIGTERM / SIGINT switch the worker into draining mode: no new work is
+      claimed and in-flight jobs get drain_timeout seconds to finish.
+    - Jobs still running at the deadline are cancelled and their on_abort
+      callback puts them back on their queue. A second signal skips the wait.
+    """
+
+    def __init__(self, name: str, concurrency: int = 1, drain_timeout: float = WORKER_DRAIN_TIMEOUT):
+        self.name = name
+        self.concurrency = concurrency
+        self.drain_timeout = drain_timeout
+        self.slots = asyncio.Semaphore(concurrency)
+        self.draining = asyncio.Event()
+        self._force = asyncio.Event()
+        self._in_flight: Dict[asyncio.Task, Optional[AbortCallback]] = {}
+        self.completed = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "concurrency": self.concurrency,
+            "completed": self.completed,
+            "draining": int(self.draining.is_set()),
+        }
+
+    # -------------------------
+    # Signals
+    # -------------------------
+
+    def install_signal_handlers(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.request_drain)
+            except NotImplementedError:
+                # Windows event loops don't support add_signal_handler
+                signal.signal(sig, lambda *_: loop.call_soon_threadsafe(self.request_drain))
+
+    def request_drain(self):
+        if self.draining.is_set():
+            logger.warning(f"{self.name}: second stop signal, aborting in-flight jobs")
+            self._force.set()
+            return
+        logger.info(f"{self.name}: stop signal received, draining {self.in_flight} in-flight jobs")
+        self.draining.set()
+
+    # -------------------------
+    # Job slots
+    # -------------------------
+
+    async def acquire_slot(self) -> bool:
+        """
+        Wait for a free slot. Returns False (holding no slot) once draining starts.
+        """
+        if self.draining.is_set():
+            return False
+
+        acquire = asyncio.create_task(self.slots.acquire())
+        drain = asyncio.create_task(self.draining.wait())
+        await asyncio.wait({acquire, drain}, return_when=asyncio.FIRST_COMPLETED)
+        drain.cancel()
+
+        if not acquire.done():
+            acquire.cancel()
+            try:
+                await acquire
+            except asyncio.CancelledError:
+                pass
+            return False
+
+        if self.draining.is_set():
+            self.slots.release()
+            return False
+        return True
+
+    def release_slot(self):
+        self.slots.release()
+
+    def submit(self, coro: Awaitable, on_abort: Optional[AbortCallback] = None) -> asyncio.Task:
+        """
+        Run a job in the slot acquired by acquire_slot().
+        on_abort is awaited if the job is cancelled during drain.
+        """
+        task = asyncio.create_task(coro)
+        self._in_flight[task] = on_abort
+        task.add_done_callback(self._on_done)
+        return task
+
+    def _on_done(self, task: asyncio.Task):
+        self._in_flight.pop(task, None)
+        if not task.cancelled():
+            self.completed += 1
+        self.slots.release()
+
+    # -------------------------
+    # Drain
+    # -------------------------
+
+    async def drain(self):
+        """
+        Wait for in-flight jobs up to the drain deadline, then cancel and
+        re-queue whatever is left.
+        """
+        pending = dict(self._in_flight)
+        if pending:
+            logger.info(f"{self.name}: waiting up to {self.drain_timeout}s for {len(pending)} jobs")
+            jobs = asyncio.gather(*pending, return_exceptions=True)
+            force = asyncio.create_task(self._force.wait())
+            await asyncio.wait({jobs, force}, timeout=self.drain_timeout, return_when=asyncio.FIRST_COMPLETED)
+            force.cancel()
+
+        unfinished = {task: cb for task, cb in pending.items() if not task.done()}
+        for task in unfinished:
+            task.cancel()
+        if unfinished:
+            await asyncio.gather(*unfinished, return_exceptions=True)
+            logger.warning(f"{self.name}: re-queueing {len(unfinished)} unfinished jobs")
+
+        for task, on_abort in unfinished.items():
+            # A job that finished while being cancelled needs no re-queue
+            if on_abort is None or not task.cancelled():
+                continue
+            try:
+                await on_abort()
+            except Exception as e:
+                logger.error(f"{self.name}: failed to re-queue job: {e}")
+
+        logger.info(f"{self.name}: drained")
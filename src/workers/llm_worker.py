@@ -1,9 +1,20 @@
 import asyncio
 import logging
 import os
-from src.utils.redis import claim_job, update_state, append_chunk, get_message_state
+import socket
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+from src.utils.redis import (
+    claim_reliable_job, ack_job, heartbeat, requeue_job, requeue_expired_jobs,
+    update_state, get_message_state, ChunkWriter, VISIBILITY_TIMEOUT,
+)
 from src.services.message_service import MessageService
 from src.models.messages import MessageUpdate
+from src.models.jobs import JobPayload
+from src.workers.lifecycle import WorkerLifecycle
+from src.utils import history_cache
+from src.agentic.llms.resilience import set_deadline
 from dotenv import load_dotenv
 import httpx
 
@@ -12,6 +23,60 @@ load_dotenv()
 from src.utils import logger
 import json
 
+async def cache_sent_reply(conversation_id, message_type: str, response: httpx.Response, content: str):
+    """
+    The Node services store the replies they send; add the stored row to the
+    history cache, or drop the cached history if its id isn't known.
+    """
+    reply_id = None
+    timestamp = datetime.now(timezone.utc)
+    if response.is_success:
+        try:
+            body = response.json()
+            reply_id = body.get("id")
+            if body.get("timestamp"):
+                # The stored row's timestamp, so the cache matches the DB
+                timestamp = datetime.fromisoformat(body["timestamp"])
+        except ValueError:
+            pass
+
+    if reply_id is None:
+        await history_cache.invalidate(conversation_id, message_type)
+        return
+    await history_cache.append_message(conversation_id, message_type, {
+        "id": reply_id,
+        "role": "assistant",
+        "content": content,
+        "timestamp": timestamp,
+    })
+
+async def resolve_job_context(job: JobPayload) -> Optional[JobPayload]:
+    """
+    Fill in the message fields a payload doesn't carry (v1 payloads, or
+    handlers that didn't know them) from the DB. None if the message is gone.
+    """
+    if job.has_message_context():
+        return job
+
+    if job.message_type == "whatsapp":
+        from src.services.whatsapp_service import WhatsAppService
+        message = await WhatsAppService.get_message_async(job.message_id)
+    elif job.message_type == "email":
+        from src.services.email_service import EmailService
+        message = await EmailService.get_message_async(job.message_id)
+    else:
+        message = await MessageService.get_message_async(job.message_id)
+
+    if not message:
+        return None
+
+    update = {"conversation_id": message.conversation_id, "content": message.content, "timestamp": message.timestamp}
+    if job.message_type == "whatsapp":
+        update.update(sender=message.from_number, group_id=message.group_id)
+    elif job.message_type == "email":
+        update.update(sender=message.sender_email, thread_id=message.thread_id, subject=message.subject)
+    return job.model_copy(update=update)
+
 async def process_job(payload_data):
     # If your claim_job returns a string/JSON, parse it
     if isinstance(payload_data, str):
@@ -19,37 +84,43 @@ async def process_job(payload_data):
     else:
         data = payload_data
 
-    message_id = data.get("message_id")
-    message_type = data.get("message_type", "default") # 'whatsapp' or 'default'
+    job = JobPayload.model_validate(data)
+    message_id = job.message_id
+    message_type = job.message_type # 'whatsapp', 'email' or 'default'
 
     logger.info(f"Processing {message_type} message {message_id}")
     
     try:
         await update_state(message_id, "processing", message_type=message_type)
         
-        # 1. Fetch Message using specific service
-        if message_type == "whatsapp":
-            from src.services.whatsapp_service import WhatsAppService
-            assistant_msg = WhatsAppService.get_message(message_id)
-            print(f"Assistantaas message {assistant_msg}")
-        elif message_type == "email":
-            from src.services.email_service import EmailService
-            assistant_msg = EmailService.get_message(message_id)
-        else:
-            from src.services.message_service import MessageService
-            assistant_msg = MessageService.get_message(message_id)
-
-        if not assistant_msg:
+        # 1. Resolve the message context (from the payload, or the DB for older payloads)
+        job = await resolve_job_context(job)
+        if job is None:
             logger.error(f"Message {message_id} of type {message_type} not found")
             return
 
+        if message_type in ("whatsapp", "email"):
+            # Ingested by the Node services, so this is the first place we see it
+            await history_cache.append_message(job.conversation_id, message_type, {
+                "id": message_id,
+                "role": "user",
+                "content": job.content,
+                "timestamp": job.timestamp,
+            })
+
         # 2. Invoke Agent (Pass message_type down)
         from src.utils.invoke_agent import invoke_agent
         
         response_text = ""
-        async for chunk in invoke_agent(assistant_msg.conversation_id, message_id, message_type):
-            await append_chunk(message_id, chunk, message_type=message_type)
-            response_text += chunk
+        # Tokens are coalesced into batched, pipelined writes; closing flushes the tail
+        async with ChunkWriter(message_id, message_type=message_type) as writer:
+            async for chunk in invoke_agent(
+                job.conversation_id, message_id, message_type,
+                agent=job.agent, user_id=job.user_id,
+                load_conversation=not job.has_conversation_context(),
+            ):
+                await writer.write(chunk)
+                response_text += chunk
     
         # Finalize & Persist
         await update_state(message_id, "done", message_type=message_type)
@@ -59,7 +130,7 @@ async def process_job(payload_data):
         if message_type == "whatsapp":
                 
             node_api_url = f"{os.getenv('WHATSAPP_HOST', 'http://127.0.0.1:8080')}/send" 
-            recipient_id = assistant_msg.from_number
+            recipient_id = job.sender
             
 
             logger.info(f"Sending response to recipient: {recipient_id}")
@@ -69,25 +140,26 @@ async def process_job(payload_data):
                     payload = {
                         "number": recipient_id, 
                         "message": response_text.strip() or "None",
-                        "conversation_id": assistant_msg.conversation_id,
-                        "group_id": assistant_msg.group_id
+                        "conversation_id": job.conversation_id,
+                        "group_id": job.group_id
                     }
                     logger.info(f"Payload to Node: {payload}")
-                    await client.post(node_api_url, json=payload)
+                    response = await client.post(node_api_url, json=payload)
+                    await cache_sent_reply(job.conversation_id, message_type, response, response_text.strip())
                 except Exception as e:
                     logger.error(f"Failed to notify Node service: {e}")
         elif message_type == "email":
             # Send response via email service
             node_api_url = f"http://localhost:{os.getenv('EMAIL_SERVICE_PORT', '3001')}/send"
-            recipient_email = assistant_msg.sender_email
+            recipient_email = job.sender
             
             logger.info(f"Sending email response to: {recipient_email}")
             
             # Use conversation title as fallback for subject if email subject is missing or generic
-            email_subject = assistant_msg.subject
+            email_subject = job.subject
             if not email_subject or email_subject in ["No Subject", "None", "null", "undefined"]:
                 from src.services.conversation_service import ConversationService
-                conv = ConversationService.get_conversation(assistant_msg.conversation_id)
+                conv = await ConversationService.get_conversation_async(job.conversation_id)
                 if conv:
                     # Prefer conversation title if it's set and not generic
                     if conv.title and conv.title not in ["No Subject", "None", "null", "undefined"]:
@@ -115,32 +187,102 @@ async def process_job(payload_data):
                         "to": recipient_email,
                         "subject": subject,
                         "text": response_text.strip(),
-                        "thread_id": assistant_msg.thread_id
+                        "thread_id": job.thread_id
                     }
-                    await client.post(node_api_url, json=payload)
+                    response = await client.post(node_api_url, json=payload)
+                    await cache_sent_reply(job.conversation_id, message_type, response, response_text.strip())
                 except Exception as e:
                     logger.error(f"Failed to send email via Node service: {e}")
         else:
-            MessageService.update_message(message_id, update_data)
+            await MessageService.update_message_async(message_id, update_data)
 
     except Exception as e:
         logger.error(f"Error processing message {message_id}: {e}")
         await update_state(message_id, "error", message_type=message_type, error=str(e))
 
-async def main():
-    logger.info("Starting LLM Worker...")
+# Max jobs processed concurrently by this worker; excess work stays in Redis
+# where other replicas can claim it
+WORKER_CONCURRENCY = int(os.getenv("LLM_WORKER_CONCURRENCY", 4))
+# Seconds a job's LLM calls have in total; a stuck backend fails the job
+# instead of holding its slot for the full client timeout
+LLM_JOB_DEADLINE = float(os.getenv("LLM_JOB_DEADLINE", 180))
+
+
+async def run_job(worker_id: str, raw_payload: str, payload: dict):
+    # Each job runs in its own task, so the deadline is scoped to it
+    set_deadline(LLM_JOB_DEADLINE)
+    await process_job(payload)
+    # process_job records its own errors; once it returns the job is settled.
+    # Cancelled jobs are not acked so they can be re-queued.
+    await ack_job(worker_id, raw_payload)
+
+
+async def heartbeat_loop(worker_id: str, lifecycle: WorkerLifecycle):
+    """Keep this worker's jobs invisible to the reaper while it is alive"""
     while True:
         try:
-            message_id = await claim_job()
-            
-            if message_id:
-                asyncio.create_task(process_job(message_id))
-            else:
-                # Wait a bit before polling again
-                await asyncio.sleep(1)
+            await heartbeat(worker_id, stats=lifecycle.stats())
         except Exception as e:
+            logger.error(f"Heartbeat error: {e}")
+        await asyncio.sleep(VISIBILITY_TIMEOUT / 3)
+
+
+async def reaper_loop():
+    """Re-queue jobs left behind by workers whose heartbeat expired"""
+    while True:
+        try:
+            recovered = await requeue_expired_jobs()
+            if recovered:
+                logger.info(f"Recovered {recovered} jobs from dead workers")
+        except Exception as e:
+            logger.error(f"Reaper error: {e}")
+        await asyncio.sleep(VISIBILITY_TIMEOUT)
+
+
+async def main():
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    lifecycle = WorkerLifecycle("LLM Worker", concurrency=WORKER_CONCURRENCY)
+    lifecycle.install_signal_handlers()
+    logger.info(f"Starting LLM Worker {worker_id} with {lifecycle.concurrency} slots...")
+
+    await heartbeat(worker_id, stats=lifecycle.stats())
+    background = [
+        asyncio.create_task(heartbeat_loop(worker_id, lifecycle)),
+        asyncio.create_task(reaper_loop()),
+    ]
+
+    # Backpressure: don't take work off the shared queue until we can run it
+    while await lifecycle.acquire_slot():
+        try:
+            job = await claim_reliable_job(worker_id)
+        except Exception as e:
+            lifecycle.release_slot()
             logger.error(f"Worker loop error: {e}")
             await asyncio.sleep(5)
+            continue
+
+        if not job:
+            lifecycle.release_slot()
+            continue
+
+        raw_payload, payload = job
+        if lifecycle.draining.is_set():
+            # Stop arrived while we were blocked on the queue; hand the job back untouched
+            lifecycle.release_slot()
+            await requeue_job(worker_id, raw_payload, count_attempt=False)
+            break
+
+        lifecycle.submit(
+            run_job(worker_id, raw_payload, payload),
+            on_abort=lambda raw=raw_payload: requeue_job(worker_id, raw, count_attempt=False),
+        )
+
+    await lifecycle.drain()
+    for task in background:
+        task.cancel()
+    # Final heartbeat so the stats reflect the drained state
+    await heartbeat(worker_id, stats=lifecycle.stats())
+    logger.info(f"LLM Worker {worker_id} stopped")
 
 if __name__ == "__main__":
     asyncio.run(main())
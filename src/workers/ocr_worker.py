@@ -1,11 +1,18 @@
 import asyncio
 import json
 import logging
+import os
 from src.utils import logger
 from src.services.ocr_service import OCRService
 from src.utils.s3_utils import s3_client
 from src.utils.file_handler.handler import process_file
 from src.agentic.llms.vision import get_vision_llm
+from src.agentic.llms.resilience import set_deadline
+from src.workers.lifecycle import WorkerLifecycle
+
+OCR_WORKER_CONCURRENCY = int(os.getenv("OCR_WORKER_CONCURRENCY", 1))
+# Seconds the LLM calls of one task have in total; large PDFs need the most
+OCR_JOB_DEADLINE = float(os.getenv("OCR_JOB_DEADLINE", 900))
 
 vision_llm = get_vision_llm()
 
@@ -15,6 +22,7 @@ async def process_ocr_task(task):
     schema = task['json_schema']
     
     logger.info(f"Worker processing OCR task {task_id}: {file_path}")
+    set_deadline(OCR_JOB_DEADLINE)
     
     try:
         # 1. Fetch file from S3
@@ -40,32 +48,50 @@ async def process_ocr_task(task):
             result = {"text": extracted_text}
         
         # 4. Update task as done
-        OCRService.update_task_result(task_id, result)
+        await OCRService.update_task_result_async(task_id, result)
         logger.info(f"Task {task_id} completed successfully")
         
     except Exception as e:
         logger.error(f"Error processing OCR task {task_id}: {e}")
-        OCRService.update_task_status(task_id, 'failed')
+        await OCRService.update_task_status_async(task_id, 'failed')
+
+async def requeue_ocr_task(task_id: int):
+    """Hand an unfinished task back to the queue"""
+    await OCRService.update_task_status_async(task_id, 'pending')
+    logger.warning(f"Re-queued OCR task {task_id}")
 
 async def main():
     logger.info("Starting OCR Worker...")
-    while True:
+    # Tasks are processed one by one by default to keep vision LLM load predictable
+    lifecycle = WorkerLifecycle("OCR Worker", concurrency=OCR_WORKER_CONCURRENCY)
+    lifecycle.install_signal_handlers()
+
+    while await lifecycle.acquire_slot():
         try:
             # Poll for next task
-            task = OCRService.get_next_task()
-            
-            if task:
-                # Process task asynchronously or synchronously? 
-                # Synchronous per-worker is usually safer for LLM load balancing, 
-                # but we can do create_task if we want parallel processing in one worker.
-                # For now, let's process one by one to respect the "one by one" request.
-                await process_ocr_task(task)
-            else:
-                # Wait a bit before polling again
-                await asyncio.sleep(2)
+            task = await OCRService.get_next_task_async()
         except Exception as e:
+            lifecycle.release_slot()
             logger.error(f"OCR Worker loop error: {e}")
             await asyncio.sleep(5)
+            continue
+
+        if not task:
+            lifecycle.release_slot()
+            # Wait a bit before polling again, waking early on stop
+            try:
+                await asyncio.wait_for(lifecycle.draining.wait(), timeout=2)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        lifecycle.submit(
+            process_ocr_task(task),
+            on_abort=lambda task_id=task['id']: requeue_ocr_task(task_id),
+        )
+
+    await lifecycle.drain()
+    logger.info("OCR Worker stopped")
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -5,15 +5,47 @@ from dotenv import load_dotenv
 from src.utils.redis import get_redis
 from src.services.so_validation import SOValidationService
 from src.utils import logger
+from src.utils.database import run_db
+from src.workers.lifecycle import WorkerLifecycle
+from src.agentic.llms.resilience import set_deadline
 
 load_dotenv()
 
 SO_QUEUE = "so_validation_queue"
 SO_RESULT_PREFIX = "so_validation:result:{}"
 SO_INPUT_PREFIX = "so_validation:input:{}"
+SO_WORKER_CONCURRENCY = int(os.getenv("SO_WORKER_CONCURRENCY", 4))
+# Seconds the LLM calls of one request have in total
+SO_JOB_DEADLINE = float(os.getenv("SO_JOB_DEADLINE", 300))
+
+def save_so_results(request_id: str, results: list, quantities: list):
+    from src.utils.database import get_db_cursor, get_db_config
+    with get_db_cursor(commit=True, db_config=get_db_config()) as cursor:
+        # We need to zip results with input quantities to save to DB
+        # since results list matches order of input_data['product_ids']
+        for res, qty in zip(results, quantities):
+            query = """
+                INSERT INTO so_validation_analysis (request_id, product_id, quantity, weight, status, message)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """
+            cursor.execute(query, (
+                request_id,
+                res.get('product_id'),
+                qty,
+                res.get('user_weight'),
+                res.get('status'),
+                res.get('message')
+            ))
+
+async def requeue_so_job(request_id: str):
+    """Put an unfinished request back at the front of the queue (its input is still in Redis)"""
+    r = await get_redis()
+    await r.lpush(SO_QUEUE, request_id)
+    logger.warning(f"Re-queued SO Validation request: {request_id}")
 
 async def process_so_job(request_id: str):
     logger.info(f"Processing SO Validation request: {request_id}")
+    set_deadline(SO_JOB_DEADLINE)
     r = await get_redis()
     
     try:
@@ -40,23 +72,7 @@ async def process_so_job(request_id: str):
 
         # --- Store in Postgres ---
         try:
-            from src.utils.database import get_db_cursor, get_db_config
-            with get_db_cursor(commit=True, db_config=get_db_config()) as cursor:
-                # We need to zip results with input quantities to save to DB
-                # since results list matches order of input_data['product_ids']
-                for res, qty in zip(results, input_data['quantities']):
-                    query = """
-                        INSERT INTO so_validation_analysis (request_id, product_id, quantity, weight, status, message)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """
-                    cursor.execute(query, (
-                        request_id,
-                        res.get('product_id'),
-                        qty,
-                        res.get('user_weight'),
-                        res.get('status'),
-                        res.get('message')
-                    ))
+            await run_db(save_so_results, request_id, results, input_data['quantities'])
             logger.info(f"SO Validation results for {request_id} saved to Postgres")
         except Exception as db_err:
             logger.error(f"Failed to save SO validation results to Postgres: {db_err}")
@@ -75,19 +91,36 @@ async def process_so_job(request_id: str):
 async def main():
     logger.info("Starting SO Validation Worker...")
     r = await get_redis()
-    
-    while True:
+    lifecycle = WorkerLifecycle("SO Worker", concurrency=SO_WORKER_CONCURRENCY)
+    lifecycle.install_signal_handlers()
+
+    while await lifecycle.acquire_slot():
         try:
             # Blocking pop from queue
             job = await r.blpop(SO_QUEUE, timeout=5)
-            if job:
-                request_id = job[1]
-                asyncio.create_task(process_so_job(request_id))
-            else:
-                await asyncio.sleep(1)
         except Exception as e:
+            lifecycle.release_slot()
             logger.error(f"SO Worker main loop error: {e}")
             await asyncio.sleep(5)
+            continue
+
+        if not job:
+            lifecycle.release_slot()
+            continue
+
+        request_id = job[1]
+        if lifecycle.draining.is_set():
+            lifecycle.release_slot()
+            await requeue_so_job(request_id)
+            break
+
+        lifecycle.submit(
+            process_so_job(request_id),
+            on_abort=lambda request_id=request_id: requeue_so_job(request_id),
+        )
+
+    await lifecycle.drain()
+    logger.info("SO Validation Worker stopped")
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,183 @@
+import os
+import time
+import signal
+import asyncio
+import argparse
+import importlib
+import multiprocessing
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.utils import logger
+from src.workers.lifecycle import WORKER_DRAIN_TIMEOUT
+
+WORKER_MODULES = {
+    "llm": "src.workers.llm_worker",
+    "ocr": "src.workers.ocr_worker",
+    "so": "src.workers.so_worker",
+}
+
+STATS_INTERVAL = float(os.getenv("SUPERVISOR_STATS_INTERVAL", 30))
+MAX_RESTART_BACKOFF = 60
+# A child that stays up this long gets its restart backoff reset
+STABLE_AFTER = 60
+
+
+def _run_worker(kind: str):
+    """Child process entry point"""
+    if hasattr(os, "setsid"):
+        # Own process group: a Ctrl+C in the terminal reaches only the supervisor,
+        # which forwards a single SIGTERM so children drain instead of aborting
+        os.setsid()
+    module = importlib.import_module(WORKER_MODULES[kind])
+    asyncio.run(module.main())
+
+
+class _Slot:
+    """One supervised child process of a given worker type"""
+
+    def __init__(self, kind: str, index: int):
+        self.kind = kind
+        self.index = index
+        self.process: Optional[multiprocessing.Process] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.backoff = 1.0
+        self.restart_at = 0.0
+
+
+class Supervisor:
+    """
+    Runs N processes per worker type, restarts crashed children with
+    exponential backoff and periodically logs aggregate stats.
+    Jobs are still claimed by the workers themselves, so queueing is unchanged.
+    """
+
+    def __init__(self, counts: Dict[str, int]):
+        self.ctx = multiprocessing.get_context("spawn")
+        self.slots: List[_Slot] = [
+            _Slot(kind, i) for kind, count in counts.items() for i in range(count)
+        ]
+        self.stopping = asyncio.Event()
+
+    def _start(self, slot: _Slot):
+        slot.process = self.ctx.Process(
+            target=_run_worker,
+            args=(slot.kind,),
+            name=f"{slot.kind}-worker-{slot.index}",
+        )
+        slot.process.start()
+        slot.started_at = time.monotonic()
+        logger.info(f"Started {slot.process.name} (pid {slot.process.pid})")
+
+    def _check(self, slot: _Slot):
+        process = slot.process
+        if process is not None and process.is_alive():
+            if time.monotonic() - slot.started_at > STABLE_AFTER:
+                slot.backoff = 1.0
+            return
+
+        now = time.monotonic()
+        if process is not None:
+            logger.error(f"{process.name} (pid {process.pid}) exited with code {process.exitcode}, restarting in {slot.backoff:.0f}s")
+            process.close()
+            slot.process = None
+            slot.restart_at = now + slot.backoff
+            slot.backoff = min(slot.backoff * 2, MAX_RESTART_BACKOFF)
+            slot.restarts += 1
+
+        if now >= slot.restart_at:
+            self._start(slot)
+
+    def request_stop(self):
+        if not self.stopping.is_set():
+            logger.info("Supervisor stopping, draining workers...")
+            self.stopping.set()
+
+    async def stats(self) -> dict:
+        per_type: Dict[str, dict] = {}
+        for slot in self.slots:
+            entry = per_type.setdefault(slot.kind, {"running": 0, "restarts": 0})
+            entry["running"] += int(slot.process is not None and slot.process.is_alive())
+            entry["restarts"] += slot.restarts
+
+        try:
+            from src.utils.redis import get_queue_stats, get_redis
+            from src.workers.so_worker import SO_QUEUE
+
+            if "llm" in per_type:
+                queue = await get_queue_stats()
+                alive = [w for w in queue["workers"] if w["alive"]]
+                per_type["llm"].update({
+                    "queued": queue["queued"],
+                    "in_flight": sum(int(w.get("in_flight", 0)) for w in alive),
+                    "capacity": sum(int(w.get("concurrency", 0)) for w in alive),
+                    "dead_letter": queue["dead_letter"],
+                })
+            if "so" in per_type:
+                r = await get_redis()
+                per_type["so"]["queued"] = await r.llen(SO_QUEUE)
+        except Exception as e:
+            logger.error(f"Supervisor failed to read queue stats: {e}")
+
+        return per_type
+
+    async def _shutdown(self):
+        running = [s.process for s in self.slots if s.process is not None and s.process.is_alive()]
+        for process in running:
+            process.terminate()  # SIGTERM -> WorkerLifecycle drain
+
+        deadline = time.monotonic() + WORKER_DRAIN_TIMEOUT + 10
+        while any(p.is_alive() for p in running) and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+
+        for process in running:
+            if process.is_alive():
+                logger.warning(f"{process.name} did not drain in time, killing")
+                process.kill()
+            process.join()
+        logger.info("Supervisor stopped")
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.request_stop)
+            except NotImplementedError:
+                signal.signal(sig, lambda *_: loop.call_soon_threadsafe(self.request_stop))
+
+        logger.info(f"Supervisor starting {len(self.slots)} workers")
+        next_stats = time.monotonic() + STATS_INTERVAL
+
+        while not self.stopping.is_set():
+            for slot in self.slots:
+                self._check(slot)
+
+            if time.monotonic() >= next_stats:
+                logger.info(f"Worker stats: {await self.stats()}")
+                next_stats = time.monotonic() + STATS_INTERVAL
+
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                pass
+
+        await self._shutdown()
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Run and supervise worker processes")
+    parser.add_argument("--llm", type=int, default=int(os.getenv("SUPERVISOR_LLM_WORKERS", cpus)))
+    parser.add_argument("--ocr", type=int, default=int(os.getenv("SUPERVISOR_OCR_WORKERS", 1)))
+    parser.add_argument("--so", type=int, default=int(os.getenv("SUPERVISOR_SO_WORKERS", 1)))
+    args = parser.parse_args()
+
+    counts = {"llm": args.llm, "ocr": args.ocr, "so": args.so}
+    asyncio.run(Supervisor({k: v for k, v in counts.items() if v > 0}).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+A re-queued LLM job restarts its reply stream: SSE subscribers get a reset
+event and then only the new attempt's chunks.
+
+Requires a reachable Redis (REDIS_HOST / REDIS_PORT / REDIS_DB); skipped
+without one.
+
+    uv run --with pytest pytest -q tests
+"""
+
+import asyncio
+import json
+import random
+import uuid
+
+import pytest
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.sse.router import message_reply_events
+from src.utils.redis import (
+    PROCESSING_KEY_PREFIX,
+    QUEUE_KEY,
+    STATE_KEY_PREFIX,
+    STREAM_KEY_PREFIX,
+    append_chunk,
+    get_redis,
+    requeue_job,
+    update_state,
+)
+from src.utils.stream_hub import stream_hub
+
+
+class _ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+async def _requeued_job_events() -> list:
+    r = await get_redis()
+    try:
+        await r.ping()
+    except Exception as e:
+        pytest.skip(f"Redis unavailable: {e}")
+
+    message_id = random.randint(10**9, 2 * 10**9)
+    worker_id = f"test-{uuid.uuid4().hex[:8]}"
+    raw = json.dumps({"v": 2, "message_id": message_id, "message_type": "default"})
+    await r.rpush(PROCESSING_KEY_PREFIX.format(worker_id), raw)
+    await update_state(message_id, "processing")
+
+    events = []
+
+    async def consume():
+        async for event in message_reply_events(_ConnectedRequest(), message_id):
+            events.append(event)
+
+    reader = asyncio.create_task(consume())
+    try:
+        # Give the hub time to subscribe before anything is published
+        await asyncio.sleep(0.2)
+        await append_chunk(message_id, "first attempt, ")
+        await append_chunk(message_id, "cut short")
+        await asyncio.sleep(0.2)
+
+        # The worker died (or drained) mid-reply
+        await requeue_job(worker_id, raw, count_attempt=False)
+        await asyncio.sleep(0.2)
+
+        await update_state(message_id, "processing")
+        await append_chunk(message_id, "second attempt")
+        await update_state(message_id, "done")
+        await asyncio.wait_for(reader, timeout=5)
+    finally:
+        reader.cancel()
+        await stream_hub.stop()
+        await r.lrem(QUEUE_KEY, 0, raw)
+        await r.delete(
+            PROCESSING_KEY_PREFIX.format(worker_id),
+            STATE_KEY_PREFIX.format("default", message_id),
+            STREAM_KEY_PREFIX.format("default", message_id),
+        )
+    return events
+
+
+def test_requeued_job_resets_the_reply_stream():
+    events = asyncio.run(_requeued_job_events())
+    names = [event.get("event", "message") for event in events]
+
+    assert "reset" in names
+    after_reset = events[len(names) - 1 - names[::-1].index("reset") + 1:]
+    assert [event["data"] for event in after_reset if "event" not in event] == ["second attempt"]
+    assert after_reset[-1]["event"] == "done"
+    # Whatever arrived before the reset came from the first attempt only
+    before_reset = [event["data"] for event in events[:names.index("reset")] if "event" not in event]
+    assert "second attempt" not in before_reset
@@ -218,7 +218,7 @@ messenger.onMessage(async (msg) => {
       attachments: attachmentLinks.length > 0 ? attachmentLinks : null,
     };
 
-    const id = await db.saveMessage(messageData);
+    const { id, timestamp } = await db.saveMessage(messageData);
     console.log(`✅ Message saved with ID: ${id}. Triggering LLM...`);
 
     // if (msg.body.toLowerCase() === "hi") {
@@ -228,7 +228,16 @@ messenger.onMessage(async (msg) => {
     //   );
     // }
 
-    await llmService.triggerLLMService(id, db);
+    await llmService.triggerLLMService(id, db, {
+      conversation_id: conversation.id,
+      agent: conversation.agent,
+      user_id: conversation.user_id,
+      from_number: messageData.from_number,
+      group_id: messageData.group_id,
+      body: messageData.body,
+      // As stored, so the agent's cached history matches the DB row
+      timestamp,
+    });
     console.log(`🚀 LLM Service triggered for message ${id}`);
   } catch (error) {
     console.error("❌ Workflow Error:", error.response?.data || error.message);
@@ -16,7 +16,7 @@ class MessageController {
 
       const result = await this.messenger.sendMessage(jid, message);
       // console.log(result);
-      await this.db.saveMessage({
+      const { id, timestamp } = await this.db.saveMessage({
         whatsapp_id: result.response.id.id,
         from_number: number,
         body: message,
@@ -25,7 +25,8 @@ class MessageController {
         group_id: group_id ? jid : null,
       });
 
-      res.json({ status: "sent" });
+      // The agent service caches the stored row by id
+      res.json({ status: "sent", id, timestamp });
     } catch (error) {
       console.error("Error in sendMessage controller:", error);
       res.status(500).json({ error: "Failed to send message" });
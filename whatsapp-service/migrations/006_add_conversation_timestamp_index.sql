@@ -0,0 +1,3 @@
+-- History reads: WHERE conversation_id = ? ORDER BY timestamp DESC LIMIT ?
+CREATE INDEX IF NOT EXISTS idx_whatsapp_messages_conversation_timestamp
+ON whatsapp_messages (conversation_id, timestamp DESC);
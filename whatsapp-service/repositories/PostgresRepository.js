@@ -10,25 +10,28 @@ class PostgresRepository extends BaseRepository {
   }
 
   async saveMessage({ whatsapp_id, from_number, body, is_from_me, conversation_id, group_id, attachments }) {
-    // We use a CTE (WITH clause) to ensure we get an ID even if the conflict occurs
+    // We use a CTE (WITH clause) to ensure we get an ID even if the conflict occurs.
+    // The timestamp is returned as text, exactly as stored (a JS Date would drop
+    // the microseconds and shift it by the local time zone)
     const query = `
         WITH inserted AS (
             INSERT INTO whatsapp_messages (whatsapp_id, from_number, body, is_from_me, conversation_id, group_id, attachments)
             VALUES ($1, $2, $3, $4, $5, $6, $7)
             ON CONFLICT (whatsapp_id) DO NOTHING
-            RETURNING id
+            RETURNING id, timestamp::text AS timestamp
         )
-        SELECT id FROM inserted
+        SELECT id, timestamp FROM inserted
         UNION ALL
-        SELECT id FROM whatsapp_messages WHERE whatsapp_id = $1
+        SELECT id, timestamp::text FROM whatsapp_messages WHERE whatsapp_id = $1
         LIMIT 1;
     `;
 
     const values = [whatsapp_id, from_number, body, is_from_me, conversation_id, group_id, attachments];
     const result = await this.pool.query(query, values);
 
-    // Return the ID of the record
-    return result.rows[0]?.id;
+    // Return the ID and timestamp of the record
+    const row = result.rows[0];
+    return row ? { id: row.id, timestamp: row.timestamp } : {};
   }
 
   async getChatHistory(from_number) {
@@ -4,7 +4,9 @@ const config = require("../config");
 
 class LLMService {
   // We pass the db repository here to fetch config dynamically
-  async triggerLLMService(messageId, db) {
+  // context: message/conversation fields the agent service can use
+  // instead of looking the message up again
+  async triggerLLMService(messageId, db, context = {}) {
     const url_config = await db.getActiveWebhook();
 
     if (!url_config) {
@@ -13,6 +15,7 @@ class LLMService {
     }
     const payload = {
       id: messageId,
+      ...context,
     };
 
     // Advanced: Create a signature using the secret from DB